@@ -4,6 +4,7 @@ Main entry: session_state-based routing, no sidebar. Top nav only.
 """
 import streamlit as st
 from db.schema import init_db
+from services.learning import load_model
 from services.auth import get_email_from_session, is_admin_logged_in
 from components.nav import (
     get_current_page,
@@ -19,6 +20,8 @@ from components.nav import (
 
 # Initialize DB on startup
 init_db()
+# Local classifier trained from opted-in checks (no-op until `python -m services.learning train` has run)
+load_model()
 
 st.set_page_config(
     page_title="CheckMoYan — Scam Checker",
@@ -1,6 +1,6 @@
 """Landing page sections: scam-checker theme, hero, stats, sample demos, how-it-works, trending, trust."""
 import streamlit as st
-from db.queries import get_stats_today, get_trending_categories
+from services import dashboard_cache
 from components.nav import set_page, PAGE_SCAM_CHECKER, PAGE_PRICING, PAGE_COMMUNITY
 from components.theme import ALERT_RED, ALERT_AMBER, SAFE_GREEN, ACCENT_CYAN, BG_CARD, BORDER_ACCENT, BORDER_TECH, RADIUS, TEXT_MUTED, TEXT_PRIMARY
 
@@ -112,9 +112,9 @@ def sample_scams_section():
 
 
 def live_stats_section():
-    """Live stats cards from SQLite: checks today, scams detected, top category."""
+    """Live stats cards (shared process-wide cache): checks today, scams detected, top category."""
     try:
-        stats = get_stats_today()
+        stats = dashboard_cache.stats_today()
         analyzed = stats.get("messages_analyzed", 0)
         scams = stats.get("scams_detected", 0)
         top = stats.get("top_category", "GCash phishing")
@@ -190,7 +190,7 @@ def three_step_section():
 def trending_section():
     """Trending scams this week (cards)."""
     try:
-        rows = get_trending_categories(5)
+        rows = dashboard_cache.trending_categories(5)
     except Exception:
         rows = [
             {"category": "GCash phishing", "count": 12},
@@ -82,15 +82,13 @@ def _build_full_share_text(result: dict, message: str = "") -> str:
     return "\n".join(lines)
 
 
-def verdict_card(result: dict, message: str = "", result_key: int = 0):
-    """Render big verdict card: label, confidence, category, reasons, actions, red flags, copy/share section.
-    result_key: unique per run so Message + verdict section updates when CheckMoYan is clicked again."""
+def _card_html(result: dict) -> str:
+    """Verdict card HTML: label, confidence, category, reasons, actions, red flags, notes."""
     verdict = (result.get("verdict") or "SUSPICIOUS").upper()
     confidence = result.get("confidence", 0)
     category = _strip_html(str(result.get("category") or "Unknown"))
     reasons = result.get("reasons") or []
     recommended_actions = result.get("recommended_actions") or []
-    warning_message = result.get("warning_message") or ""
     red_flags = result.get("red_flags") or []
     safety_notes_raw = (result.get("safety_notes") or "").strip()
     safety_notes = _strip_html(safety_notes_raw)
@@ -104,9 +102,10 @@ def verdict_card(result: dict, message: str = "", result_key: int = 0):
     actions_esc = "".join(f"<li>{_escape(_strip_html(str(a)))}</li>" for a in actions_list) if actions_list else f"<li style=\"color: {TEXT_MUTED};\">No specific actions for this message.</li>"
     red_flags_esc = ", ".join(_escape(_strip_html(str(f))) for f in red_flags[:5]) if red_flags else ""
     list_color = "#e2e8f0"
+    red_flags_html = f'<p style="color: {ALERT_AMBER}; font-size: 0.9rem;">🚩 Red flags: {red_flags_esc}</p>' if red_flags else ""
+    notes_html = f'<p style="color: {list_color}; font-size: 0.9rem; margin-top: 0.5rem;">{_escape(_strip_html(safety_notes))}</p>' if safety_notes else ""
 
-    st.markdown(
-        f"""
+    return f"""
         <div style="
             border-radius: 16px; padding: 1.5rem; margin: 1rem 0;
             background: {BG_CARD}; border: 2px solid {color};
@@ -122,12 +121,21 @@ def verdict_card(result: dict, message: str = "", result_key: int = 0):
             <ul style="color: {list_color}; margin: 0 0 1rem 0; padding-left: 1.25rem; line-height: 1.5;">{reasons_esc}</ul>
             <h4 style="color: {TEXT_PRIMARY}; margin: 0 0 0.5rem 0;">What to do next</h4>
             <ol style="color: {list_color}; margin: 0 0 1rem 0; padding-left: 1.25rem; line-height: 1.5;">{actions_esc}</ol>
-            {"<p style=\"color: " + ALERT_AMBER + "; font-size: 0.9rem;\">🚩 Red flags: " + red_flags_esc + "</p>" if red_flags else ""}
-            {"<p style=\"color: " + list_color + "; font-size: 0.9rem; margin-top: 0.5rem;\">" + _escape(_strip_html(safety_notes)) + "</p>" if safety_notes else ""}
+            {red_flags_html}
+            {notes_html}
         </div>
-        """,
-        unsafe_allow_html=True,
-    )
+        """
+
+
+def verdict_card(result: dict, message: str = "", result_key: int = 0, partial: bool = False):
+    """Render big verdict card: label, confidence, category, reasons, actions, red flags, copy/share section.
+    result_key: unique per run so Message + verdict section updates when CheckMoYan is clicked again.
+    partial: True while the result is still streaming in — renders the card only (no share widgets),
+    so it can be redrawn into an st.empty() placeholder on every update."""
+    st.markdown(_card_html(result), unsafe_allow_html=True)
+    if partial:
+        st.caption("⏳ Still analyzing — details are filling in...")
+        return None
 
     # Share section: full message + verdict (updates when new result is generated via result_key)
     full_text = _build_full_share_text(result, message)
@@ -7,6 +7,7 @@ from .queries import (
     record_usage,
     get_usage_today,
     insert_scan,
+    insert_scans,
     get_stats_today,
     get_trending_categories,
     insert_upgrade_request,
@@ -24,6 +25,7 @@ __all__ = [
     "record_usage",
     "get_usage_today",
     "insert_scan",
+    "insert_scans",
     "get_stats_today",
     "get_trending_categories",
     "insert_upgrade_request",
@@ -1,17 +1,142 @@
-"""SQLite schema and initialization (used when SNOWFLAKE is not in secrets)."""
+"""SQLite schema and initialization (used when SNOWFLAKE is not in secrets).
+
+Connections are pooled: get_conn() hands out an open connection and close() puts it back, so the
+handful of queries behind one check reuse connections instead of reopening the file each time. The
+database runs in WAL mode, so readers no longer block on a writer and sessions stop serializing on
+the file lock.
+"""
+import atexit
 import sqlite3
+import threading
 from pathlib import Path
 
 DB_PATH = Path(__file__).resolve().parent.parent / "checkmoyan.db"
+POOL_MAX_IDLE = 8
+BUSY_TIMEOUT_MS = 5000
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",  # durable across app crashes; WAL only loses the last commits on power loss
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA cache_size=-16000",  # KiB, per connection
+    "PRAGMA mmap_size=134217728",
+    "PRAGMA temp_store=MEMORY",
+)
 
+# scans columns added after the first release; init_db adds them to existing tables.
+# scan_date (UTC YYYY-MM-DD) makes "today" / "last 7 days" filters index range scans instead of date(ts) on every row;
+# the rest are per-check latency and token usage (services.metrics).
+SCAN_ADDED_COLUMNS = {
+    "scan_date": "TEXT",
+    "latency_ms": "INTEGER",
+    "prompt_tokens": "INTEGER",
+    "completion_tokens": "INTEGER",
+    "model": "TEXT",
+    "source": "TEXT",
+    "stages_json": "TEXT",
+}
 
-def get_conn():
-    """Return a connection to the SQLite DB."""
-    conn = sqlite3.connect(str(DB_PATH))
+
+_pool_lock = threading.Lock()
+_idle = []  # (path, sqlite3.Connection), most recently returned last
+_stats = {"opened": 0, "reused": 0, "discarded": 0}
+
+
+class _PooledConn:
+    """A pooled sqlite3 connection: close() rolls back anything uncommitted and returns it to the pool."""
+
+    def __init__(self, conn, path: str):
+        self._conn = conn
+        self._path = path
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self):
+        return self._conn.cursor()
+
+    def commit(self):
+        return self._conn.commit()
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            _release(conn, self._path)
+
+
+def _open(path: str):
+    conn = sqlite3.connect(path, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
     return conn
 
 
+def _release(conn, path: str) -> None:
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+    except sqlite3.Error:
+        _discard(conn)
+        return
+    with _pool_lock:
+        if path == str(DB_PATH) and len(_idle) < POOL_MAX_IDLE:
+            _idle.append((path, conn))
+            return
+    _discard(conn)
+
+
+def _discard(conn) -> None:
+    with _pool_lock:
+        _stats["discarded"] += 1
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+def get_conn():
+    """Return a pooled connection to the SQLite DB (row_factory=sqlite3.Row); close() returns it to the pool."""
+    path = str(DB_PATH)
+    stale = []
+    conn = None
+    with _pool_lock:
+        while _idle:
+            idle_path, idle_conn = _idle.pop()
+            if idle_path == path:
+                conn = idle_conn
+                _stats["reused"] += 1
+                break
+            # DB_PATH was repointed (scripts, benchmarks)
+            stale.append(idle_conn)
+    for old in stale:
+        _discard(old)
+    if conn is None:
+        conn = _open(path)
+        with _pool_lock:
+            _stats["opened"] += 1
+    return _PooledConn(conn, path)
+
+
+def pool_stats() -> dict:
+    """Connections opened, checkouts served from the pool, connections discarded, and idle connections."""
+    with _pool_lock:
+        out = dict(_stats)
+        out["idle"] = len(_idle)
+    return out
+
+
+def close_pool() -> None:
+    """Close idle pooled connections (e.g. on shutdown); checked-out ones close when returned past the limit."""
+    with _pool_lock:
+        idle = [conn for _, conn in _idle]
+        _idle.clear()
+    for conn in idle:
+        _discard(conn)
+
+
+atexit.register(close_pool)
+
+
 def init_db():
     """Create tables if they don't exist and seed dummy stats for first run."""
     conn = get_conn()
@@ -25,6 +150,7 @@ def init_db():
             created_at TEXT NOT NULL DEFAULT (datetime('now'))
         )
     """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_users_created_at ON users (created_at)")
 
     cur.execute("""
         CREATE TABLE IF NOT EXISTS usage (
@@ -41,11 +167,33 @@ def init_db():
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             email TEXT NOT NULL,
             ts TEXT NOT NULL DEFAULT (datetime('now')),
+            scan_date TEXT,
             verdict TEXT NOT NULL,
             confidence INTEGER NOT NULL,
             category TEXT,
             signals_json TEXT,
-            msg_hash TEXT
+            msg_hash TEXT,
+            latency_ms INTEGER,
+            prompt_tokens INTEGER,
+            completion_tokens INTEGER,
+            model TEXT,
+            source TEXT,
+            stages_json TEXT
+        )
+    """)
+    _add_missing_columns(cur, "scans", SCAN_ADDED_COLUMNS)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_scans_date_verdict ON scans (scan_date, verdict)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_scans_date_category ON scans (scan_date, category)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_scans_email_ts ON scans (email, ts)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_scans_msg_hash ON scans (msg_hash)")
+    # Scans per day, category and verdict, kept up to date in the same transaction as each scan insert
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS scan_daily_rollup (
+            date TEXT NOT NULL,
+            category TEXT NOT NULL DEFAULT '',
+            verdict TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (date, category, verdict)
         )
     """)
 
@@ -63,6 +211,7 @@ def init_db():
             approved_until TEXT
         )
     """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_upgrade_requests_status_ts ON upgrade_requests (status, ts)")
 
     cur.execute("""
         CREATE TABLE IF NOT EXISTS community_alerts (
@@ -80,12 +229,97 @@ def init_db():
         )
     """)
 
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS verdict_cache (
+            cache_key TEXT PRIMARY KEY,
+            msg_hash TEXT NOT NULL,
+            prompt_version TEXT NOT NULL,
+            result_json TEXT NOT NULL,
+            created_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_verdict_cache_created ON verdict_cache (created_at)")
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS scam_templates (
+            msg_hash TEXT PRIMARY KEY,
+            signature TEXT NOT NULL,
+            result_json TEXT NOT NULL,
+            created_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_scam_templates_created ON scam_templates (created_at)")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS scam_template_bands (
+            band_key TEXT NOT NULL,
+            msg_hash TEXT NOT NULL,
+            PRIMARY KEY (band_key, msg_hash)
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_scam_template_bands_hash ON scam_template_bands (msg_hash)")
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS indicators (
+            indicator_key TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            scam_count INTEGER NOT NULL DEFAULT 0,
+            first_seen TEXT NOT NULL DEFAULT (datetime('now')),
+            last_seen TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_indicators_last_seen ON indicators (last_seen)")
+    # One row per (indicator, message): a message re-checked or re-judged is counted once
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS indicator_reports (
+            indicator_key TEXT NOT NULL,
+            msg_hash TEXT NOT NULL,
+            created_at TEXT NOT NULL DEFAULT (datetime('now')),
+            PRIMARY KEY (indicator_key, msg_hash)
+        )
+    """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS learning_features (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            features TEXT NOT NULL,
+            channel TEXT,
+            verdict TEXT NOT NULL,
+            created_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+    """)
+
     conn.commit()
     _seed_dummy_data(conn, cur)
+    # Rows from before scan_date existed (and the seed rows); uses idx_scans_date_verdict, so cheap once done
+    cur.execute("UPDATE scans SET scan_date = date(ts) WHERE scan_date IS NULL")
     conn.commit()
+    # First run after the rollup table was added: build it from the existing scans
+    cur.execute("SELECT EXISTS (SELECT 1 FROM scan_daily_rollup)")
+    if not cur.fetchone()[0]:
+        rebuild_scan_rollup(cur)
+        conn.commit()
     conn.close()
 
 
+def rebuild_scan_rollup(cur) -> None:
+    """Recompute scan_daily_rollup from scans (caller commits)."""
+    cur.execute("DELETE FROM scan_daily_rollup")
+    cur.execute(
+        """INSERT INTO scan_daily_rollup (date, category, verdict, count)
+           SELECT scan_date, COALESCE(category, ''), verdict, COUNT(*) FROM scans
+           WHERE scan_date IS NOT NULL GROUP BY scan_date, COALESCE(category, ''), verdict"""
+    )
+
+
+def _add_missing_columns(cur, table: str, columns: dict) -> None:
+    """ALTER TABLE ADD COLUMN for columns an older database does not have yet."""
+    cur.execute(f"PRAGMA table_info({table})")
+    existing = {row[1] for row in cur.fetchall()}
+    for name, col_type in columns.items():
+        if name not in existing:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN {name} {col_type}")
+
+
 def _seed_dummy_data(conn, cur):
     """Seed dummy scans and alerts for live stats and trending categories on first run."""
     cur.execute("SELECT COUNT(*) FROM scans")
@@ -1,7 +1,27 @@
-"""CRUD for CheckMoYan. Uses Snowflake if [SNOWFLAKE] in secrets.toml, else SQLite."""
+"""CRUD for CheckMoYan. Uses Snowflake if [SNOWFLAKE] in secrets.toml, else SQLite.
+
+app_settings reads are cached in memory. Every set_app_setting also bumps a version row, and each process
+re-reads that one row at most every SETTINGS_VERSION_CHECK_SECONDS, dropping its cached settings when the
+version moved, so Admin edits reach all processes without re-reading (and re-parsing) settings per call.
+
+Rebuild the stats rollup from scans:  python -m db.queries rebuild-rollup
+"""
+import copy
 import json
+import sys
+import threading
+import time
 from . import schema
 
+SETTINGS_VERSION_CHECK_SECONDS = 2.0
+
+_settings_lock = threading.Lock()
+_settings = {}  # key -> raw value ("" when unset)
+_settings_json = {}  # key -> (raw value, parsed JSON) so unchanged values are not parsed again
+_settings_version = None  # None: unknown, check on the next read
+_settings_checked_at = 0.0
+_settings_generation = 0  # bumped whenever the cache is dropped; a read that overlapped a drop is not stored
+
 
 def _backend():
     if schema._use_snowflake():
@@ -23,8 +43,12 @@ def set_user_plan(email: str, plan: str, premium_until: str = None) -> None:
     return _backend().set_user_plan(email, plan, premium_until)
 
 
-def record_usage(email: str) -> None:
-    return _backend().record_usage(email)
+def record_usage(email: str, count: int = 1) -> None:
+    return _backend().record_usage(email, count)
+
+
+def record_usages(rows: list) -> None:
+    return _backend().record_usages(rows)
 
 
 def get_usage_today(email: str) -> int:
@@ -38,8 +62,29 @@ def insert_scan(
     category: str,
     signals_json: str,
     msg_hash: str,
+    metrics: dict = None,
 ) -> int:
-    return _backend().insert_scan(email, verdict, confidence, category, signals_json, msg_hash)
+    return _backend().insert_scan(email, verdict, confidence, category, signals_json, msg_hash, metrics)
+
+
+def record_check_atomic(
+    email: str,
+    verdict: str,
+    confidence: int,
+    category: str,
+    signals_json: str,
+    msg_hash: str,
+    metrics: dict = None,
+):
+    return _backend().record_check_atomic(email, verdict, confidence, category, signals_json, msg_hash, metrics)
+
+
+def insert_scans(rows: list) -> None:
+    return _backend().insert_scans(rows)
+
+
+def record_checks_atomic(usage_rows: list, scan_rows: list) -> None:
+    return _backend().record_checks_atomic(usage_rows, scan_rows)
 
 
 def get_stats_today() -> dict:
@@ -50,6 +95,18 @@ def get_trending_categories(limit: int = 5) -> list:
     return _backend().get_trending_categories(limit)
 
 
+def get_recent_alerts(limit: int = 10) -> list:
+    return _backend().get_recent_alerts(limit)
+
+
+def rebuild_scan_rollup() -> None:
+    return _backend().rebuild_scan_rollup()
+
+
+def get_slowest_scans(hours: int = 24, limit: int = 10) -> list:
+    return _backend().get_slowest_scans(hours, limit)
+
+
 def insert_upgrade_request(
     email: str,
     plan: str,
@@ -77,12 +134,111 @@ def update_upgrade_request(
     return _backend().update_upgrade_request(req_id, status, admin_notes, approved_until)
 
 
+def _sync_settings_version() -> None:
+    """Drop cached settings if the version row moved (read at most every SETTINGS_VERSION_CHECK_SECONDS)."""
+    global _settings_version, _settings_checked_at, _settings_generation
+    now = time.monotonic()
+    with _settings_lock:
+        if _settings_version is not None and now - _settings_checked_at < SETTINGS_VERSION_CHECK_SECONDS:
+            return
+        _settings_checked_at = now  # concurrent readers keep using the cache meanwhile
+    backend = _backend()
+    try:
+        version = int(backend.get_app_setting(backend.SETTINGS_VERSION_KEY) or 0)
+    except ValueError:
+        version = 0
+    with _settings_lock:
+        if version != _settings_version:
+            _settings.clear()
+            _settings_json.clear()
+            _settings_generation += 1
+            _settings_version = version
+
+
 def get_app_setting(key: str) -> str:
-    return _backend().get_app_setting(key)
+    _sync_settings_version()
+    with _settings_lock:
+        if key in _settings:
+            return _settings[key]
+        generation = _settings_generation
+    value = _backend().get_app_setting(key)
+    with _settings_lock:
+        # Cache dropped while we read: the value may predate the change, so don't keep it
+        if generation == _settings_generation:
+            _settings[key] = value
+    return value
 
 
 def set_app_setting(key: str, value: str) -> None:
-    return _backend().set_app_setting(key, value)
+    global _settings_version, _settings_generation
+    _backend().set_app_setting(key, value)
+    with _settings_lock:
+        _settings.clear()
+        _settings_json.clear()
+        _settings_generation += 1
+        _settings_version = None
+
+
+def _get_json_setting(key: str) -> dict | None:
+    """Parsed JSON of a setting (a copy), or None if unset or invalid."""
+    raw = get_app_setting(key)
+    if not raw or not raw.strip():
+        return None
+    with _settings_lock:
+        cached = _settings_json.get(key)
+    if cached is not None and cached[0] == raw:
+        return copy.deepcopy(cached[1])
+    try:
+        parsed = json.loads(raw)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    with _settings_lock:
+        _settings_json[key] = (raw, parsed)
+    return copy.deepcopy(parsed)
+
+
+def get_cached_verdict(cache_key: str, min_created_at: str) -> tuple:
+    return _backend().get_cached_verdict(cache_key, min_created_at)
+
+
+def put_cached_verdict(cache_key: str, msg_hash: str, prompt_version: str, result_json: str) -> None:
+    return _backend().put_cached_verdict(cache_key, msg_hash, prompt_version, result_json)
+
+
+def prune_verdict_cache(min_created_at: str, max_rows: int) -> None:
+    return _backend().prune_verdict_cache(min_created_at, max_rows)
+
+
+def find_scam_templates(band_keys: list, min_created_at: str) -> list:
+    return _backend().find_scam_templates(band_keys, min_created_at)
+
+
+def put_scam_template(msg_hash: str, signature: str, band_keys: list, result_json: str) -> None:
+    return _backend().put_scam_template(msg_hash, signature, band_keys, result_json)
+
+
+def prune_scam_templates(min_created_at: str, max_rows: int) -> None:
+    return _backend().prune_scam_templates(min_created_at, max_rows)
+
+
+def record_indicators(rows: list, msg_hash: str) -> int:
+    return _backend().record_indicators(rows, msg_hash)
+
+
+def get_indicator_counts(keys: list) -> dict:
+    return _backend().get_indicator_counts(keys)
+
+
+def list_indicator_keys(since: str = "") -> list:
+    return _backend().list_indicator_keys(since)
+
+
+def insert_learning_example(features: str, channel: str, verdict: str) -> None:
+    return _backend().insert_learning_example(features, channel, verdict)
+
+
+def list_learning_examples(limit: int = 200000) -> list:
+    return _backend().list_learning_examples(limit)
 
 
 PAYMENT_CONFIG_KEY = "payment_config"
@@ -90,15 +246,31 @@ PAYMENT_CONFIG_KEY = "payment_config"
 
 def get_payment_config_from_db() -> dict | None:
     """Return payment config dict from DB, or None if not set."""
-    raw = get_app_setting(PAYMENT_CONFIG_KEY)
-    if not raw or not raw.strip():
-        return None
-    try:
-        return json.loads(raw)
-    except (json.JSONDecodeError, TypeError):
-        return None
+    return _get_json_setting(PAYMENT_CONFIG_KEY)
 
 
 def set_payment_config_in_db(config: dict) -> None:
     """Save payment config dict to DB."""
     set_app_setting(PAYMENT_CONFIG_KEY, json.dumps(config))
+
+
+ROUTING_CONFIG_KEY = "model_routing"
+
+
+def get_routing_config_from_db() -> dict | None:
+    """Return model routing config dict from DB, or None if not set."""
+    return _get_json_setting(ROUTING_CONFIG_KEY)
+
+
+def set_routing_config_in_db(config: dict) -> None:
+    """Save model routing config dict to DB."""
+    set_app_setting(ROUTING_CONFIG_KEY, json.dumps(config))
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] != ["rebuild-rollup"]:
+        print("usage: python -m db.queries rebuild-rollup")
+        sys.exit(2)
+    schema.init_db()
+    rebuild_scan_rollup()
+    print(get_stats_today())
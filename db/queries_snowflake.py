@@ -1,6 +1,48 @@
 """CRUD for CheckMoYan when using Snowflake. Uses %s placeholders and Snowflake SQL."""
+import json
+import time
 from datetime import datetime
-from .snowflake_schema import get_conn
+from .snowflake_schema import get_conn, rebuild_scan_rollup as _rebuild_scan_rollup
+
+
+_SCAN_COLUMNS = (
+    "email, verdict, confidence, category, signals_json, msg_hash, "
+    "latency_ms, prompt_tokens, completion_tokens, model, source, stages_json"
+)
+
+
+def _scan_values(email, verdict, confidence, category, signals_json, msg_hash, metrics=None) -> tuple:
+    """Column values for one scans row; metrics is services.metrics' per-check summary (NULLs when absent)."""
+    m = metrics or {}
+    return (
+        email.strip().lower(), verdict, confidence, category or "", signals_json, msg_hash or "",
+        int(round(m["total_ms"])) if m.get("total_ms") is not None else None,
+        m.get("prompt_tokens"), m.get("completion_tokens"), m.get("model") or None, m.get("source") or None,
+        json.dumps(m["stages"], separators=(",", ":")) if m.get("stages") else None,
+    )
+
+
+# app_settings row bumped by every set_app_setting, so other processes can tell their cached settings are stale
+SETTINGS_VERSION_KEY = "settings_version"
+
+
+def _rollup_values(scans: list) -> list:
+    """Flattened (date, category, verdict, count) per distinct triple in scans [(date, category, verdict)]."""
+    counts = {}
+    for day, category, verdict in scans:
+        key = (day, category or "", verdict)
+        counts[key] = counts.get(key, 0) + 1
+    return [v for (day, category, verdict), n in counts.items() for v in (day, category, verdict, n)]
+
+
+def _rollup_merge(n_rows: int) -> str:
+    """MERGE adding the counts of n_rows (date, category, verdict, count) bound tuples into scan_daily_rollup."""
+    return f"""MERGE INTO scan_daily_rollup r
+           USING (SELECT column1::DATE AS dt, column2 AS category, column3 AS verdict, column4 AS n
+                  FROM VALUES {", ".join(["(%s, %s, %s, %s)"] * n_rows)}) s
+           ON r.date = s.dt AND r.category = s.category AND r.verdict = s.verdict
+           WHEN MATCHED THEN UPDATE SET count = r.count + s.n
+           WHEN NOT MATCHED THEN INSERT (date, category, verdict, count) VALUES (s.dt, s.category, s.verdict, s.n)"""
 
 
 def _row_to_dict(row):
@@ -74,24 +116,58 @@ def set_user_plan(email: str, plan: str, premium_until: str = None) -> None:
     conn.close()
 
 
-def record_usage(email: str) -> None:
-    """Increment today's check count for user."""
+def record_usage(email: str, count: int = 1) -> None:
+    """Increment today's check count for user by count."""
     ensure_user(email)
     today = datetime.utcnow().strftime("%Y-%m-%d")
     conn = get_conn()
     cur = conn.cursor()
     cur.execute(
         """MERGE INTO usage u
-           USING (SELECT %s AS email, %s AS dt) s ON u.email = s.email AND u.date = s.dt
-           WHEN MATCHED THEN UPDATE SET checks_count = u.checks_count + 1
-           WHEN NOT MATCHED THEN INSERT (email, date, checks_count) VALUES (s.email, s.dt, 1)""",
-        (email.strip().lower(), today),
+           USING (SELECT %s AS email, %s AS dt, %s AS n) s ON u.email = s.email AND u.date = s.dt
+           WHEN MATCHED THEN UPDATE SET checks_count = u.checks_count + s.n
+           WHEN NOT MATCHED THEN INSERT (email, date, checks_count) VALUES (s.email, s.dt, s.n)""",
+        (email.strip().lower(), today, count),
     )
     conn.commit()
     cur.close()
     conn.close()
 
 
+def _merge_usages(cur, rows: list) -> None:
+    counts = {}
+    for r in rows:
+        key = (r["email"].strip().lower(), r["date"])
+        counts[key] = counts.get(key, 0) + r["count"]  # MERGE needs one source row per target row
+    emails = sorted({email for email, _ in counts})
+    cur.execute(
+        f"""MERGE INTO users u
+           USING (SELECT column1 AS email FROM VALUES {", ".join(["(%s)"] * len(emails))}) s ON u.email = s.email
+           WHEN NOT MATCHED THEN INSERT (email, plan) VALUES (s.email, 'free')""",
+        emails,
+    )
+    cur.execute(
+        f"""MERGE INTO usage u
+           USING (SELECT column1 AS email, column2::DATE AS dt, column3 AS n FROM VALUES {", ".join(["(%s, %s, %s)"] * len(counts))}) s
+           ON u.email = s.email AND u.date = s.dt
+           WHEN MATCHED THEN UPDATE SET checks_count = u.checks_count + s.n
+           WHEN NOT MATCHED THEN INSERT (email, date, checks_count) VALUES (s.email, s.dt, s.n)""",
+        [v for (email, dt), n in counts.items() for v in (email, dt, n)],
+    )
+
+
+def record_usages(rows: list) -> None:
+    """Apply many usage increments (dicts with email, date, count) and create missing users: two MERGEs in total."""
+    if not rows:
+        return
+    conn = get_conn()
+    cur = conn.cursor()
+    _merge_usages(cur, rows)
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
 def get_usage_today(email: str) -> int:
     """Return number of checks used today by user."""
     today = datetime.utcnow().strftime("%Y-%m-%d")
@@ -114,36 +190,131 @@ def insert_scan(
     category: str,
     signals_json: str,
     msg_hash: str,
+    metrics: dict = None,
 ) -> int:
     """Insert a scan record; return id."""
+    today = datetime.utcnow().strftime("%Y-%m-%d")
     conn = get_conn()
     cur = conn.cursor()
     cur.execute("SELECT scans_seq.NEXTVAL AS n")
     sid = _val(cur.fetchone(), "n", "NEXTVAL")
     sid = int(sid) if sid is not None else None
     cur.execute(
-        """INSERT INTO scans (id, email, verdict, confidence, category, signals_json, msg_hash)
-           VALUES (%s, %s, %s, %s, %s, %s, %s)""",
-        (sid, email.strip().lower(), verdict, confidence, category or "", signals_json, msg_hash or ""),
+        f"""BEGIN;
+           INSERT INTO scans (id, {_SCAN_COLUMNS}, scan_date) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
+           {_rollup_merge(1)};
+           COMMIT;""",
+        (sid,) + _scan_values(email, verdict, confidence, category, signals_json, msg_hash, metrics) + (today,)
+        + tuple(_rollup_values([(today, category, verdict)])),
+        num_statements=4,
     )
-    conn.commit()
     cur.close()
     conn.close()
     return sid
 
 
+def record_check_atomic(
+    email: str,
+    verdict: str,
+    confidence: int,
+    category: str,
+    signals_json: str,
+    msg_hash: str,
+    metrics: dict = None,
+) -> None:
+    """Create the user if missing, add one check to today's usage, insert the scan and count it in the rollup:
+    one multi-statement request wrapped in a transaction (the scan id comes from the scans_seq default)."""
+    email = email.strip().lower()
+    today = datetime.utcnow().strftime("%Y-%m-%d")
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        f"""BEGIN;
+           MERGE INTO users u USING (SELECT %s AS email) s ON u.email = s.email
+           WHEN NOT MATCHED THEN INSERT (email, plan) VALUES (s.email, 'free');
+           MERGE INTO usage u USING (SELECT %s AS email, %s::DATE AS dt) s ON u.email = s.email AND u.date = s.dt
+           WHEN MATCHED THEN UPDATE SET checks_count = u.checks_count + 1
+           WHEN NOT MATCHED THEN INSERT (email, date, checks_count) VALUES (s.email, s.dt, 1);
+           INSERT INTO scans ({_SCAN_COLUMNS}, scan_date) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
+           {_rollup_merge(1)};
+           COMMIT;""",
+        (email, email, today) + _scan_values(email, verdict, confidence, category, signals_json, msg_hash, metrics) + (today,)
+        + tuple(_rollup_values([(today, category, verdict)])),
+        num_statements=6,
+    )
+    cur.close()
+    conn.close()
+
+
+def _row_times(row: dict, now: float) -> tuple:
+    """(ts epoch seconds, scan_date) of a queued scan row: when the check ran, else now (date in UTC)."""
+    ts = row.get("ts") or now
+    return int(ts), row.get("scan_date") or datetime.utcfromtimestamp(ts).strftime("%Y-%m-%d")
+
+
+def _insert_scan_rows(cur, rows: list) -> None:
+    now = time.time()
+    times = [_row_times(r, now) for r in rows]
+    rollup = _rollup_values([(day, r.get("category"), r["verdict"]) for r, (_, day) in zip(rows, times)])
+    # ts goes through TIMESTAMP_LTZ so it lands in the session time zone, like the column's CURRENT_TIMESTAMP() default
+    cur.executemany(
+        f"""INSERT INTO scans ({_SCAN_COLUMNS}, ts, scan_date)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, TO_TIMESTAMP_LTZ(%s), %s)""",
+        [
+            _scan_values(r["email"], r["verdict"], r["confidence"], r.get("category"), r["signals_json"], r.get("msg_hash"), r.get("metrics"))
+            + t
+            for r, t in zip(rows, times)
+        ],
+    )
+    cur.execute(_rollup_merge(len(rollup) // 4), rollup)
+
+
+def insert_scans(rows: list) -> None:
+    """Insert many scan rows in one multi-row INSERT (ids come from the scans_seq default) and count them in the
+    rollup, in one transaction."""
+    if not rows:
+        return
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("BEGIN")
+    _insert_scan_rows(cur, rows)
+    cur.execute("COMMIT")
+    cur.close()
+    conn.close()
+
+
+def record_checks_atomic(usage_rows: list, scan_rows: list) -> None:
+    """record_usages and insert_scans in one transaction: usage and scans land together or not at all."""
+    if not usage_rows and not scan_rows:
+        return
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("BEGIN")
+    if usage_rows:
+        _merge_usages(cur, usage_rows)
+    if scan_rows:
+        _insert_scan_rows(cur, scan_rows)
+    cur.execute("COMMIT")
+    cur.close()
+    conn.close()
+
+
 def get_stats_today() -> dict:
-    """Return { messages_analyzed, scams_detected, top_category } for today."""
+    """Return { messages_analyzed, scams_detected, top_category } for today (from scan_daily_rollup)."""
     today = datetime.utcnow().strftime("%Y-%m-%d")
     conn = get_conn()
     cur = conn.cursor()
-    cur.execute("SELECT COUNT(*) AS c FROM scans WHERE DATE(ts) = %s", (today,))
-    messages_analyzed = _val(cur.fetchone(), "c", "COUNT(*)") or 0
-    cur.execute("SELECT COUNT(*) AS c FROM scans WHERE DATE(ts) = %s AND verdict = 'SCAM'", (today,))
-    scams_detected = _val(cur.fetchone(), "c", "COUNT(*)") or 0
     cur.execute(
-        """SELECT category, COUNT(*) AS c FROM scans
-           WHERE DATE(ts) = %s AND TRIM(COALESCE(category,'')) != ''
+        """SELECT COALESCE(SUM(count), 0) AS c, COALESCE(SUM(IFF(verdict = 'SCAM', count, 0)), 0) AS scams
+           FROM scan_daily_rollup WHERE date = %s""",
+        (today,),
+    )
+    row = cur.fetchone()
+    messages_analyzed = _val(row, "c", "C") or 0
+    scams_detected = _val(row, "scams", "SCAMS") or 0
+    cur.execute(
+        """SELECT category, SUM(count) AS c FROM scan_daily_rollup
+           WHERE date = %s AND TRIM(category) != ''
            GROUP BY category ORDER BY c DESC LIMIT 1""",
         (today,),
     )
@@ -159,12 +330,12 @@ def get_stats_today() -> dict:
 
 
 def get_trending_categories(limit: int = 5) -> list:
-    """Return list of { category, count } for recent scans (last 7 days)."""
+    """Return list of { category, count } for recent scans (last 7 days, from scan_daily_rollup)."""
     conn = get_conn()
     cur = conn.cursor()
     cur.execute(
-        """SELECT category, COUNT(*) AS count FROM scans
-           WHERE DATE(ts) >= DATEADD(day, -7, CURRENT_DATE()) AND TRIM(COALESCE(category,'')) != ''
+        """SELECT category, SUM(count) AS count FROM scan_daily_rollup
+           WHERE date >= DATEADD(day, -7, CURRENT_DATE()) AND TRIM(category) != ''
            GROUP BY category ORDER BY count DESC LIMIT %s""",
         (limit,),
     )
@@ -174,6 +345,49 @@ def get_trending_categories(limit: int = 5) -> list:
     return [{"category": _val(r, "category", "CATEGORY"), "count": _val(r, "count", "COUNT") or 0} for r in rows]
 
 
+def get_recent_alerts(limit: int = 10) -> list:
+    """Return list of { category, summary, ts } for the newest community alerts."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT category, summary, ts FROM community_alerts ORDER BY ts DESC LIMIT %s", (limit,))
+    rows = cur.fetchall()
+    cur.close()
+    conn.close()
+    # Not _val: it falls back to another column when summary is NULL
+    return [{k: r.get(k.upper(), r.get(k)) for k in ("category", "summary", "ts")} for r in rows]
+
+
+def rebuild_scan_rollup() -> None:
+    """Recompute scan_daily_rollup from all scans (backfill or repair)."""
+    conn = get_conn()
+    cur = conn.cursor()
+    _rebuild_scan_rollup(cur)
+    cur.close()
+    conn.close()
+
+
+def get_slowest_scans(hours: int = 24, limit: int = 10) -> list:
+    """Slowest recent scans with their stage timings (only rows that carry metrics)."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        """SELECT ts, verdict, source, model, latency_ms, prompt_tokens, completion_tokens, stages_json FROM scans
+           WHERE ts >= DATEADD(hour, -%s, CURRENT_TIMESTAMP()) AND latency_ms IS NOT NULL
+           ORDER BY latency_ms DESC LIMIT %s""",
+        (int(hours), limit),
+    )
+    rows = cur.fetchall()
+    cur.close()
+    conn.close()
+    return [
+        {
+            k: _val(r, k, k.upper())
+            for k in ("ts", "verdict", "source", "model", "latency_ms", "prompt_tokens", "completion_tokens", "stages_json")
+        }
+        for r in rows
+    ]
+
+
 def insert_upgrade_request(
     email: str,
     plan: str,
@@ -260,11 +474,233 @@ def get_app_setting(key: str) -> str:
 
 
 def set_app_setting(key: str, value: str) -> None:
+    """Upsert a setting and bump the settings version: one multi-statement request in a transaction."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        """BEGIN;
+           MERGE INTO app_settings a USING (SELECT %s AS key, %s AS value) s ON a.key = s.key
+           WHEN MATCHED THEN UPDATE SET value = s.value
+           WHEN NOT MATCHED THEN INSERT (key, value) VALUES (s.key, s.value);
+           MERGE INTO app_settings a USING (SELECT %s AS key) s ON a.key = s.key
+           WHEN MATCHED THEN UPDATE SET value = TO_VARCHAR(COALESCE(TRY_TO_NUMBER(a.value), 0) + 1)
+           WHEN NOT MATCHED THEN INSERT (key, value) VALUES (s.key, '1');
+           COMMIT;""",
+        (key, value, SETTINGS_VERSION_KEY),
+        num_statements=4,
+    )
+    cur.close()
+    conn.close()
+
+
+def get_cached_verdict(cache_key: str, min_created_at: str) -> tuple:
+    """Return (result JSON, age in seconds) for cache_key if created at/after min_created_at, else ("", 0.0)."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        """SELECT result_json, DATEDIFF('second', created_at, SYSDATE()) AS age_seconds
+           FROM verdict_cache WHERE cache_key = %s AND created_at >= %s""",
+        (cache_key, min_created_at),
+    )
+    row = cur.fetchone()
+    cur.close()
+    conn.close()
+    if not row:
+        return "", 0.0
+    v = _val(row, "result_json", "RESULT_JSON")
+    if v is None:
+        return "", 0.0
+    return str(v), max(0.0, float(_val(row, "age_seconds", "AGE_SECONDS") or 0.0))
+
+
+def put_cached_verdict(cache_key: str, msg_hash: str, prompt_version: str, result_json: str) -> None:
+    """Insert or refresh a cached analysis result."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        """MERGE INTO verdict_cache c
+           USING (SELECT %s AS cache_key, %s AS msg_hash, %s AS prompt_version, %s AS result_json) s
+           ON c.cache_key = s.cache_key
+           WHEN MATCHED THEN UPDATE SET result_json = s.result_json, created_at = SYSDATE()
+           WHEN NOT MATCHED THEN INSERT (cache_key, msg_hash, prompt_version, result_json, created_at)
+               VALUES (s.cache_key, s.msg_hash, s.prompt_version, s.result_json, SYSDATE())""",
+        (cache_key, msg_hash, prompt_version, result_json),
+    )
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def prune_verdict_cache(min_created_at: str, max_rows: int) -> None:
+    """Drop expired cache rows, then keep only the newest max_rows."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM verdict_cache WHERE created_at < %s", (min_created_at,))
+    cur.execute(
+        """DELETE FROM verdict_cache WHERE cache_key IN (
+               SELECT cache_key FROM verdict_cache
+               QUALIFY ROW_NUMBER() OVER (ORDER BY created_at DESC) > %s
+           )""",
+        (max_rows,),
+    )
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def find_scam_templates(band_keys: list, min_created_at: str) -> list:
+    """Templates created at/after min_created_at sharing at least one band key: [{msg_hash, signature, result_json}]."""
+    if not band_keys:
+        return []
+    conn = get_conn()
+    cur = conn.cursor()
+    placeholders = ", ".join("%s" for _ in band_keys)
+    cur.execute(
+        f"""SELECT t.msg_hash, t.signature, t.result_json FROM scam_templates t
+            WHERE t.created_at >= %s AND t.msg_hash IN (
+                SELECT msg_hash FROM scam_template_bands WHERE band_key IN ({placeholders})
+            )""",
+        (min_created_at, *band_keys),
+    )
+    rows = cur.fetchall()
+    cur.close()
+    conn.close()
+    return [
+        {
+            "msg_hash": _val(r, "msg_hash", "MSG_HASH"),
+            "signature": _val(r, "signature", "SIGNATURE"),
+            "result_json": _val(r, "result_json", "RESULT_JSON"),
+        }
+        for r in rows
+    ]
+
+
+def put_scam_template(msg_hash: str, signature: str, band_keys: list, result_json: str) -> None:
+    """Insert or refresh a template and its band rows."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        """MERGE INTO scam_templates t
+           USING (SELECT %s AS msg_hash, %s AS signature, %s AS result_json) s
+           ON t.msg_hash = s.msg_hash
+           WHEN MATCHED THEN UPDATE SET result_json = s.result_json, created_at = SYSDATE()
+           WHEN NOT MATCHED THEN INSERT (msg_hash, signature, result_json, created_at)
+               VALUES (s.msg_hash, s.signature, s.result_json, SYSDATE())""",
+        (msg_hash, signature, result_json),
+    )
+    cur.execute("DELETE FROM scam_template_bands WHERE msg_hash = %s", (msg_hash,))
+    cur.executemany(
+        "INSERT INTO scam_template_bands (band_key, msg_hash) VALUES (%s, %s)",
+        [(k, msg_hash) for k in band_keys],
+    )
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def prune_scam_templates(min_created_at: str, max_rows: int) -> None:
+    """Drop expired templates, keep only the newest max_rows, and remove their band rows."""
     conn = get_conn()
     cur = conn.cursor()
-    cur.execute("UPDATE app_settings SET value = %s WHERE key = %s", (value, key))
-    if cur.rowcount == 0:
-        cur.execute("INSERT INTO app_settings (key, value) VALUES (%s, %s)", (key, value))
+    cur.execute("DELETE FROM scam_templates WHERE created_at < %s", (min_created_at,))
+    cur.execute(
+        """DELETE FROM scam_templates WHERE msg_hash IN (
+               SELECT msg_hash FROM scam_templates
+               QUALIFY ROW_NUMBER() OVER (ORDER BY created_at DESC) > %s
+           )""",
+        (max_rows,),
+    )
+    cur.execute("DELETE FROM scam_template_bands WHERE msg_hash NOT IN (SELECT msg_hash FROM scam_templates)")
     conn.commit()
     cur.close()
     conn.close()
+
+
+def record_indicators(rows: list, msg_hash: str) -> int:
+    """Add one SCAM sighting for each (indicator_key, kind) in rows not already reported for msg_hash: one
+    multi-statement request in a transaction. Returns how many were counted."""
+    if not rows:
+        return 0
+    values = ", ".join("(%s, %s)" for _ in rows)
+    flat = tuple(v for row in rows for v in row)
+    new = f"""SELECT v.column1 AS indicator_key, v.column2 AS kind FROM VALUES {values} v
+              WHERE NOT EXISTS (SELECT 1 FROM indicator_reports r WHERE r.indicator_key = v.column1 AND r.msg_hash = %s)"""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(f"SELECT COUNT(*) AS n FROM ({new})", flat + (msg_hash,))
+    counted = int(_val(cur.fetchone(), "n", "N") or 0)
+    if counted:
+        cur.execute(
+            f"""BEGIN;
+               MERGE INTO indicators i
+               USING ({new}) s
+               ON i.indicator_key = s.indicator_key
+               WHEN MATCHED THEN UPDATE SET scam_count = i.scam_count + 1, last_seen = SYSDATE()
+               WHEN NOT MATCHED THEN INSERT (indicator_key, kind, scam_count, first_seen, last_seen)
+                   VALUES (s.indicator_key, s.kind, 1, SYSDATE(), SYSDATE());
+               INSERT INTO indicator_reports (indicator_key, msg_hash, created_at) SELECT indicator_key, %s, SYSDATE() FROM ({new});
+               COMMIT;""",
+            flat + (msg_hash,) + (msg_hash,) + flat + (msg_hash,),
+            num_statements=4,
+        )
+    cur.close()
+    conn.close()
+    return counted
+
+
+def get_indicator_counts(keys: list) -> dict:
+    """{indicator_key: scam_count} for the keys that exist."""
+    if not keys:
+        return {}
+    conn = get_conn()
+    cur = conn.cursor()
+    placeholders = ", ".join("%s" for _ in keys)
+    cur.execute(f"SELECT indicator_key, scam_count FROM indicators WHERE indicator_key IN ({placeholders})", tuple(keys))
+    rows = cur.fetchall()
+    cur.close()
+    conn.close()
+    return {_val(r, "indicator_key", "INDICATOR_KEY"): int(_val(r, "scam_count", "SCAM_COUNT") or 0) for r in rows}
+
+
+def list_indicator_keys(since: str = "") -> list:
+    """Keys of indicators seen at/after since (all when since is empty)."""
+    conn = get_conn()
+    cur = conn.cursor()
+    if since:
+        cur.execute("SELECT indicator_key FROM indicators WHERE last_seen >= %s", (since,))
+    else:
+        cur.execute("SELECT indicator_key FROM indicators")
+    rows = cur.fetchall()
+    cur.close()
+    conn.close()
+    return [_val(r, "indicator_key", "INDICATOR_KEY") for r in rows]
+
+
+def insert_learning_example(features: str, channel: str, verdict: str) -> None:
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT INTO learning_features (features, channel, verdict) VALUES (%s, %s, %s)",
+        (features, channel or "", verdict),
+    )
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def list_learning_examples(limit: int = 200000) -> list:
+    """Newest examples first: [{features, channel, verdict}]."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT features, channel, verdict FROM learning_features ORDER BY id DESC LIMIT %s", (limit,))
+    rows = cur.fetchall()
+    cur.close()
+    conn.close()
+    return [
+        {
+            "features": _val(r, "features", "FEATURES") or "",
+            "channel": _val(r, "channel", "CHANNEL") or "",
+            "verdict": _val(r, "verdict", "VERDICT") or "",
+        }
+        for r in rows
+    ]
@@ -1,8 +1,49 @@
 """CRUD for CheckMoYan when using SQLite (no SNOWFLAKE in secrets)."""
-from ._sqlite_schema import get_conn
+import json
+import time
+from ._sqlite_schema import get_conn, rebuild_scan_rollup as _rebuild_scan_rollup
 from datetime import datetime
 
 
+_SCAN_COLUMNS = (
+    "email, verdict, confidence, category, signals_json, msg_hash, "
+    "latency_ms, prompt_tokens, completion_tokens, model, source, stages_json"
+)
+
+
+def _scan_values(email, verdict, confidence, category, signals_json, msg_hash, metrics=None) -> tuple:
+    """Column values for one scans row; metrics is services.metrics' per-check summary (NULLs when absent)."""
+    m = metrics or {}
+    return (
+        email.strip().lower(), verdict, confidence, category or "", signals_json, msg_hash or "",
+        int(round(m["total_ms"])) if m.get("total_ms") is not None else None,
+        m.get("prompt_tokens"), m.get("completion_tokens"), m.get("model") or None, m.get("source") or None,
+        json.dumps(m["stages"], separators=(",", ":")) if m.get("stages") else None,
+    )
+
+
+# app_settings row bumped by every set_app_setting, so other processes can tell their cached settings are stale
+SETTINGS_VERSION_KEY = "settings_version"
+
+_ROLLUP_UPSERT = """INSERT INTO scan_daily_rollup (date, category, verdict, count) VALUES (?, ?, ?, ?)
+   ON CONFLICT(date, category, verdict) DO UPDATE SET count = count + excluded.count"""
+
+
+def _rollup_values(scans: list) -> list:
+    """(date, category, verdict, count) per distinct triple in scans [(date, category, verdict)]."""
+    counts = {}
+    for day, category, verdict in scans:
+        key = (day, category or "", verdict)
+        counts[key] = counts.get(key, 0) + 1
+    return [(day, category, verdict, n) for (day, category, verdict), n in counts.items()]
+
+
+def _row_times(row: dict, now: float) -> tuple:
+    """(ts epoch seconds, scan_date) of a queued scan row: when the check ran, else now (both UTC)."""
+    ts = row.get("ts") or now
+    return int(ts), row.get("scan_date") or datetime.utcfromtimestamp(ts).strftime("%Y-%m-%d")
+
+
 def ensure_user(email: str) -> None:
     conn = get_conn()
     cur = conn.cursor()
@@ -39,20 +80,43 @@ def set_user_plan(email: str, plan: str, premium_until: str = None) -> None:
     conn.close()
 
 
-def record_usage(email: str) -> None:
+def record_usage(email: str, count: int = 1) -> None:
     ensure_user(email)
     today = datetime.utcnow().strftime("%Y-%m-%d")
     conn = get_conn()
     cur = conn.cursor()
     cur.execute(
-        """INSERT INTO usage (email, date, checks_count) VALUES (?, ?, 1)
-           ON CONFLICT(email, date) DO UPDATE SET checks_count = checks_count + 1""",
-        (email.strip().lower(), today),
+        """INSERT INTO usage (email, date, checks_count) VALUES (?, ?, ?)
+           ON CONFLICT(email, date) DO UPDATE SET checks_count = checks_count + excluded.checks_count""",
+        (email.strip().lower(), today, count),
     )
     conn.commit()
     conn.close()
 
 
+def _apply_usages(cur, rows: list) -> None:
+    cur.executemany(
+        "INSERT OR IGNORE INTO users (email, plan) VALUES (?, 'free')",
+        [(e,) for e in sorted({r["email"].strip().lower() for r in rows})],
+    )
+    cur.executemany(
+        """INSERT INTO usage (email, date, checks_count) VALUES (?, ?, ?)
+           ON CONFLICT(email, date) DO UPDATE SET checks_count = checks_count + excluded.checks_count""",
+        [(r["email"].strip().lower(), r["date"], r["count"]) for r in rows],
+    )
+
+
+def record_usages(rows: list) -> None:
+    """Apply many usage increments (dicts with email, date, count) and create missing users, in one transaction."""
+    if not rows:
+        return
+    conn = get_conn()
+    cur = conn.cursor()
+    _apply_usages(cur, rows)
+    conn.commit()
+    conn.close()
+
+
 def get_usage_today(email: str) -> int:
     today = datetime.utcnow().strftime("%Y-%m-%d")
     conn = get_conn()
@@ -73,30 +137,110 @@ def insert_scan(
     category: str,
     signals_json: str,
     msg_hash: str,
+    metrics: dict = None,
+) -> int:
+    today = datetime.utcnow().strftime("%Y-%m-%d")
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        f"INSERT INTO scans ({_SCAN_COLUMNS}, scan_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        _scan_values(email, verdict, confidence, category, signals_json, msg_hash, metrics) + (today,),
+    )
+    sid = cur.lastrowid
+    cur.execute(_ROLLUP_UPSERT, (today, category or "", verdict, 1))
+    conn.commit()
+    conn.close()
+    return sid
+
+
+def record_check_atomic(
+    email: str,
+    verdict: str,
+    confidence: int,
+    category: str,
+    signals_json: str,
+    msg_hash: str,
+    metrics: dict = None,
 ) -> int:
+    """Create the user if missing, add one check to today's usage and insert the scan, in one transaction; return scan id."""
+    email = email.strip().lower()
+    today = datetime.utcnow().strftime("%Y-%m-%d")
     conn = get_conn()
     cur = conn.cursor()
+    cur.execute("INSERT OR IGNORE INTO users (email, plan) VALUES (?, 'free')", (email,))
     cur.execute(
-        """INSERT INTO scans (email, verdict, confidence, category, signals_json, msg_hash)
-           VALUES (?, ?, ?, ?, ?, ?)""",
-        (email.strip().lower(), verdict, confidence, category or "", signals_json, msg_hash or ""),
+        """INSERT INTO usage (email, date, checks_count) VALUES (?, ?, 1)
+           ON CONFLICT(email, date) DO UPDATE SET checks_count = checks_count + 1""",
+        (email, today),
+    )
+    cur.execute(
+        f"INSERT INTO scans ({_SCAN_COLUMNS}, scan_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        _scan_values(email, verdict, confidence, category, signals_json, msg_hash, metrics) + (today,),
     )
     sid = cur.lastrowid
+    cur.execute(_ROLLUP_UPSERT, (today, category or "", verdict, 1))
     conn.commit()
     conn.close()
     return sid
 
 
+def _insert_scan_rows(cur, rows: list) -> None:
+    now = time.time()
+    times = [_row_times(r, now) for r in rows]
+    cur.executemany(
+        f"""INSERT INTO scans ({_SCAN_COLUMNS}, ts, scan_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime(?, 'unixepoch'), ?)""",
+        [
+            _scan_values(r["email"], r["verdict"], r["confidence"], r.get("category"), r["signals_json"], r.get("msg_hash"), r.get("metrics"))
+            + t
+            for r, t in zip(rows, times)
+        ],
+    )
+    cur.executemany(
+        _ROLLUP_UPSERT, _rollup_values([(day, r.get("category"), r["verdict"]) for r, (_, day) in zip(rows, times)])
+    )
+
+
+def insert_scans(rows: list) -> None:
+    """Insert many scan rows (dicts with insert_scan's fields, plus optional ts (epoch seconds) and scan_date
+    for when the check ran) in one transaction."""
+    if not rows:
+        return
+    conn = get_conn()
+    cur = conn.cursor()
+    _insert_scan_rows(cur, rows)
+    conn.commit()
+    conn.close()
+
+
+def record_checks_atomic(usage_rows: list, scan_rows: list) -> None:
+    """record_usages and insert_scans in one transaction: usage and scans land together or not at all."""
+    if not usage_rows and not scan_rows:
+        return
+    conn = get_conn()
+    cur = conn.cursor()
+    if usage_rows:
+        _apply_usages(cur, usage_rows)
+    if scan_rows:
+        _insert_scan_rows(cur, scan_rows)
+    conn.commit()
+    conn.close()
+
+
 def get_stats_today() -> dict:
     today = datetime.utcnow().strftime("%Y-%m-%d")
     conn = get_conn()
     cur = conn.cursor()
-    cur.execute("SELECT COUNT(*) AS n FROM scans WHERE date(ts) = ?", (today,))
-    messages_analyzed = cur.fetchone()["n"]
-    cur.execute("SELECT COUNT(*) AS n FROM scans WHERE date(ts) = ? AND verdict = 'SCAM'", (today,))
-    scams_detected = cur.fetchone()["n"]
+    # A few rollup rows per day, however many scans there are
     cur.execute(
-        """SELECT category, COUNT(*) AS c FROM scans WHERE date(ts) = ? AND category != ''
+        """SELECT COALESCE(SUM(count), 0) AS n, COALESCE(SUM(CASE WHEN verdict = 'SCAM' THEN count END), 0) AS scams
+           FROM scan_daily_rollup WHERE date = ?""",
+        (today,),
+    )
+    row = cur.fetchone()
+    messages_analyzed, scams_detected = row["n"], row["scams"]
+    cur.execute(
+        """SELECT category, SUM(count) AS c FROM scan_daily_rollup WHERE date = ? AND category != ''
            GROUP BY category ORDER BY c DESC LIMIT 1""",
         (today,),
     )
@@ -114,8 +258,8 @@ def get_trending_categories(limit: int = 5) -> list:
     conn = get_conn()
     cur = conn.cursor()
     cur.execute(
-        """SELECT category, COUNT(*) AS count FROM scans
-           WHERE date(ts) >= date('now', '-7 days') AND category != ''
+        """SELECT category, SUM(count) AS count FROM scan_daily_rollup
+           WHERE date >= date('now', '-7 days') AND category != ''
            GROUP BY category ORDER BY count DESC LIMIT ?""",
         (limit,),
     )
@@ -124,6 +268,39 @@ def get_trending_categories(limit: int = 5) -> list:
     return [{"category": r["category"], "count": r["count"]} for r in rows]
 
 
+def get_recent_alerts(limit: int = 10) -> list:
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT category, summary, ts FROM community_alerts ORDER BY ts DESC LIMIT ?", (limit,))
+    rows = cur.fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def rebuild_scan_rollup() -> None:
+    """Recompute scan_daily_rollup from all scans (backfill or repair)."""
+    conn = get_conn()
+    cur = conn.cursor()
+    _rebuild_scan_rollup(cur)
+    conn.commit()
+    conn.close()
+
+
+def get_slowest_scans(hours: int = 24, limit: int = 10) -> list:
+    """Slowest recent scans with their stage timings (only rows that carry metrics)."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        """SELECT ts, verdict, source, model, latency_ms, prompt_tokens, completion_tokens, stages_json FROM scans
+           WHERE ts >= datetime('now', ?) AND latency_ms IS NOT NULL
+           ORDER BY latency_ms DESC LIMIT ?""",
+        (f"-{int(hours)} hours", limit),
+    )
+    rows = cur.fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
 def insert_upgrade_request(
     email: str,
     plan: str,
@@ -195,11 +372,185 @@ def get_app_setting(key: str) -> str:
 
 
 def set_app_setting(key: str, value: str) -> None:
+    """Upsert a setting and bump the settings version in the same transaction."""
     conn = get_conn()
     cur = conn.cursor()
     cur.execute(
         "INSERT INTO app_settings (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
         (key, value),
     )
+    cur.execute(
+        """INSERT INTO app_settings (key, value) VALUES (?, '1')
+           ON CONFLICT(key) DO UPDATE SET value = CAST(CAST(value AS INTEGER) + 1 AS TEXT)""",
+        (SETTINGS_VERSION_KEY,),
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_cached_verdict(cache_key: str, min_created_at: str) -> tuple:
+    """Return (result JSON, age in seconds) for cache_key if created at/after min_created_at, else ("", 0.0)."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        """SELECT result_json, (julianday('now') - julianday(created_at)) * 86400.0 AS age_seconds
+           FROM verdict_cache WHERE cache_key = ? AND created_at >= ?""",
+        (cache_key, min_created_at),
+    )
+    row = cur.fetchone()
+    conn.close()
+    if not row or not row["result_json"]:
+        return "", 0.0
+    return row["result_json"], max(0.0, float(row["age_seconds"] or 0.0))
+
+
+def put_cached_verdict(cache_key: str, msg_hash: str, prompt_version: str, result_json: str) -> None:
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        """INSERT INTO verdict_cache (cache_key, msg_hash, prompt_version, result_json, created_at)
+           VALUES (?, ?, ?, ?, datetime('now'))
+           ON CONFLICT(cache_key) DO UPDATE SET result_json = excluded.result_json, created_at = excluded.created_at""",
+        (cache_key, msg_hash, prompt_version, result_json),
+    )
+    conn.commit()
+    conn.close()
+
+
+def prune_verdict_cache(min_created_at: str, max_rows: int) -> None:
+    """Drop expired cache rows, then keep only the newest max_rows."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM verdict_cache WHERE created_at < ?", (min_created_at,))
+    cur.execute(
+        """DELETE FROM verdict_cache WHERE cache_key NOT IN (
+               SELECT cache_key FROM verdict_cache ORDER BY created_at DESC LIMIT ?
+           )""",
+        (max_rows,),
+    )
+    conn.commit()
+    conn.close()
+
+
+def find_scam_templates(band_keys: list, min_created_at: str) -> list:
+    """Templates created at/after min_created_at sharing at least one band key: [{msg_hash, signature, result_json}]."""
+    if not band_keys:
+        return []
+    conn = get_conn()
+    cur = conn.cursor()
+    placeholders = ", ".join("?" for _ in band_keys)
+    cur.execute(
+        f"""SELECT t.msg_hash, t.signature, t.result_json FROM scam_templates t
+            WHERE t.created_at >= ? AND t.msg_hash IN (
+                SELECT msg_hash FROM scam_template_bands WHERE band_key IN ({placeholders})
+            )""",
+        (min_created_at, *band_keys),
+    )
+    rows = cur.fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def put_scam_template(msg_hash: str, signature: str, band_keys: list, result_json: str) -> None:
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        """INSERT INTO scam_templates (msg_hash, signature, result_json, created_at)
+           VALUES (?, ?, ?, datetime('now'))
+           ON CONFLICT(msg_hash) DO UPDATE SET result_json = excluded.result_json, created_at = excluded.created_at""",
+        (msg_hash, signature, result_json),
+    )
+    cur.executemany(
+        "INSERT OR IGNORE INTO scam_template_bands (band_key, msg_hash) VALUES (?, ?)",
+        [(k, msg_hash) for k in band_keys],
+    )
     conn.commit()
     conn.close()
+
+
+def prune_scam_templates(min_created_at: str, max_rows: int) -> None:
+    """Drop expired templates, keep only the newest max_rows, and remove their band rows."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM scam_templates WHERE created_at < ?", (min_created_at,))
+    cur.execute(
+        """DELETE FROM scam_templates WHERE msg_hash NOT IN (
+               SELECT msg_hash FROM scam_templates ORDER BY created_at DESC LIMIT ?
+           )""",
+        (max_rows,),
+    )
+    cur.execute("DELETE FROM scam_template_bands WHERE msg_hash NOT IN (SELECT msg_hash FROM scam_templates)")
+    conn.commit()
+    conn.close()
+
+
+def record_indicators(rows: list, msg_hash: str) -> int:
+    """Add one SCAM sighting for each (indicator_key, kind) in rows not already reported for msg_hash, in one
+    transaction. Returns how many were counted."""
+    if not rows:
+        return 0
+    conn = get_conn()
+    cur = conn.cursor()
+    counted = 0
+    for indicator_key, kind in rows:
+        cur.execute(
+            "INSERT OR IGNORE INTO indicator_reports (indicator_key, msg_hash) VALUES (?, ?)",
+            (indicator_key, msg_hash),
+        )
+        if cur.rowcount:
+            cur.execute(
+                """INSERT INTO indicators (indicator_key, kind, scam_count) VALUES (?, ?, 1)
+                   ON CONFLICT(indicator_key) DO UPDATE SET scam_count = scam_count + 1, last_seen = datetime('now')""",
+                (indicator_key, kind),
+            )
+            counted += 1
+    conn.commit()
+    conn.close()
+    return counted
+
+
+def get_indicator_counts(keys: list) -> dict:
+    """{indicator_key: scam_count} for the keys that exist."""
+    if not keys:
+        return {}
+    conn = get_conn()
+    cur = conn.cursor()
+    placeholders = ", ".join("?" for _ in keys)
+    cur.execute(f"SELECT indicator_key, scam_count FROM indicators WHERE indicator_key IN ({placeholders})", tuple(keys))
+    rows = cur.fetchall()
+    conn.close()
+    return {r["indicator_key"]: r["scam_count"] for r in rows}
+
+
+def list_indicator_keys(since: str = "") -> list:
+    """Keys of indicators seen at/after since (all when since is empty)."""
+    conn = get_conn()
+    cur = conn.cursor()
+    if since:
+        cur.execute("SELECT indicator_key FROM indicators WHERE last_seen >= ?", (since,))
+    else:
+        cur.execute("SELECT indicator_key FROM indicators")
+    rows = cur.fetchall()
+    conn.close()
+    return [r["indicator_key"] for r in rows]
+
+
+def insert_learning_example(features: str, channel: str, verdict: str) -> None:
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT INTO learning_features (features, channel, verdict) VALUES (?, ?, ?)",
+        (features, channel or "", verdict),
+    )
+    conn.commit()
+    conn.close()
+
+
+def list_learning_examples(limit: int = 200000) -> list:
+    """Newest examples first: [{features, channel, verdict}]."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT features, channel, verdict FROM learning_features ORDER BY id DESC LIMIT ?", (limit,))
+    rows = cur.fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
@@ -33,3 +33,22 @@ def init_db():
 def get_param_style():
     """Return placeholder for parameterized queries: %s for Snowflake, ? for SQLite."""
     return "%s" if _use_snowflake() else "?"
+
+
+def pool_stats() -> dict:
+    """Connection pool counters of the active backend, plus "backend" ("snowflake" or "sqlite")."""
+    if _use_snowflake():
+        from .snowflake_schema import pool_stats as sf_pool_stats
+        return {"backend": "snowflake", **sf_pool_stats()}
+    from . import _sqlite_schema
+    return {"backend": "sqlite", **_sqlite_schema.pool_stats()}
+
+
+def close_pool() -> None:
+    """Close idle pooled connections of the active backend (e.g. on shutdown)."""
+    if _use_snowflake():
+        from .snowflake_schema import close_pool as sf_close_pool
+        sf_close_pool()
+        return
+    from . import _sqlite_schema
+    _sqlite_schema.close_pool()
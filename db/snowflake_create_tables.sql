@@ -31,13 +31,48 @@ CREATE TABLE IF NOT EXISTS scans (
     id INTEGER NOT NULL PRIMARY KEY DEFAULT scans_seq.NEXTVAL,
     email VARCHAR(255) NOT NULL,
     ts TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP(),
+    scan_date DATE,
     verdict VARCHAR(50) NOT NULL,
     confidence INTEGER NOT NULL,
     category VARCHAR(255),
     signals_json VARCHAR(65535),
-    msg_hash VARCHAR(255)
+    msg_hash VARCHAR(255),
+    latency_ms INTEGER,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    model VARCHAR(64),
+    source VARCHAR(32),
+    stages_json VARCHAR(4096)
 );
 
+-- Existing deployments: scan_date plus per-check latency and token usage columns
+ALTER TABLE scans ADD COLUMN IF NOT EXISTS scan_date DATE;
+ALTER TABLE scans ADD COLUMN IF NOT EXISTS latency_ms INTEGER;
+ALTER TABLE scans ADD COLUMN IF NOT EXISTS prompt_tokens INTEGER;
+ALTER TABLE scans ADD COLUMN IF NOT EXISTS completion_tokens INTEGER;
+ALTER TABLE scans ADD COLUMN IF NOT EXISTS model VARCHAR(64);
+ALTER TABLE scans ADD COLUMN IF NOT EXISTS source VARCHAR(32);
+ALTER TABLE scans ADD COLUMN IF NOT EXISTS stages_json VARCHAR(4096);
+UPDATE scans SET scan_date = TO_DATE(ts) WHERE scan_date IS NULL;
+
+-- Snowflake has no secondary indexes: filters on scan_date prune micro-partitions, which rows inserted in time
+-- order already cluster by. Once scans is large, a clustering key keeps that true (automatic clustering uses credits):
+-- ALTER TABLE scans CLUSTER BY (scan_date);
+
+-- Scans per day, category and verdict; the app updates it with every scan insert and reads stats/trending from it
+CREATE TABLE IF NOT EXISTS scan_daily_rollup (
+    date DATE NOT NULL,
+    category VARCHAR(255) NOT NULL DEFAULT '',
+    verdict VARCHAR(50) NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (date, category, verdict)
+);
+-- Backfill from existing scans (or: python -m db.queries rebuild-rollup)
+-- DELETE FROM scan_daily_rollup;
+-- INSERT INTO scan_daily_rollup (date, category, verdict, count)
+--     SELECT scan_date, COALESCE(category, ''), verdict, COUNT(*) FROM scans
+--     WHERE scan_date IS NOT NULL GROUP BY scan_date, COALESCE(category, ''), verdict;
+
 -- ========== UPGRADE_REQUESTS ==========
 CREATE SEQUENCE IF NOT EXISTS upgrade_requests_seq START 1 INCREMENT 1;
 
@@ -69,3 +104,56 @@ CREATE TABLE IF NOT EXISTS app_settings (
     key VARCHAR(255) PRIMARY KEY,
     value VARCHAR(65535) NOT NULL DEFAULT ''
 );
+
+-- ========== VERDICT_CACHE (analysis results keyed by msg_hash + prompt/model version) ==========
+-- created_at here and in scam_templates / indicators is UTC (SYSDATE()); the app compares it with UTC cutoffs
+CREATE TABLE IF NOT EXISTS verdict_cache (
+    cache_key VARCHAR(255) PRIMARY KEY,
+    msg_hash VARCHAR(255) NOT NULL,
+    prompt_version VARCHAR(64) NOT NULL,
+    result_json VARCHAR(65535) NOT NULL,
+    created_at TIMESTAMP_NTZ DEFAULT SYSDATE()
+);
+
+-- ========== SCAM_TEMPLATES (MinHash signatures of confirmed scams, for near-duplicate matching) ==========
+CREATE TABLE IF NOT EXISTS scam_templates (
+    msg_hash VARCHAR(255) PRIMARY KEY,
+    signature VARCHAR(1024) NOT NULL,
+    result_json VARCHAR(65535) NOT NULL,
+    created_at TIMESTAMP_NTZ DEFAULT SYSDATE()
+);
+
+-- One row per (LSH band key, template) for candidate lookup
+CREATE TABLE IF NOT EXISTS scam_template_bands (
+    band_key VARCHAR(64) NOT NULL,
+    msg_hash VARCHAR(255) NOT NULL,
+    PRIMARY KEY (band_key, msg_hash)
+);
+
+-- ========== INDICATORS (HMAC keys of link domains / phone numbers seen in SCAM verdicts; no raw values) ==========
+CREATE TABLE IF NOT EXISTS indicators (
+    indicator_key VARCHAR(64) PRIMARY KEY,
+    kind VARCHAR(20) NOT NULL,
+    scam_count INTEGER NOT NULL DEFAULT 0,
+    first_seen TIMESTAMP_NTZ DEFAULT SYSDATE(),
+    last_seen TIMESTAMP_NTZ DEFAULT SYSDATE()
+);
+
+-- One row per (indicator, message that was judged SCAM): a message re-checked is counted once
+CREATE TABLE IF NOT EXISTS indicator_reports (
+    indicator_key VARCHAR(64) NOT NULL,
+    msg_hash VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP_NTZ DEFAULT SYSDATE(),
+    PRIMARY KEY (indicator_key, msg_hash)
+);
+
+-- ========== LEARNING_FEATURES (opt-in hashed feature vectors + final verdict; no message text) ==========
+CREATE SEQUENCE IF NOT EXISTS learning_features_seq START 1 INCREMENT 1;
+
+CREATE TABLE IF NOT EXISTS learning_features (
+    id INTEGER NOT NULL PRIMARY KEY DEFAULT learning_features_seq.NEXTVAL,
+    features VARCHAR(65535) NOT NULL,
+    channel VARCHAR(50),
+    verdict VARCHAR(50) NOT NULL,
+    created_at TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()
+);
@@ -1,7 +1,32 @@
-"""Snowflake schema and connection. Credentials from .streamlit/secrets.toml [SNOWFLAKE]."""
+"""Snowflake schema and connection. Credentials from .streamlit/secrets.toml [SNOWFLAKE].
+
+Sessions are pooled: connecting means a login and session setup (and often a warehouse resume), which
+costs far more than the queries behind a check. get_conn() reuses an idle authenticated session and
+close() returns it. Sessions are kept alive by the connector's heartbeat, re-validated with SELECT 1
+after sitting idle, and recycled after MAX_AGE_SECONDS.
+"""
+import atexit
+import threading
+import time
+
 import streamlit as st
 from snowflake.connector import DictCursor
 
+POOL_MAX_IDLE = 4
+MAX_AGE_SECONDS = 3600
+VALIDATE_AFTER_IDLE_SECONDS = 300
+
+# scans columns added after the first release (see _sqlite_schema.SCAN_ADDED_COLUMNS)
+SCAN_ADDED_COLUMNS = {
+    "scan_date": "DATE",
+    "latency_ms": "INTEGER",
+    "prompt_tokens": "INTEGER",
+    "completion_tokens": "INTEGER",
+    "model": "VARCHAR(64)",
+    "source": "VARCHAR(32)",
+    "stages_json": "VARCHAR(4096)",
+}
+
 
 def _get_config():
     """Read Snowflake config from secrets. Returns dict or None if not configured."""
@@ -30,24 +55,134 @@ def _get_config():
     return None
 
 
+_pool_lock = threading.Lock()
+_idle = []  # (config key, raw connection, created_at, returned_at), most recently returned last
+_stats = {"opened": 0, "reused": 0, "discarded": 0, "failed_checks": 0}
+
+
+def _sql_ends_txn(sql: str) -> bool:
+    return sql.rstrip().rstrip(";").rstrip().upper().endswith(("COMMIT", "ROLLBACK"))
+
+
+def _sql_opens_txn(sql: str) -> bool:
+    upper = sql.upper()
+    return "BEGIN" in upper or "START TRANSACTION" in upper
+
+
+class _TrackedCursor:
+    """DictCursor proxy that tells its wrapper when a statement opened a transaction (sessions are autocommit,
+    so only an explicit BEGIN does) and when one ended with COMMIT/ROLLBACK."""
+    def __init__(self, cur, owner):
+        self._cur = cur
+        self._owner = owner
+    def execute(self, sql, *args, **kwargs):
+        if _sql_opens_txn(sql):
+            self._owner._in_txn = True
+        out = self._cur.execute(sql, *args, **kwargs)
+        if _sql_ends_txn(sql):
+            self._owner._in_txn = False
+        return out
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+    def __iter__(self):
+        return iter(self._cur)
+
+
 class _SnowflakeConnWrapper:
-    """Wraps Snowflake connection so cursor() returns DictCursor (dict-like rows)."""
-    def __init__(self, conn):
+    """Wraps Snowflake connection so cursor() returns DictCursor (dict-like rows); close() returns it to the pool."""
+    def __init__(self, conn, key=None, created_at=None):
         self._conn = conn
+        self._key = key
+        self._created_at = created_at if created_at is not None else time.monotonic()
+        self._in_txn = False
     def cursor(self):
-        return self._conn.cursor(DictCursor)
+        return _TrackedCursor(self._conn.cursor(DictCursor), self)
     def commit(self):
-        return self._conn.commit()
+        out = self._conn.commit()
+        self._in_txn = False
+        return out
     def close(self):
-        return self._conn.close()
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            _release(conn, self._key, self._created_at, self._in_txn)
+
+
+def _discard(conn) -> None:
+    with _pool_lock:
+        _stats["discarded"] += 1
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def _release(conn, key, created_at: float, in_txn: bool = False) -> None:
+    """Back to the pool unless closed, too old, or the pool is full. A transaction left open (BEGIN without
+    COMMIT, e.g. after an error) is rolled back; autocommit-only sessions skip that round trip."""
+    try:
+        if conn.is_closed():
+            return
+        if in_txn:
+            conn.rollback()
+    except Exception:
+        _discard(conn)
+        return
+    now = time.monotonic()
+    with _pool_lock:
+        if now - created_at < MAX_AGE_SECONDS and len(_idle) < POOL_MAX_IDLE:
+            _idle.append((key, conn, created_at, now))
+            return
+    _discard(conn)
+
+
+def _healthy(conn, returned_at: float) -> bool:
+    """Cheap checks always; a SELECT 1 round trip only for sessions idle long enough to have expired."""
+    try:
+        if conn.is_closed():
+            return False
+        if time.monotonic() - returned_at < VALIDATE_AFTER_IDLE_SECONDS:
+            return True
+        cur = conn.cursor()
+        cur.execute("SELECT 1")
+        cur.fetchone()
+        cur.close()
+        return True
+    except Exception:
+        with _pool_lock:
+            _stats["failed_checks"] += 1
+        return False
+
+
+def _checkout(key):
+    """An idle healthy session for this config, or (None, None)."""
+    while True:
+        now = time.monotonic()
+        with _pool_lock:
+            found = None
+            for i in range(len(_idle) - 1, -1, -1):
+                if _idle[i][0] == key:
+                    found = _idle.pop(i)
+                    break
+        if found is None:
+            return None, None
+        _, conn, created_at, returned_at = found
+        if now - created_at < MAX_AGE_SECONDS and _healthy(conn, returned_at):
+            with _pool_lock:
+                _stats["reused"] += 1
+            return conn, created_at
+        _discard(conn)
 
 
 def get_conn():
-    """Return a Snowflake connection (DictCursor). Raises if SNOWFLAKE not in secrets."""
+    """Return a pooled Snowflake connection (DictCursor). Raises if SNOWFLAKE not in secrets."""
     import snowflake.connector
     cfg = _get_config()
     if not cfg:
         raise RuntimeError("SNOWFLAKE not configured in secrets.toml")
+    key = tuple(sorted((k, str(v)) for k, v in cfg.items()))
+    conn, created_at = _checkout(key)
+    if conn is not None:
+        return _SnowflakeConnWrapper(conn, key, created_at)
     conn = snowflake.connector.connect(
         account=cfg["account"],
         user=cfg["user"],
@@ -56,8 +191,32 @@ def get_conn():
         database=cfg["database"],
         schema=cfg["schema"],
         role=cfg.get("role"),
+        # Heartbeat so pooled sessions don't expire while idle
+        client_session_keep_alive=True,
     )
-    return _SnowflakeConnWrapper(conn)
+    with _pool_lock:
+        _stats["opened"] += 1
+    return _SnowflakeConnWrapper(conn, key)
+
+
+def pool_stats() -> dict:
+    """Sessions opened, checkouts served from the pool, sessions discarded, failed health checks, idle sessions."""
+    with _pool_lock:
+        out = dict(_stats)
+        out["idle"] = len(_idle)
+    return out
+
+
+def close_pool() -> None:
+    """Log out idle pooled sessions (e.g. on shutdown)."""
+    with _pool_lock:
+        idle = [conn for _, conn, _, _ in _idle]
+        _idle.clear()
+    for conn in idle:
+        _discard(conn)
+
+
+atexit.register(close_pool)
 
 
 def init_db():
@@ -89,11 +248,31 @@ def init_db():
             id INTEGER NOT NULL PRIMARY KEY DEFAULT scans_seq.NEXTVAL,
             email VARCHAR(255) NOT NULL,
             ts TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP(),
+            scan_date DATE,
             verdict VARCHAR(50) NOT NULL,
             confidence INTEGER NOT NULL,
             category VARCHAR(255),
             signals_json VARCHAR(65535),
-            msg_hash VARCHAR(255)
+            msg_hash VARCHAR(255),
+            latency_ms INTEGER,
+            prompt_tokens INTEGER,
+            completion_tokens INTEGER,
+            model VARCHAR(64),
+            source VARCHAR(32),
+            stages_json VARCHAR(4096)
+        )
+    """)
+    # Tables created before these columns (scan_date filters prune micro-partitions; Snowflake has no secondary indexes)
+    for name, col_type in SCAN_ADDED_COLUMNS.items():
+        cur.execute(f"ALTER TABLE scans ADD COLUMN IF NOT EXISTS {name} {col_type}")
+    # Scans per day, category and verdict, kept up to date in the same transaction as each scan insert
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS scan_daily_rollup (
+            date DATE NOT NULL,
+            category VARCHAR(255) NOT NULL DEFAULT '',
+            verdict VARCHAR(50) NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (date, category, verdict)
         )
     """)
 
@@ -130,13 +309,89 @@ def init_db():
         )
     """)
 
+    # Expiry timestamps (verdict_cache, scam_templates, indicators) are UTC via SYSDATE(): the app compares
+    # them with datetime.utcnow() cutoffs, and CURRENT_TIMESTAMP() follows the session time zone
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS verdict_cache (
+            cache_key VARCHAR(255) PRIMARY KEY,
+            msg_hash VARCHAR(255) NOT NULL,
+            prompt_version VARCHAR(64) NOT NULL,
+            result_json VARCHAR(65535) NOT NULL,
+            created_at TIMESTAMP_NTZ DEFAULT SYSDATE()
+        )
+    """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS scam_templates (
+            msg_hash VARCHAR(255) PRIMARY KEY,
+            signature VARCHAR(1024) NOT NULL,
+            result_json VARCHAR(65535) NOT NULL,
+            created_at TIMESTAMP_NTZ DEFAULT SYSDATE()
+        )
+    """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS scam_template_bands (
+            band_key VARCHAR(64) NOT NULL,
+            msg_hash VARCHAR(255) NOT NULL,
+            PRIMARY KEY (band_key, msg_hash)
+        )
+    """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS indicators (
+            indicator_key VARCHAR(64) PRIMARY KEY,
+            kind VARCHAR(20) NOT NULL,
+            scam_count INTEGER NOT NULL DEFAULT 0,
+            first_seen TIMESTAMP_NTZ DEFAULT SYSDATE(),
+            last_seen TIMESTAMP_NTZ DEFAULT SYSDATE()
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS indicator_reports (
+            indicator_key VARCHAR(64) NOT NULL,
+            msg_hash VARCHAR(255) NOT NULL,
+            created_at TIMESTAMP_NTZ DEFAULT SYSDATE(),
+            PRIMARY KEY (indicator_key, msg_hash)
+        )
+    """)
+
+    cur.execute("CREATE SEQUENCE IF NOT EXISTS learning_features_seq START 1 INCREMENT 1")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS learning_features (
+            id INTEGER NOT NULL PRIMARY KEY DEFAULT learning_features_seq.NEXTVAL,
+            features VARCHAR(65535) NOT NULL,
+            channel VARCHAR(50),
+            verdict VARCHAR(50) NOT NULL,
+            created_at TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()
+        )
+    """)
+
     conn.commit()
     _seed_dummy_data(cur)
+    # Rows from before scan_date existed (and the seed rows)
+    cur.execute("UPDATE scans SET scan_date = TO_DATE(ts) WHERE scan_date IS NULL")
     conn.commit()
+    # First run after the rollup table was added: build it from the existing scans
+    cur.execute("SELECT COUNT(*) AS cnt FROM (SELECT 1 FROM scan_daily_rollup LIMIT 1)")
+    if not _first_value(cur.fetchone()):
+        rebuild_scan_rollup(cur)
     cur.close()
     conn.close()
 
 
+def rebuild_scan_rollup(cur) -> None:
+    """Recompute scan_daily_rollup from scans in one explicit transaction."""
+    cur.execute("BEGIN")
+    cur.execute("DELETE FROM scan_daily_rollup")
+    cur.execute(
+        """INSERT INTO scan_daily_rollup (date, category, verdict, count)
+           SELECT scan_date, COALESCE(category, ''), verdict, COUNT(*) FROM scans
+           WHERE scan_date IS NOT NULL GROUP BY scan_date, COALESCE(category, ''), verdict"""
+    )
+    cur.execute("COMMIT")
+
+
 def _first_value(row):
     """Get first value from a DictCursor row (COUNT(*), NEXTVAL, etc.)."""
     if row is None:
@@ -3,14 +3,21 @@ import os
 import streamlit as st
 from services.auth import is_admin_logged_in, check_admin_password
 from services.payments import get_payment_config
+from services.openai_client import pool_stats as openai_pool_stats
+from services.singleflight import stats as singleflight_stats
+from services.analysis import parse_stats
+from services.async_runner import MAX_IN_FLIGHT, in_flight
+from services import compaction, dashboard_cache, indicators, learning, metrics, near_dup, resilience, routing, write_behind
 from db.queries import (
+    get_slowest_scans,
     list_upgrade_requests,
     update_upgrade_request,
     set_user_plan,
     ensure_user,
     set_payment_config_in_db,
+    set_routing_config_in_db,
 )
-from db.schema import get_conn
+from db.schema import get_conn, pool_stats as db_pool_stats
 
 
 def run():
@@ -152,6 +159,38 @@ def run():
                 st.success("Payment config saved. It will appear on the Pricing page.")
                 st.rerun()
 
+        st.subheader("Model routing")
+        st.caption("Every AI check runs on the fast model first. With escalation on, verdicts whose confidence falls in the band are re-checked by the strong model.")
+        rc = routing.get_config()
+        with st.form("admin_routing_config"):
+            routing_enabled = st.checkbox("Escalate uncertain verdicts to the strong model", value=rc["enabled"], key="admin_routing_enabled")
+            col1, col2 = st.columns(2)
+            with col1:
+                fast_model = st.text_input("Fast model", value=rc["fast_model"], key="admin_fast_model")
+                fast_price_in = st.number_input("Fast input $ / 1M tokens", min_value=0.0, value=float(rc["fast_price_in"]), key="admin_fast_price_in")
+                fast_price_out = st.number_input("Fast output $ / 1M tokens", min_value=0.0, value=float(rc["fast_price_out"]), key="admin_fast_price_out")
+                escalate_min = st.number_input("Escalate from confidence", min_value=0, max_value=100, value=int(rc["escalate_min"]), key="admin_escalate_min")
+            with col2:
+                strong_model = st.text_input("Strong model", value=rc["strong_model"], key="admin_strong_model")
+                strong_price_in = st.number_input("Strong input $ / 1M tokens", min_value=0.0, value=float(rc["strong_price_in"]), key="admin_strong_price_in")
+                strong_price_out = st.number_input("Strong output $ / 1M tokens", min_value=0.0, value=float(rc["strong_price_out"]), key="admin_strong_price_out")
+                escalate_max = st.number_input("Escalate up to confidence", min_value=0, max_value=100, value=int(rc["escalate_max"]), key="admin_escalate_max")
+            if st.form_submit_button("Save model routing"):
+                set_routing_config_in_db({
+                    "enabled": bool(routing_enabled),
+                    "fast_model": (fast_model or "").strip(),
+                    "strong_model": (strong_model or "").strip(),
+                    "escalate_min": escalate_min,
+                    "escalate_max": escalate_max,
+                    "fast_price_in": fast_price_in,
+                    "fast_price_out": fast_price_out,
+                    "strong_price_in": strong_price_in,
+                    "strong_price_out": strong_price_out,
+                })
+                routing.invalidate()
+                st.success("Model routing saved.")
+                st.rerun()
+
     with tab4:
         st.subheader("Stats")
         conn = get_conn()
@@ -163,3 +202,161 @@ def run():
         conn.close()
         st.metric("Total scans", total_scans)
         st.metric("Total users", total_users)
+
+        st.markdown("---")
+        st.subheader("Database connections")
+        dbp = db_pool_stats()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Opened", dbp["opened"])
+        col2.metric("Reused from pool", dbp["reused"])
+        col3.metric("Idle now", dbp["idle"])
+        caption = f"Backend: {dbp['backend']} | Discarded (closed, expired or pool full): {dbp['discarded']}"
+        if "failed_checks" in dbp:
+            caption += f" | Failed health checks: {dbp['failed_checks']}"
+        st.caption(caption)
+
+        st.subheader("Write-behind (usage and scan rows)")
+        wb = write_behind.stats()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Scans written", wb["scans_written"])
+        col2.metric("Flushes", wb["flushes"])
+        col3.metric("Waiting now", wb["pending_scans"])
+        st.caption(
+            f"Enabled: {'yes' if wb['enabled'] else 'no'} | Queued: {wb['queued']} | "
+            f"Usage rows written: {wb['usage_rows_written']} | Failed flushes: {wb['failures']} | Dropped: {wb['dropped']}"
+        )
+
+        st.subheader("Dashboard cache (landing stats, trending, alerts)")
+        dc = dashboard_cache.stats()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Fresh hits", dc["hits"])
+        col2.metric("Stale hits (refreshing)", dc["stale_hits"])
+        col3.metric("Loaded inline", dc["misses"])
+        st.caption(f"Background refreshes: {dc['refreshes']} | Errors: {dc['errors']} | Entries: {dc['entries']}")
+
+        st.markdown("---")
+        st.subheader("OpenAI connection pool")
+        pool = openai_pool_stats()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Open connections", pool["connections"])
+        col2.metric("Idle (keep-alive)", pool["idle_connections"])
+        col3.metric("HTTP/2", "yes" if pool["http2"] else "no")
+        st.caption(
+            f"Requests: {pool['requests']} | Responses: {pool['responses']} | "
+            f"HTTP errors: {pool['errors']} | Clients: {pool['clients_created']} | "
+            f"Analyses in flight: {in_flight()} / {MAX_IN_FLIGHT}"
+        )
+
+        st.subheader("Request coalescing (identical messages)")
+        sf = singleflight_stats()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Upstream calls", sf["leaders"])
+        col2.metric("Coalesced hits", sf["hits"])
+        col3.metric("Waiting now", sf["waiting"])
+        st.caption(f"In flight: {sf['in_flight']} | Max waiting: {sf['max_waiting']} | Leader retries: {sf['leader_gone']}")
+
+        st.subheader("OpenAI circuit breaker")
+        rs = resilience.stats()
+        breaker = rs["breaker"]
+        state_label = {"closed": "🟢 Closed (healthy)", "half_open": "🟡 Half-open (testing)", "open": "🔴 Open (serving local verdicts)"}
+        st.write(f"**State:** {state_label.get(breaker['state'], breaker['state'])} — consecutive failures: {breaker['consecutive_failures']}")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Successes", rs["successes"])
+        col2.metric("Retries", rs["retries"])
+        col3.metric("Failures", rs["failures"])
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Other API errors", rs["errors"])
+        col2.metric("Rejected (breaker open)", rs["rejected"])
+        col3.metric("Local verdicts served", rs["degraded"])
+        if breaker["state"] != "closed" and st.button("Reset breaker", key="admin_reset_breaker"):
+            resilience.breaker.reset()
+            st.rerun()
+
+        st.subheader("Scam template matching (near-duplicates)")
+        nd = near_dup.stats()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Lookups", nd["lookups"])
+        col2.metric("Matched (no AI call)", nd["hits"])
+        col3.metric("Templates indexed", nd["indexed"])
+        st.caption(f"Templates in memory: {nd['in_memory']} | Similarity threshold: {near_dup.SIMILARITY_THRESHOLD:.0%}")
+
+        st.subheader("Reported links and numbers")
+        ind = indicators.stats()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Lookups", ind["lookups"])
+        col2.metric("Answered by Bloom filter", ind["bloom_negative"])
+        col3.metric("Messages with known indicators", ind["known"])
+        st.caption(
+            f"DB lookups: {ind['db_lookups']} | Indicators recorded: {ind['recorded']} | Local verdict at {indicators.REPEAT_OFFENDER_MIN}+ reports"
+            + ("" if ind["enabled"] else " | Off: set INDICATOR_HMAC_KEY in secrets")
+        )
+
+        st.subheader("Model replies")
+        ps = parse_stats()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Replies", ps["responses"])
+        col2.metric("Salvaged (truncated/malformed)", ps["salvaged"])
+        col3.metric("Fallback rate", f"{ps['fallback_rate']:.1%}")
+        st.caption(f"Structured output: {'on' if ps['structured_output'] else 'off (endpoint rejected it)'} | Parsed cleanly: {ps['parsed']} | Fallbacks: {ps['fallback']}")
+
+        st.subheader("Model tiers")
+        rs_tiers = routing.stats()
+        st.caption(f"Escalations to the strong model: {rs_tiers['escalations']}")
+        for tier, ts in rs_tiers["tiers"].items():
+            col1, col2, col3 = st.columns(3)
+            col1.metric(f"{tier.title()} calls", ts["calls"])
+            col2.metric("Avg latency", f"{ts['avg_seconds']:.2f}s")
+            col3.metric("Est. cost", f"${ts['cost_usd']:.4f}")
+            st.caption(f"Max latency: {ts['max_seconds']:.2f}s | Tokens in/out: {ts['prompt_tokens']} / {ts['completion_tokens']}")
+
+        st.subheader("Local classifier")
+        ls = learning.stats()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Predictions", ls["predictions"])
+        col2.metric("Local SCAM verdicts", ls["local_scam"])
+        col3.metric("Examples saved", ls["examples_saved"])
+        if ls["model"]:
+            st.caption(
+                f"Model trained {ls['model'].get('trained_at', '?')} on {ls['model'].get('n_examples', 0)} examples | "
+                f"Holdout precision at {learning.LOCAL_SCAM_THRESHOLD:.0%}: {ls['model'].get('holdout_precision', 0):.1%}"
+            )
+        else:
+            st.caption("No model yet. Train offline with `python -m services.learning train` once enough users opt in.")
+
+        st.subheader("Input compaction")
+        cp = compaction.stats()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Messages sent to AI", cp["requests"])
+        col2.metric("Tokens saved", cp["tokens_saved"])
+        avg_saved = cp["tokens_saved"] / cp["requests"] if cp["requests"] else 0
+        col3.metric("Saved per request", f"{avg_saved:.0f}")
+        st.caption(
+            f"Shortened: {cp['compacted']} | Trimmed to budget ({compaction.token_budget()} tokens): {cp['trimmed']} | "
+            f"Tokens in: {cp['tokens_in']} → sent: {cp['tokens_out']} | Counting: {cp['tokenizer']}"
+        )
+
+        st.subheader("Check latency by stage")
+        ms = metrics.stats()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Checks timed", ms["checks"])
+        total = ms["stages"].get("total")
+        col2.metric("p95 latency", f"{total['p95_ms'] / 1000:.2f}s" if total else "–")
+        col3.metric("p99 latency", f"{total['p99_ms'] / 1000:.2f}s" if total else "–")
+        if ms["stages"]:
+            st.dataframe(
+                [{"stage": stage, **s} for stage, s in ms["stages"].items()],
+                use_container_width=True,
+            )
+        st.caption(
+            "Verdict sources: " + (", ".join(f"{k or 'unknown'} {v}" for k, v in sorted(ms["sources"].items())) or "none yet")
+            + f" | Tokens in/out: {ms['prompt_tokens']} / {ms['completion_tokens']}"
+            + f" | Message tokens saved by compaction: {ms['input_tokens_saved']} | render = drawing streamed results, not in total"
+            + f" | Last {metrics.WINDOW} checks per stage, this process"
+        )
+        try:
+            slowest = get_slowest_scans(hours=24, limit=10)
+        except Exception:
+            slowest = []
+        if slowest:
+            st.caption("Slowest checks in the last 24 hours (stage times in ms):")
+            st.dataframe(slowest, use_container_width=True)
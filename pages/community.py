@@ -1,8 +1,7 @@
 """Community Alerts (Trending Scams): enhanced background, readable theme cards, scam details."""
 import html
 import streamlit as st
-from db.queries import get_trending_categories
-from db.schema import get_conn
+from services import dashboard_cache
 from components.theme import ALERT_RED, BG_CARD, RADIUS, TEXT_MUTED, TEXT_PRIMARY
 
 # Readable text and enhanced Community Alerts background
@@ -75,7 +74,7 @@ def run():
     )
 
     try:
-        trending = get_trending_categories(10)
+        trending = dashboard_cache.trending_categories(10)
     except Exception:
         trending = [
             {"category": "GCash phishing", "count": 12},
@@ -107,11 +106,7 @@ def run():
     st.markdown("---")
     st.subheader("Recent alerts")
     try:
-        conn = get_conn()
-        cur = conn.cursor()
-        cur.execute("SELECT category, summary, ts FROM community_alerts ORDER BY ts DESC LIMIT 10")
-        rows = cur.fetchall()
-        conn.close()
+        rows = dashboard_cache.recent_alerts(10)
         for row in rows:
             cat = _esc(_row_cat(row))
             summary = _esc(_row_summary(row))
@@ -78,7 +78,7 @@ def _render_payment_section(pay, show_full_numbers: bool):
 def run():
     st.title("💰 Pricing & Upgrade")
     pay = get_payment_config()
-    plans = get_plans_config()
+    plans = get_plans_config(pay)
     upgrade_plan = st.session_state.get("upgrade_plan")
     show_payment = st.session_state.get("show_payment_section", False)
     go_to_payment = bool(upgrade_plan or show_payment)
@@ -1,15 +1,134 @@
 """Scam Checker: paste message, channel/language, full AI analysis, explainable verdict, share."""
 import streamlit as st
+import csv
+import io
 import json
+import time
+from services import metrics
 from services.auth import get_email_from_session, set_email_session, validate_email
-from services.usage import can_user_check, get_daily_limit, get_usage_today, record_check
-from services.analysis import analyze_message
+from services.usage import can_user_check, get_active_plan, get_daily_limit, get_usage_today, record_check, record_checks
+from services.analysis import BULK_MAX_MESSAGES, analyze_message, analyze_messages
+from services.learning import record_example
 from components.verdict import verdict_card, share_snippet
 from components.ui import primary_cta, toast_success, toast_error
 from components.theme import ALERT_RED, BG_CARD, BORDER_ACCENT, RADIUS, TEXT_MUTED, TEXT_PRIMARY
 from db.queries import ensure_user
 
 
+def _session_gone() -> bool:
+    """True once this browser session has disconnected, so an in-flight analysis can be cancelled."""
+    try:
+        from streamlit.runtime import get_instance
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        return bool(ctx) and not get_instance().is_active_session(ctx.session_id)
+    except Exception:
+        return False
+
+
+def _get_api_key() -> str:
+    try:
+        return (st.secrets.get("OPENAI_API_KEY") or "").strip()
+    except Exception:
+        return ""
+
+
+def _split_pasted(text: str) -> list:
+    """One message per line, or multi-line messages separated by a line containing only ---."""
+    lines = (text or "").splitlines()
+    if any(line.strip() == "---" for line in lines):
+        chunks, current = [], []
+        for line in lines:
+            if line.strip() == "---":
+                chunks.append("\n".join(current))
+                current = []
+            else:
+                current.append(line)
+        chunks.append("\n".join(current))
+    else:
+        chunks = lines
+    return [c.strip() for c in chunks if c.strip()]
+
+
+def _read_csv_messages(uploaded) -> list:
+    """Messages from the "message" column of an uploaded CSV (or its first column if there is no such header)."""
+    text = uploaded.getvalue().decode("utf-8-sig", errors="replace")
+    rows = list(csv.reader(io.StringIO(text)))
+    if not rows:
+        return []
+    header = [h.strip().lower() for h in rows[0]]
+    if "message" in header:
+        idx = header.index("message")
+        rows = rows[1:]
+    else:
+        idx = 0
+    return [r[idx].strip() for r in rows if len(r) > idx and r[idx].strip()]
+
+
+def _results_csv(messages: list, results: list) -> str:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["message", "verdict", "confidence", "category", "reasons"])
+    for m, r in zip(messages, results):
+        writer.writerow([m, r.get("verdict", ""), r.get("confidence", 0), r.get("category", ""), " | ".join(r.get("reasons", [])[:3])])
+    return out.getvalue()
+
+
+def _bulk_section(email: str):
+    """Pro: paste a list or upload a CSV; every message is analyzed and recorded in one batch."""
+    st.markdown("---")
+    st.subheader("📋 Bulk check (Pro)")
+    st.caption(f"Paste one message per line (separate multi-line messages with a line containing only ---), or upload a CSV with a \"message\" column. Up to {BULK_MAX_MESSAGES} messages per batch.")
+    pasted = st.text_area("Messages", height=180, key="bulk_messages", placeholder="One message per line...")
+    uploaded = st.file_uploader("Or upload CSV", type=["csv"], key="bulk_csv")
+    if st.button("Check all", key="bulk_analyze", type="primary"):
+        messages = _read_csv_messages(uploaded) if uploaded else _split_pasted(pasted)
+        if not messages:
+            toast_error("Paste messages or upload a CSV to check.")
+            return
+        if len(messages) > BULK_MAX_MESSAGES:
+            st.warning(f"Only the first {BULK_MAX_MESSAGES} messages will be checked.")
+            messages = messages[:BULK_MAX_MESSAGES]
+        can_do, err = can_user_check(email, count=len(messages))
+        if not can_do:
+            toast_error(err)
+            return
+        api_key = _get_api_key()
+        if not api_key:
+            toast_error("OpenAI API key not configured. Add OPENAI_API_KEY to .streamlit/secrets.toml.")
+            return
+        with st.spinner(f"Analyzing {len(messages)} messages..."):
+            results = analyze_messages(messages, api_key=api_key, is_cancelled=_session_gone)
+        if results is None:
+            return
+        record_checks(email, results)
+        st.session_state["bulk_result"] = (messages, results)
+
+    if st.session_state.get("bulk_result"):
+        messages, results = st.session_state["bulk_result"]
+        counts = {v: sum(1 for r in results if r.get("verdict") == v) for v in ("SCAM", "SUSPICIOUS", "SAFE")}
+        st.caption(f"{len(results)} checked — {counts['SCAM']} scam, {counts['SUSPICIOUS']} suspicious, {counts['SAFE']} safe")
+        st.dataframe(
+            [
+                {
+                    "message": m[:120],
+                    "verdict": r.get("verdict", ""),
+                    "confidence": r.get("confidence", 0),
+                    "category": r.get("category", ""),
+                }
+                for m, r in zip(messages, results)
+            ],
+            use_container_width=True,
+        )
+        st.download_button(
+            label="Download results (CSV)",
+            data=_results_csv(messages, results),
+            file_name="checkmoyan_bulk_results.csv",
+            mime="text/csv",
+            key="bulk_download",
+        )
+
+
 def run():
     # Pre-fill from landing "Try this message" demo
     if "demo_message" in st.session_state:
@@ -73,20 +192,31 @@ def run():
             if not can_do:
                 toast_error(err)
             else:
-                try:
-                    api_key = (st.secrets.get("OPENAI_API_KEY") or "").strip()
-                except Exception:
-                    api_key = ""
+                api_key = _get_api_key()
                 if not api_key:
                     toast_error("OpenAI API key not configured. Add OPENAI_API_KEY to .streamlit/secrets.toml.")
                 else:
-                    with st.spinner("Analyzing with AI (OpenAI)..."):
-                        result = analyze_message(
-                            message.strip(),
-                            channel=channel or "",
-                            language=language or "",
-                            api_key=api_key,
-                        )
+                    # Stream: draw the verdict as soon as it arrives, then fill in reasons/actions
+                    live = st.empty()
+                    live.info("Analyzing with AI (OpenAI)...")
+                    result = None
+                    render_seconds = 0.0
+                    for result in analyze_message(
+                        message.strip(),
+                        channel=channel or "",
+                        language=language or "",
+                        api_key=api_key,
+                        is_cancelled=_session_gone,
+                        stream=True,
+                    ):
+                        drawn = time.perf_counter()
+                        with live.container():
+                            verdict_card(result, partial=True)
+                        render_seconds += time.perf_counter() - drawn
+                    # Stream stopped early because the session went away: nothing to record
+                    if result is None or _session_gone():
+                        return
+                    metrics.add_render(result.get("metrics"), render_seconds)
                     record_check(
                         email=email,
                         verdict=result.get("verdict", "SUSPICIOUS"),
@@ -94,7 +224,10 @@ def run():
                         category=result.get("category", ""),
                         signals_json=json.dumps(result.get("reasons", [])[:3]),
                         msg_hash=result.get("msg_hash", ""),
+                        metrics=result.get("metrics"),
                     )
+                    if allow_learning:
+                        record_example(message.strip(), channel or "", result)
                     st.session_state["last_result"] = result
                     st.session_state["last_message"] = message.strip()
                     # New key so share section (message + verdict) updates when CheckMoYan is clicked again
@@ -113,5 +246,8 @@ def run():
         result_key = st.session_state.get("last_result_key", 0)
         verdict_card(st.session_state["last_result"], message=last_message, result_key=result_key)
 
+    if email != "anonymous" and get_active_plan(email) == "pro":
+        _bulk_section(email)
+
     st.markdown("---")
     st.caption("We do not store your full message. Only verdict and category are saved. AI can be wrong — verify with official channels (GCash, Maya, banks, SSS, PhilHealth).")
@@ -1,11 +1,13 @@
 # CheckMoYan services
-from .analysis import analyze_message
+from .analysis import analyze_message, analyze_message_async, analyze_messages
 from .auth import get_email_from_session, set_email_session, is_admin_logged_in, check_admin_password
-from .usage import get_daily_limit, can_user_check, record_check
+from .usage import get_daily_limit, can_user_check, record_check, record_checks
 from .payments import get_payment_config, get_plans_config
 
 __all__ = [
     "analyze_message",
+    "analyze_message_async",
+    "analyze_messages",
     "get_email_from_session",
     "set_email_session",
     "is_admin_logged_in",
@@ -13,6 +15,7 @@ __all__ = [
     "get_daily_limit",
     "can_user_check",
     "record_check",
+    "record_checks",
     "get_payment_config",
     "get_plans_config",
 ]
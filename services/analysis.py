@@ -1,10 +1,29 @@
 """OpenAI-based scam analysis. API key from .streamlit/secrets.toml (OPENAI_API_KEY)."""
+import asyncio
 import json
-import os
 import re
 import hashlib
-import httpx
-from openai import OpenAI
+import time
+from contextlib import aclosing
+from openai import BadRequestError, RateLimitError
+from services import compaction, indicators, learning, metrics, near_dup, resilience, routing, singleflight, verdict_cache
+from services.async_runner import iter_sync, limiter, run_sync
+from services.json_stream import IncrementalObjectParser, salvage
+from services.language import ENGLISH, MIXED, TAGALOG
+from services.language import detect as language_of
+from services.openai_client import get_async_client
+from services.prescreen import heuristic_verdict, prescreen
+
+MODEL = "gpt-4o-mini"
+# Seconds for one analysis, including time queued behind the in-flight limiter
+DEFAULT_DEADLINE = 45.0
+# Bulk check (Pro): max messages per batch and max concurrent upstream calls per batch
+BULK_MAX_MESSAGES = 500
+BULK_CONCURRENCY = 8
+# Hard cap on pasted input before any local stage; what the model sees is bounded by compaction.token_budget()
+MAX_INPUT_CHARS = 50000
+# After a 429 every call waits until this time.monotonic() value (shared so bulk jobs back off together)
+_rate_limited_until = 0.0
 
 SYSTEM_PROMPT = """You are a scam and spam analyst for the Philippines. Your job is to classify messages (SMS, Messenger, Email, or call scripts) into: SAFE, SUSPICIOUS, or SCAM.
 
@@ -39,6 +58,49 @@ Output JSON schema (use exactly these keys; all string values must be plain text
   "safety_notes": "<optional brief note, plain text only>"
 }"""
 
+# Known language: a shorter prompt that states it instead of asking the model to detect it
+_LANGUAGE_RULE = "- Detect language: English, Tagalog, or Mixed and note in safety_notes if relevant (plain text only, no HTML).\n"
+_LANGUAGE_PROMPTS = {
+    ENGLISH: SYSTEM_PROMPT.replace(_LANGUAGE_RULE, "- The message is in English.\n"),
+    TAGALOG: SYSTEM_PROMPT.replace(_LANGUAGE_RULE, "- The message is in Tagalog.\n"),
+    MIXED: SYSTEM_PROMPT.replace(_LANGUAGE_RULE, "- The message mixes Tagalog and English (Taglish).\n"),
+}
+
+# Cache entries are only valid for the prompts + model that produced them
+PROMPT_VERSION = hashlib.sha256(
+    "\n".join([MODEL, SYSTEM_PROMPT, *(_LANGUAGE_PROMPTS[k] for k in sorted(_LANGUAGE_PROMPTS))]).encode("utf-8")
+).hexdigest()[:16]
+
+
+def _cache_version(routing_config: dict) -> str:
+    """Prompt version combined with the routing tiers that can produce the verdict."""
+    tag = routing.version_tag(routing_config)
+    return hashlib.sha256(f"{PROMPT_VERSION}\n{tag}".encode("utf-8")).hexdigest()[:16]
+
+_PARSE_FALLBACK_REASONS = ("Unable to fully analyze. Please verify through official channels.",)
+
+# Structured outputs: the API enforces this schema, so replies are always complete, valid JSON objects
+VERDICT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "verdict": {"type": "string", "enum": ["SAFE", "SUSPICIOUS", "SCAM"]},
+        "confidence": {"type": "integer"},
+        "category": {"type": "string"},
+        "reasons": {"type": "array", "items": {"type": "string"}},
+        "recommended_actions": {"type": "array", "items": {"type": "string"}},
+        "warning_message": {"type": "string"},
+        "red_flags": {"type": "array", "items": {"type": "string"}},
+        "safety_notes": {"type": "string"},
+    },
+    "required": [
+        "verdict", "confidence", "category", "reasons", "recommended_actions", "warning_message", "red_flags", "safety_notes",
+    ],
+    "additionalProperties": False,
+}
+# Turned off for the process if the endpoint rejects response_format (older models, proxies)
+_structured_output = True
+_parse_stats = {"responses": 0, "parsed": 0, "salvaged": 0, "fallback": 0, "structured_off": 0}
+
 
 def _hash_message(text: str) -> str:
     """Return SHA256 hex digest of normalized message (no raw storage)."""
@@ -47,11 +109,11 @@ def _hash_message(text: str) -> str:
 
 
 def _sanitize(text: str) -> str:
-    """Basic sanitization: strip and limit length for API."""
+    """Basic sanitization: strip and cap length (the model input is compacted separately)."""
     if not text or not isinstance(text, str):
         return ""
     t = text.strip()
-    return t[:8000] if len(t) > 8000 else t
+    return t[:MAX_INPUT_CHARS] if len(t) > MAX_INPUT_CHARS else t
 
 
 def _strip_html(text: str) -> str:
@@ -66,27 +128,48 @@ def _strip_html(text: str) -> str:
     return re.sub(r"\s+", " ", t).strip()
 
 
+def _decode(raw: str) -> tuple:
+    """
+    Return (data, outcome): outcome is "parsed" for a complete JSON object, "salvaged" when only the
+    valid prefix of a truncated/malformed reply could be read (it must include the verdict), else
+    (None, "fallback").
+    """
+    raw = (raw or "").strip()
+    # Remove markdown code block if present
+    if raw.startswith("```"):
+        raw = re.sub(r"^```(?:json)?\s*", "", raw)
+        raw = re.sub(r"\s*```$", "", raw)
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError:
+        data = None
+    if isinstance(data, dict):
+        return data, "parsed"
+    # Cut off at max_tokens or broken mid-way: keep the fields that did arrive intact
+    data = salvage(raw)
+    if "verdict" in data:
+        return data, "salvaged"
+    return None, "fallback"
+
+
 def _parse_response(raw: str) -> dict:
     """Parse JSON from model response. No fallback for recommendations — only use AI output for this message."""
+    data, _ = _decode(raw)
+    return _normalize(data)
+
+
+def _normalize(data) -> dict:
+    """Validate and clean a decoded reply into the result shape (generic SUSPICIOUS if data is None)."""
     parse_fallback = {
         "verdict": "SUSPICIOUS",
         "confidence": 50,
         "category": "Unknown",
-        "reasons": ["Unable to fully analyze. Please verify through official channels."],
+        "reasons": list(_PARSE_FALLBACK_REASONS),
         "recommended_actions": [],
         "warning_message": "",
         "red_flags": [],
         "safety_notes": "",
     }
-    raw = (raw or "").strip()
-    # Remove markdown code block if present
-    if raw.startswith("```"):
-        raw = re.sub(r"^```(?:json)?\s*", "", raw)
-        raw = re.sub(r"\s*```$", "", raw)
-    try:
-        data = json.loads(raw)
-    except json.JSONDecodeError:
-        return parse_fallback
     if not isinstance(data, dict):
         return parse_fallback
     verdict = (data.get("verdict") or "SUSPICIOUS").upper()
@@ -138,83 +221,591 @@ def _parse_response(raw: str) -> dict:
     }
 
 
-def analyze_message(
-    message: str,
-    channel: str = "",
-    language: str = "",
-    api_key: str = None,
-) -> dict:
-    """
-    Call OpenAI to analyze message. Returns parsed dict with verdict, confidence, category, reasons, etc.
-    Also returns msg_hash for storage (no raw message stored).
-    """
-    msg = _sanitize(message)
-    if not msg:
-        return {
-            "verdict": "SUSPICIOUS",
-            "confidence": 0,
-            "category": "Unknown",
-            "reasons": ["No message provided."],
-            "recommended_actions": ["Paste a message to check."],
-            "warning_message": "No message to analyze.",
-            "red_flags": [],
-            "safety_notes": "",
-            "msg_hash": "",
-        }
+def _empty_result() -> dict:
+    return {
+        "verdict": "SUSPICIOUS",
+        "confidence": 0,
+        "category": "Unknown",
+        "reasons": ["No message provided."],
+        "recommended_actions": ["Paste a message to check."],
+        "warning_message": "No message to analyze.",
+        "red_flags": [],
+        "safety_notes": "",
+        "msg_hash": "",
+    }
+
+
+def _no_api_key_result(msg_hash: str) -> dict:
+    return {
+        "verdict": "SUSPICIOUS",
+        "confidence": 0,
+        "category": "Unknown",
+        "reasons": ["API key not configured. Contact support."],
+        "recommended_actions": [],
+        "warning_message": "Service temporarily unavailable.",
+        "red_flags": [],
+        "safety_notes": "",
+        "msg_hash": msg_hash,
+    }
+
+
+def _failure_result(msg_hash: str, error: str) -> dict:
+    return {
+        "verdict": "SUSPICIOUS",
+        "confidence": 0,
+        "category": "Unknown",
+        "reasons": [f"Analysis failed: {error[:200]}. Please try again or verify through official channels."],
+        "recommended_actions": ["Do not share OTP or personal details.", "Contact official channels."],
+        "warning_message": "Could not analyze. Stay cautious.",
+        "red_flags": [],
+        "safety_notes": "",
+        "msg_hash": msg_hash,
+    }
+
+
+def _build_user_content(msg: str, channel: str, language: str) -> str:
     user_content = f"Message to analyze:\n\n{msg}"
     if channel:
         user_content += f"\n\nChannel: {channel}"
-    if language:
+    # The language-specific system prompt already states a known language
+    if language and language not in _LANGUAGE_PROMPTS:
         user_content += f"\n\nLanguage: {language}"
+    return user_content
 
-    api_key = (api_key or "").strip()
-    if not api_key:
-        return {
-            "verdict": "SUSPICIOUS",
-            "confidence": 0,
-            "category": "Unknown",
-            "reasons": ["API key not configured. Contact support."],
-            "recommended_actions": [],
-            "warning_message": "Service temporarily unavailable.",
-            "red_flags": [],
-            "safety_notes": "",
-            "msg_hash": _hash_message(msg),
-        }
 
+def _note_rate_limit(error: RateLimitError) -> None:
+    """Start a shared cooldown from the Retry-After header (default 2s)."""
+    global _rate_limited_until
     try:
-        # Avoid "proxies" argument error: unset proxy env so OpenAI/httpx don't pass proxies
-        saved = {}
-        for k in ("HTTP_PROXY", "HTTPS_PROXY", "http_proxy", "https_proxy"):
-            saved[k] = os.environ.pop(k, None)
-        try:
-            http_client = httpx.Client()
-            client = OpenAI(api_key=api_key, http_client=http_client)
-            resp = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": user_content},
-                ],
+        retry_after = float(error.response.headers.get("retry-after") or 2)
+    except (AttributeError, TypeError, ValueError):
+        retry_after = 2.0
+    _rate_limited_until = max(_rate_limited_until, time.monotonic() + min(retry_after, 30.0))
+
+
+def _response_format() -> dict:
+    """Extra create() kwargs for structured output (empty once the endpoint has rejected it)."""
+    if not _structured_output:
+        return {}
+    return {"response_format": {"type": "json_schema", "json_schema": {"name": "scam_verdict", "strict": True, "schema": VERDICT_SCHEMA}}}
+
+
+def _disable_structured_output(error: BadRequestError) -> bool:
+    """Switch to plain JSON prompting if error is the endpoint rejecting response_format. Returns True if it was."""
+    global _structured_output
+    if not _structured_output or "response_format" not in str(error):
+        return False
+    _structured_output = False
+    _parse_stats["structured_off"] += 1
+    return True
+
+
+def parse_stats() -> dict:
+    """Model replies parsed cleanly, salvaged from a truncated/malformed prefix, or replaced by the fallback."""
+    out = dict(_parse_stats)
+    out["fallback_rate"] = out["fallback"] / out["responses"] if out["responses"] else 0.0
+    out["structured_output"] = _structured_output
+    return out
+
+
+def _chat_messages(user_content: str, lang: str = "") -> list:
+    return [
+        {"role": "system", "content": _LANGUAGE_PROMPTS.get(lang, SYSTEM_PROMPT)},
+        {"role": "user", "content": user_content},
+    ]
+
+
+def _usage(usage) -> dict:
+    """prompt/completion token counts from a response's usage object ({} if absent)."""
+    if usage is None:
+        return {}
+    return {"prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0, "completion_tokens": getattr(usage, "completion_tokens", 0) or 0}
+
+
+async def _call_openai(api_key: str, messages: list, model: str, trace: metrics.Trace, timeout: float) -> tuple:
+    """Return (reply text, usage dict)."""
+    with trace.span("client"):
+        client = get_async_client(api_key)
+    try:
+        with trace.span("network"):
+            resp = await client.chat.completions.create(
+                model=model,
+                messages=messages,
                 temperature=0.2,
                 max_tokens=1000,
+                timeout=timeout,
+                **_response_format(),
             )
-            raw = (resp.choices[0].message.content or "").strip()
-            result = _parse_response(raw)
-            result["msg_hash"] = _hash_message(msg)
-            return result
-        finally:
-            for k, v in saved.items():
-                if v is not None:
-                    os.environ[k] = v
+    except RateLimitError as e:
+        _note_rate_limit(e)
+        raise
+    except BadRequestError as e:
+        if _disable_structured_output(e):
+            return await _call_openai(api_key, messages, model, trace, timeout)
+        raise
+    return (resp.choices[0].message.content or "").strip(), _usage(resp.usage)
+
+
+async def _open_stream(api_key: str, messages: list, model: str, trace: metrics.Trace, timeout: float):
+    with trace.span("client"):
+        client = get_async_client(api_key)
+    try:
+        with trace.span("network"):
+            return await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=0.2,
+                max_tokens=1000,
+                stream=True,
+                stream_options={"include_usage": True},
+                timeout=timeout,
+                **_response_format(),
+            )
+    except RateLimitError as e:
+        _note_rate_limit(e)
+        raise
+    except BadRequestError as e:
+        if _disable_structured_output(e):
+            return await _open_stream(api_key, messages, model, trace, timeout)
+        raise
+
+
+async def _wait_for_cooldown() -> None:
+    cooldown = _rate_limited_until - time.monotonic()
+    if cooldown > 0:
+        await asyncio.sleep(cooldown)
+
+
+async def _limited_call(api_key: str, messages: list, model: str, trace: metrics.Trace, end: float) -> tuple:
+    async def attempt():
+        with trace.span("queue"):
+            await _wait_for_cooldown()
+        return await _call_openai(api_key, messages, model, trace, resilience.attempt_timeout(end))
+
+    queued = time.perf_counter()
+    async with limiter():
+        trace.add("queue", time.perf_counter() - queued)
+        return await resilience.call(attempt, end)
+
+
+async def _open_stream_with_retries(api_key: str, messages: list, model: str, trace: metrics.Trace, end: float):
+    async def attempt():
+        with trace.span("queue"):
+            await _wait_for_cooldown()
+        return await _open_stream(api_key, messages, model, trace, resilience.attempt_timeout(end))
+
+    return await resilience.call(attempt, end)
+
+
+async def _routed_call(api_key: str, messages: list, config: dict, trace: metrics.Trace, end: float) -> str:
+    """
+    Fast tier first; the strong tier only for an ambiguous fast verdict. Returns the reply to use.
+    end: the caller's deadline (time.monotonic()); attempts and retries are sized to fit before it.
+    """
+    raw = ""
+    for tier, model in routing.tiers(config):
+        if raw:
+            if not routing.should_escalate(_normalize(_decode(raw)[0]), config):
+                break
+            routing.note_escalation()
+        started = time.monotonic()
+        try:
+            reply, usage = await _limited_call(api_key, messages, model, trace, end)
+        except Exception:
+            if not raw:
+                raise
+            break  # strong tier unavailable: the fast verdict still stands
+        routing.record(tier, time.monotonic() - started, usage, config)
+        trace.add_usage(model, usage)
+        raw = reply
+    return raw
+
+
+async def _stream_tier(api_key: str, messages: list, model: str, end: float, out: dict, trace: metrics.Trace):
+    """
+    Stream one model's reply, yielding normalized partial results once verdict and confidence are known.
+    end is the caller's deadline (time.monotonic()).
+    out receives "text" (the full reply so far) and "usage" when the stream ends or is abandoned.
+    """
+    def remaining() -> float:
+        return max(0.0, end - time.monotonic())
+
+    parser = IncrementalObjectParser()
+    chunks = []
+    last = None
+    stream = None
+    try:
+        stream = await asyncio.wait_for(_open_stream_with_retries(api_key, messages, model, trace, end), timeout=remaining())
+        it = stream.__aiter__()
+        while True:
+            try:
+                with trace.span("network"):
+                    chunk = await asyncio.wait_for(it.__anext__(), timeout=remaining())
+            except StopAsyncIteration:
+                break
+            if getattr(chunk, "usage", None) is not None:
+                out["usage"] = _usage(chunk.usage)
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            chunks.append(delta)
+            with trace.span("parse"):
+                snapshot = parser.feed(delta)
+            if "verdict" in snapshot and "confidence" in snapshot and snapshot != last:
+                last = snapshot
+                with trace.span("normalize"):
+                    partial = _normalize(snapshot)
+                # Time spent while the consumer renders the partial is not this check's
+                yield partial
+    finally:
+        out["text"] = "".join(chunks).strip()
+        if stream is not None:
+            try:
+                await stream.close()
+            except Exception:
+                pass
+
+
+def _degraded_result(message: str, msg_hash: str) -> dict:
+    """Local heuristic verdict served while the circuit breaker is open (never cached)."""
+    resilience.note_degraded()
+    result = heuristic_verdict(_sanitize(message))
+    result["msg_hash"] = msg_hash
+    return result
+
+
+def _repeat_offender_result(msg_hash: str, known: list) -> dict:
+    """Local SCAM verdict for a message carrying a link/number already reported in many scam checks."""
+    flags = indicators.describe(known)
+    return {
+        "verdict": "SCAM",
+        "confidence": 90,
+        "category": "Reported scam link/number",
+        "reasons": ["Contains a link or number that other users' checks already flagged as a scam."] + flags[:5],
+        "recommended_actions": [
+            "Do not click the link, call or reply to the number, or send money.",
+            "Block the sender and report the message to your network or e-wallet provider.",
+        ],
+        "warning_message": "This message uses a link or number already reported in scam messages. Don't engage.",
+        "red_flags": flags[:10],
+        "safety_notes": "Flagged instantly from community scam reports.",
+        "msg_hash": msg_hash,
+    }
+
+
+async def _prepare(message: str, channel: str, language: str, api_key: str) -> tuple:
+    """
+    Local stages before OpenAI: sanitize, indicator extraction, pre-screen, verdict cache, known
+    indicators, near-duplicate templates, local classifier, API key check, then compaction of the model input.
+    Returns (final_result_or_None, msg_hash, cache_key, chat_messages, local) where local holds what the
+    local stages found ("signature", "indicators", "known", "compaction", "routing", "version", "language")
+    and the check's metrics "trace" (its source is set when a local stage decides the verdict).
+    """
+    trace = metrics.Trace()
+    local = {
+        "signature": None, "indicators": [], "known": [], "compaction": None, "routing": None,
+        "version": PROMPT_VERSION, "language": "", "trace": trace,
+    }
+    with trace.span("sanitize"):
+        msg = _sanitize(message)
+        if not msg:
+            trace.source = "empty"
+            return _empty_result(), "", "", "", local
+        msg_hash = _hash_message(msg)
+        # Usually left blank in the form: detect locally so the model gets the shorter language-specific prompt.
+        # Detection and the regex/hashing stages below are CPU-bound (tens of ms on a long message), so they run
+        # in worker threads instead of stalling the shared event loop and every other session's OpenAI calls.
+        language = (language or "").strip() or await asyncio.to_thread(language_of, msg)
+    local["language"] = language
+    with trace.span("indicators"):
+        local["indicators"] = await asyncio.to_thread(indicators.extract, msg)
+    # Textbook scams are decided locally; only ambiguous messages go to OpenAI
+    with trace.span("prescreen"):
+        screened = await asyncio.to_thread(prescreen, msg)
+    if screened is not None:
+        # Indicators are counted only for model verdicts: a prescreen false positive must not feed them
+        screened["msg_hash"] = msg_hash
+        trace.source = "prescreen"
+        return screened, msg_hash, "", "", local
+    with trace.span("cache"):
+        local["routing"] = await asyncio.to_thread(routing.get_config)
+        local["version"] = _cache_version(local["routing"])
+        key = verdict_cache.cache_key(msg_hash, local["version"], channel, language)
+        cached = await asyncio.to_thread(verdict_cache.get, key)
+    if cached is not None:
+        cached["msg_hash"] = msg_hash
+        trace.source = "cache"
+        return cached, msg_hash, key, "", local
+    # Links/numbers already seen in SCAM verdicts (Bloom filter first, DB only on a possible hit)
+    with trace.span("indicators"):
+        local["known"] = await asyncio.to_thread(indicators.lookup, local["indicators"])
+    if any(count >= indicators.REPEAT_OFFENDER_MIN for _, _, count in local["known"]):
+        # Not recorded again: a verdict based on the counts must not inflate them
+        trace.source = "indicators"
+        return _repeat_offender_result(msg_hash, local["known"]), msg_hash, key, "", local
+    # A variant of a recently confirmed scam (other names, amounts, links) reuses that verdict
+    with trace.span("near_dup"):
+        local["signature"] = await asyncio.to_thread(near_dup.signature, msg)
+        template = await asyncio.to_thread(near_dup.lookup, local["signature"])
+    if template is not None:
+        template["msg_hash"] = msg_hash
+        trace.source = "near_dup"
+        return template, msg_hash, key, "", local
+    # Local classifier trained from opted-in checks; only a confident verdict skips the AI
+    with trace.span("local_model"):
+        learned = await asyncio.to_thread(learning.predict, msg, channel)
+    if learned is not None:
+        learned["msg_hash"] = msg_hash
+        trace.source = "local_model"
+        return learned, msg_hash, key, "", local
+    if not (api_key or "").strip():
+        trace.source = "no_api_key"
+        return _no_api_key_result(msg_hash), msg_hash, key, "", local
+    # Quoted replies, footers and long tracking URLs cost tokens without helping the verdict
+    with trace.span("compaction"):
+        compacted, local["compaction"] = await asyncio.to_thread(compaction.compact, msg)
+        trace.compaction = local["compaction"]
+        messages = _chat_messages(_build_user_content(compacted, channel, language), language)
+    return None, msg_hash, key, messages, local
+
+
+async def _finish(raw: str, msg_hash: str, key: str, local: dict) -> dict:
+    trace = local["trace"]
+    trace.source = "model"
+    with trace.span("parse"):
+        data, outcome = _decode(raw)
+    _parse_stats["responses"] += 1
+    _parse_stats[outcome] += 1
+    with trace.span("normalize"):
+        result = _normalize(data)
+    result["msg_hash"] = msg_hash
+    # Don't cache the generic fallback for an unparseable response
+    if outcome == "fallback":
+        return result
+    if local["known"]:
+        result["red_flags"] = (indicators.describe(local["known"]) + result["red_flags"])[:10]
+    with trace.span("store"):
+        await asyncio.to_thread(verdict_cache.put, key, msg_hash, local["version"], result)
+        if result["verdict"] == "SCAM":
+            await asyncio.to_thread(indicators.record_scam, local["indicators"], msg_hash)
+            await asyncio.to_thread(near_dup.remember, local["signature"], msg_hash, result)
+    return result
+
+
+def _with_metrics(result: dict, local: dict, source: str = "") -> dict:
+    """Copy of a final result carrying the check's metrics summary (stage ms, tokens, source, model)."""
+    out = dict(result)
+    out["metrics"] = metrics.finish(local["trace"], source)
+    return out
+
+
+async def analyze_message_async(
+    message: str,
+    channel: str = "",
+    language: str = "",
+    api_key: str = None,
+    deadline: float = DEFAULT_DEADLINE,
+) -> dict:
+    """
+    Async analysis: pre-screen, verdict cache, known indicators, scam templates, then OpenAI under the global in-flight limiter.
+    deadline: seconds for the whole call (queueing + upstream). Cancelling the awaiting task cancels
+    the upstream request.
+    """
+    early, msg_hash, key, messages, local = await _prepare(message, channel, language, api_key)
+    if early is not None:
+        return _with_metrics(early, local)
+    trace = local["trace"]
+
+    end = time.monotonic() + deadline
+
+    async def upstream():
+        raw = await _routed_call(api_key.strip(), messages, local["routing"], trace, end)
+        return await _finish(raw, msg_hash, key, local)
+
+    started = time.perf_counter()
+    try:
+        # Identical messages already in flight share that call instead of starting another
+        result = await asyncio.wait_for(singleflight.do(key, upstream), timeout=deadline)
+    except resilience.CircuitOpen:
+        return _with_metrics(_degraded_result(message, msg_hash), local, "degraded")
+    except asyncio.TimeoutError:
+        return _with_metrics(_failure_result(msg_hash, f"timed out after {deadline:g}s"), local, "failed")
     except Exception as e:
-        return {
-            "verdict": "SUSPICIOUS",
-            "confidence": 0,
-            "category": "Unknown",
-            "reasons": [f"Analysis failed: {str(e)[:200]}. Please try again or verify through official channels."],
-            "recommended_actions": ["Do not share OTP or personal details.", "Contact official channels."],
-            "warning_message": "Could not analyze. Stay cautious.",
-            "red_flags": [],
-            "safety_notes": "",
-            "msg_hash": _hash_message(msg),
-        }
+        return _with_metrics(_failure_result(msg_hash, str(e)), local, "failed")
+    if not trace.source:
+        # Another session's call produced this verdict
+        trace.add("wait", time.perf_counter() - started)
+        trace.source = "coalesced"
+    return _with_metrics(result, local)
+
+
+async def analyze_message_stream_async(
+    message: str,
+    channel: str = "",
+    language: str = "",
+    api_key: str = None,
+    deadline: float = DEFAULT_DEADLINE,
+):
+    """
+    Streaming analysis (async generator). Yields progressively fuller result dicts as the model's JSON
+    arrives: the first once verdict and confidence are known, then as category/reasons/actions fill in.
+    The last item is always the final result (same as analyze_message_async). If the same message is
+    already in flight, waits for that call and yields only its final result.
+    """
+    early, msg_hash, key, messages, local = await _prepare(message, channel, language, api_key)
+    if early is not None:
+        yield _with_metrics(early, local)
+        return
+    trace = local["trace"]
+    loop = asyncio.get_running_loop()
+    end = time.monotonic() + deadline
+
+    def remaining() -> float:
+        return max(0.0, end - time.monotonic())
+
+    flight, leader = singleflight.begin(key)
+    while not leader:
+        source = "coalesced"
+        try:
+            with trace.span("wait"):
+                result = await asyncio.wait_for(flight.wait(), timeout=remaining())
+        except singleflight.LeaderGone:
+            flight, leader = singleflight.begin(key)
+            continue
+        except resilience.CircuitOpen:
+            result, source = _degraded_result(message, msg_hash), "degraded"
+        except asyncio.TimeoutError:
+            result, source = _failure_result(msg_hash, f"timed out after {deadline:g}s"), "failed"
+        except Exception as e:
+            result, source = _failure_result(msg_hash, str(e)), "failed"
+        yield _with_metrics(result, local, source)
+        return
+
+    settled = False
+    sem = limiter()
+    try:
+        try:
+            with trace.span("queue"):
+                await asyncio.wait_for(sem.acquire(), timeout=remaining())
+        except asyncio.TimeoutError as e:
+            flight.fail(e)
+            settled = True
+            yield _with_metrics(_failure_result(msg_hash, f"timed out after {deadline:g}s"), local, "failed")
+            return
+        config = local["routing"]
+        raw = ""
+        try:
+            for tier, model in routing.tiers(config):
+                if raw:
+                    if not routing.should_escalate(_normalize(_decode(raw)[0]), config):
+                        break
+                    routing.note_escalation()
+                started = loop.time()
+                out = {}
+                try:
+                    async with aclosing(_stream_tier(api_key.strip(), messages, model, end, out, trace)) as partials:
+                        async for partial in partials:
+                            partial["msg_hash"] = msg_hash
+                            yield partial
+                except Exception:
+                    if not raw:
+                        raise
+                    break  # strong tier unavailable: the fast verdict still stands
+                routing.record(tier, loop.time() - started, out.get("usage"), config)
+                trace.add_usage(model, out.get("usage"))
+                raw = out["text"]
+        except resilience.CircuitOpen as e:
+            flight.fail(e)
+            settled = True
+            yield _with_metrics(_degraded_result(message, msg_hash), local, "degraded")
+            return
+        except asyncio.TimeoutError as e:
+            flight.fail(e)
+            settled = True
+            yield _with_metrics(_failure_result(msg_hash, f"timed out after {deadline:g}s"), local, "failed")
+            return
+        except Exception as e:
+            flight.fail(e)
+            settled = True
+            yield _with_metrics(_failure_result(msg_hash, str(e)), local, "failed")
+            return
+        finally:
+            sem.release()
+        result = await _finish(raw, msg_hash, key, local)
+        trace.end()  # the analysis ends here; drawing the result is the page's "render" stage
+        flight.resolve(result)
+        settled = True
+        yield _with_metrics(result, local)
+    finally:
+        # Consumer went away (cancelled / closed the stream) before a result: let a waiter take over
+        if not settled:
+            flight.abandon()
+
+
+def analyze_message(
+    message: str,
+    channel: str = "",
+    language: str = "",
+    api_key: str = None,
+    deadline: float = DEFAULT_DEADLINE,
+    is_cancelled=None,
+    stream: bool = False,
+):
+    """
+    Call OpenAI to analyze message. Returns parsed dict with verdict, confidence, category, reasons, etc.
+    Also returns msg_hash and metrics (stage timings, tokens) for storage (no raw message stored).
+    Thin wrapper over analyze_message_async run on the shared background loop; is_cancelled is polled
+    while waiting and aborts the call when it returns True (result is then None).
+    stream=True returns an iterator of progressively fuller result dicts instead (last one is final).
+    """
+    if stream:
+        return iter_sync(
+            analyze_message_stream_async(message, channel=channel, language=language, api_key=api_key, deadline=deadline),
+            is_cancelled=is_cancelled,
+        )
+    return run_sync(
+        analyze_message_async(message, channel=channel, language=language, api_key=api_key, deadline=deadline),
+        is_cancelled=is_cancelled,
+    )
+
+
+async def analyze_messages_async(
+    messages: list,
+    channel: str = "",
+    language: str = "",
+    api_key: str = None,
+    deadline: float = DEFAULT_DEADLINE,
+) -> list:
+    """
+    Bulk analysis: identical messages (same _hash_message) are analyzed once, unique ones run
+    concurrently (at most BULK_CONCURRENCY at a time, and under the global limiter). Output is in input order.
+    """
+    order = []
+    unique = {}
+    for m in messages[:BULK_MAX_MESSAGES]:
+        h = _hash_message(_sanitize(m))
+        order.append(h)
+        unique.setdefault(h, m)
+    sem = asyncio.Semaphore(BULK_CONCURRENCY)
+
+    async def one(msg):
+        async with sem:
+            return await analyze_message_async(msg, channel=channel, language=language, api_key=api_key, deadline=deadline)
+
+    results = await asyncio.gather(*(one(m) for m in unique.values()))
+    by_hash = dict(zip(unique, results))
+    return [dict(by_hash[h]) for h in order]
+
+
+def analyze_messages(
+    messages: list,
+    channel: str = "",
+    language: str = "",
+    api_key: str = None,
+    is_cancelled=None,
+) -> list:
+    """Sync wrapper for analyze_messages_async (list[str] -> list[dict]); None if cancelled."""
+    return run_sync(
+        analyze_messages_async(messages, channel=channel, language=language, api_key=api_key),
+        is_cancelled=is_cancelled,
+    )
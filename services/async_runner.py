@@ -0,0 +1,132 @@
+"""Background asyncio loop shared by all Streamlit sessions, plus the global in-flight limiter.
+
+Script threads submit coroutines with run_sync() and block only on a future, so one process can keep
+many OpenAI calls in flight without a thread per call. The limiter caps concurrent upstream calls.
+"""
+import asyncio
+import concurrent.futures
+import queue
+import threading
+import weakref
+
+MAX_IN_FLIGHT = 32
+POLL_INTERVAL = 0.2
+
+_lock = threading.Lock()
+_loop = None
+_thread = None
+_limiters = weakref.WeakKeyDictionary()  # event loop -> _Limiter
+
+
+def _run_loop(loop):
+    asyncio.set_event_loop(loop)
+    loop.run_forever()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared background loop, starting its daemon thread on first use."""
+    global _loop, _thread
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(target=_run_loop, args=(_loop,), name="checkmoyan-async", daemon=True)
+            _thread.start()
+        return _loop
+
+
+class _Limiter:
+    """asyncio.Semaphore that counts the slots it has handed out (acquire/release or async with)."""
+
+    def __init__(self, size: int):
+        self._sem = asyncio.Semaphore(size)
+        self.held = 0
+
+    async def acquire(self) -> bool:
+        await self._sem.acquire()
+        self.held += 1
+        return True
+
+    def release(self) -> None:
+        self.held -= 1
+        self._sem.release()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+
+def limiter() -> _Limiter:
+    """Limiter capping in-flight analyses on the running loop (MAX_IN_FLIGHT)."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        sem = _limiters.get(loop)
+        if sem is None:
+            sem = _Limiter(MAX_IN_FLIGHT)
+            _limiters[loop] = sem
+        return sem
+
+
+def in_flight() -> int:
+    """Number of analyses holding a limiter slot on the shared loop."""
+    with _lock:
+        sem = _limiters.get(_loop) if _loop is not None else None
+    return sem.held if sem is not None else 0
+
+
+def run_sync(coro, is_cancelled=None):
+    """
+    Run coro on the shared loop and wait for its result from a regular thread.
+    is_cancelled: optional callable polled while waiting; when it returns True (e.g. the Streamlit
+    session went away) the coroutine is cancelled and None is returned.
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, get_loop())
+    try:
+        while True:
+            try:
+                return future.result(timeout=POLL_INTERVAL)
+            except concurrent.futures.TimeoutError:
+                if is_cancelled is not None and is_cancelled():
+                    future.cancel()
+                    return None
+    except BaseException:
+        # Script stopped (rerun, shutdown): don't leave the upstream call running
+        future.cancel()
+        raise
+
+
+def iter_sync(agen, is_cancelled=None):
+    """
+    Iterate an async generator on the shared loop from a regular thread (items cross via a queue).
+    Stops early, cancelling the generator, when is_cancelled() returns True or the caller closes the iterator.
+    """
+    items = queue.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for item in agen:
+                items.put(item)
+        except Exception as e:
+            items.put(e)
+        finally:
+            items.put(done)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), get_loop())
+    try:
+        while True:
+            try:
+                item = items.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                if is_cancelled is not None and is_cancelled():
+                    return
+                continue
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        future.cancel()
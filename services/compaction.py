@@ -0,0 +1,205 @@
+"""Token-aware compaction of the message sent to the model.
+
+Long emails spend most of their tokens on quoted replies, signatures, legal footers and tracking links.
+compact() strips those, collapses long URLs to their domain plus a short path hash, and if the text is
+still over the token budget keeps the highest-signal segments (red-flag patterns, links, numbers) in
+their original order. Tokens are counted with tiktoken when it is installed, else estimated.
+
+Quoted or forwarded text is often the scam itself ("Is this legit?" above a forwarded bank email), so it
+is only dropped when the part that is kept already carries every red flag, link and number it has.
+
+The budget comes from an optional [COMPACTION] section in .streamlit/secrets.toml: token_budget.
+"""
+import hashlib
+import re
+import threading
+
+from services.prescreen import match_signals
+
+TOKEN_BUDGET = 1500  # default; see token_budget()
+LONG_URL_CHARS = 60
+
+_URL = re.compile(r"https?://[^\s<>\"']+", re.IGNORECASE)
+_QUOTED_HEADER = re.compile(
+    r"^\s*(?:-{2,}\s*original message\s*-{2,}|_{10,}|on .{4,120} wrote:|(?:from|sent|date):\s.+\n\s*(?:to|sent|subject|date):\s)",
+    re.IGNORECASE | re.MULTILINE,
+)
+_SIGNATURE = re.compile(r"^--\s*$", re.MULTILINE)
+_FOOTER_LINE = re.compile(
+    r"^\s*(?:sent from my \w+.*|get outlook for \w+.*"
+    r"|.*\b(?:unsubscribe|manage (?:your )?(?:email )?preferences|privacy policy|all rights reserved|©\s*\d{4})\b.*"
+    r"|(?:this (?:e-?mail|message) (?:and any attachments )?(?:is|are|may be) (?:confidential|intended)).*"
+    r"|you are receiving this (?:e-?mail|message).*)$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_SEGMENT = re.compile(r"\n\s*\n|(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+_HAS_NUMBER = re.compile(r"\d{4,}|[₱$]\s?\d")
+
+_lock = threading.Lock()
+_budget = None
+_encoder = None
+_encoder_loaded = False
+_stats = {"requests": 0, "compacted": 0, "trimmed": 0, "tokens_in": 0, "tokens_out": 0}
+
+
+def token_budget() -> int:
+    """Token budget for the model input: [COMPACTION] token_budget in secrets, else TOKEN_BUDGET."""
+    global _budget
+    if _budget is None:
+        budget = TOKEN_BUDGET
+        try:
+            import streamlit as st
+            cfg = st.secrets.get("COMPACTION") or {}
+            v = cfg.get("token_budget", cfg.get("TOKEN_BUDGET"))
+            if v is not None:
+                budget = max(100, int(v))
+        except Exception:
+            pass
+        _budget = budget
+    return _budget
+
+
+def configure(token_budget: int = None) -> None:
+    """Override the token budget (e.g. in scripts); None goes back to secrets / TOKEN_BUDGET."""
+    global _budget
+    _budget = max(100, int(token_budget)) if token_budget is not None else None
+
+
+def _get_encoder():
+    """tiktoken encoder for the model's tokenizer, or None when tiktoken is not installed."""
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoder = None
+        _encoder_loaded = True
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    """Token count (exact with tiktoken; otherwise ~4 UTF-8 bytes per token, slightly pessimistic)."""
+    if not text:
+        return 0
+    enc = _get_encoder()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    return (len(text.encode("utf-8")) + 3) // 4
+
+
+def _collapse_url(m) -> str:
+    url = m.group(0)
+    if len(url) <= LONG_URL_CHARS:
+        return url
+    scheme, _, rest = url.partition("://")
+    host, _, path = rest.partition("/")
+    digest = hashlib.sha256(path.encode("utf-8")).hexdigest()[:8]
+    return f"{scheme}://{host}/…#{digest}"
+
+
+def _evidence(text: str) -> set:
+    """Red-flag signals plus "link" / "number" found in text: what the model needs to see somewhere."""
+    found = set(match_signals(text))
+    if _URL.search(text) or "www." in text.lower():
+        found.add("link")
+    if _HAS_NUMBER.search(text):
+        found.add("number")
+    return found
+
+
+def _strip_quoted(text: str) -> str:
+    """Drop quoted history (from the first reply header on, '>' lines anywhere) only if it adds no evidence."""
+    kept, quoted = text, ""
+    m = _QUOTED_HEADER.search(text)
+    if m and m.start() > 0:
+        kept, quoted = text[:m.start()], text[m.start():]
+    lines = kept.split("\n")
+    quoted_lines = [line for line in lines if line.lstrip().startswith(">")]
+    if quoted_lines:
+        kept = "\n".join(line for line in lines if not line.lstrip().startswith(">"))
+        quoted = "\n".join(quoted_lines) + "\n" + quoted
+    if not quoted.strip() or not kept.strip():
+        return text
+    if _evidence(quoted) <= _evidence(kept):
+        return kept
+    # The forwarded / quoted part is (part of) the message being checked: keep it, minus the '>' markers
+    return re.sub(r"^[ \t]*(?:>[ \t]?)+", "", text, flags=re.MULTILINE)
+
+
+def _strip_boilerplate(text: str) -> str:
+    text = _strip_quoted(text)
+    m = _SIGNATURE.search(text)
+    if m and m.start() > 0:
+        text = text[:m.start()]
+    text = _FOOTER_LINE.sub("", text)
+    text = _URL.sub(_collapse_url, text)
+    text = re.sub(r"[ \t ]+", " ", text)
+    text = re.sub(r" *\n *", "\n", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def _score(segment: str) -> int:
+    score = 3 * len(match_signals(segment))
+    if _URL.search(segment) or "www." in segment.lower():
+        score += 2
+    if _HAS_NUMBER.search(segment):
+        score += 1
+    return score
+
+
+def _fit_budget(text: str, budget: int) -> str:
+    """Keep the first segment plus the highest-scoring others (original order) within budget tokens."""
+    segments = [s.strip() for s in _SEGMENT.split(text) if s and s.strip()]
+    costs = [count_tokens(s) + 1 for s in segments]
+    ranked = sorted(range(1, len(segments)), key=lambda i: (-_score(segments[i]), i))
+    keep = set()
+    used = 0
+    for i in [0] + ranked:
+        if used + costs[i] <= budget:
+            keep.add(i)
+            used += costs[i]
+    if not keep:
+        # One huge segment: hard cut at roughly the budget
+        return segments[0][: budget * 3] + " […]"
+    out = []
+    for i, s in enumerate(segments):
+        if i in keep:
+            out.append(s)
+        elif not out or out[-1] != "[…]":
+            out.append("[…]")
+    return " ".join(out)
+
+
+def compact(text: str, budget: int = None) -> tuple:
+    """
+    Return (compacted_text, info) where info has tokens_before, tokens_after and trimmed (segments
+    were dropped to fit budget, default token_budget()). Short messages without boilerplate come back unchanged.
+    """
+    budget = budget or token_budget()
+    before = count_tokens(text)
+    out = _strip_boilerplate(text)
+    # Never strip a message down to nothing (e.g. an email that is all quoted text)
+    if not out:
+        out = text
+    trimmed = False
+    if count_tokens(out) > budget:
+        out = _fit_budget(out, budget)
+        trimmed = True
+    after = count_tokens(out)
+    with _lock:
+        _stats["requests"] += 1
+        _stats["compacted"] += 1 if after < before else 0
+        _stats["trimmed"] += 1 if trimmed else 0
+        _stats["tokens_in"] += before
+        _stats["tokens_out"] += after
+    return out, {"tokens_before": before, "tokens_after": after, "trimmed": trimmed}
+
+
+def stats() -> dict:
+    """Requests, how many were shortened / trimmed to budget, and total message tokens in vs. sent."""
+    with _lock:
+        out = dict(_stats)
+    out["tokens_saved"] = out["tokens_in"] - out["tokens_out"]
+    out["tokenizer"] = "tiktoken" if _get_encoder() is not None else "estimate"
+    return out
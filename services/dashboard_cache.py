@@ -0,0 +1,125 @@
+"""Process-wide stale-while-revalidate cache for the landing and community dashboards.
+
+Today's stats, trending categories and recent alerts change slowly but were queried on every Streamlit
+rerun of every visitor. Each is now loaded once per FRESH_SECONDS for the whole process. After that the
+cached value is still served while one background thread reloads it, so a slow database never holds up a
+page. Only a value older than MAX_STALE_SECONDS (or not yet loaded) is loaded inline; concurrent callers
+wait for that single load. A failed reload keeps serving the old value.
+
+invalidate_scans() is called when new scans are written: stats and trending are then refreshed on the
+next read once they are MIN_REFRESH_SECONDS old, so a burst of checks costs at most one reload per key
+per MIN_REFRESH_SECONDS.
+"""
+import copy
+import threading
+import time
+
+from db.queries import get_recent_alerts, get_stats_today, get_trending_categories
+
+FRESH_SECONDS = 30
+MAX_STALE_SECONDS = 600
+MIN_REFRESH_SECONDS = 2
+
+_lock = threading.Lock()
+_entries = {}  # key -> {"value", "loaded_at", "fresh_until", "refreshing"}
+_load_locks = {}  # key -> Lock held while loading inline
+_stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "errors": 0}
+_scan_generation = 0  # bumped by invalidate_scans; a load that overlapped one is not fresh for long
+
+_SCAN_KEYS = ("stats_today", "trending")
+
+
+def _load(key: tuple, loader):
+    """Run loader and store its value; returns it (raises if it fails)."""
+    with _lock:
+        generation = _scan_generation
+    value = loader()
+    now = time.monotonic()
+    with _lock:
+        overlapped = key[0] in _SCAN_KEYS and generation != _scan_generation
+        fresh_until = now + (MIN_REFRESH_SECONDS if overlapped else FRESH_SECONDS)
+        _entries[key] = {"value": value, "loaded_at": now, "fresh_until": fresh_until, "refreshing": False}
+    return value
+
+
+def _refresh(key: tuple, loader) -> None:
+    try:
+        _load(key, loader)
+    except Exception:
+        with _lock:
+            _stats["errors"] += 1
+            entry = _entries.get(key)
+            if entry is not None:
+                entry["refreshing"] = False
+                entry["fresh_until"] = time.monotonic() + MIN_REFRESH_SECONDS  # retry later, not on every read
+
+
+def _get(key: tuple, loader):
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and now < entry["fresh_until"]:
+            _stats["hits"] += 1
+            return copy.deepcopy(entry["value"])
+        if entry is not None and now - entry["loaded_at"] < MAX_STALE_SECONDS:
+            _stats["stale_hits"] += 1
+            if not entry["refreshing"]:
+                entry["refreshing"] = True
+                _stats["refreshes"] += 1
+                threading.Thread(target=_refresh, args=(key, loader), name="dashboard-refresh", daemon=True).start()
+            return copy.deepcopy(entry["value"])
+        load_lock = _load_locks.setdefault(key, threading.Lock())
+    with load_lock:
+        with _lock:
+            entry = _entries.get(key)
+            if entry is not None and time.monotonic() < entry["fresh_until"]:
+                _stats["hits"] += 1  # loaded by the caller we waited for
+                return copy.deepcopy(entry["value"])
+            _stats["misses"] += 1
+        try:
+            return copy.deepcopy(_load(key, loader))
+        except Exception:
+            with _lock:
+                _stats["errors"] += 1
+                if entry is not None:
+                    return copy.deepcopy(entry["value"])  # too stale, but better than nothing
+            raise
+
+
+def stats_today() -> dict:
+    """Cached db.queries.get_stats_today()."""
+    return _get(("stats_today",), get_stats_today)
+
+
+def trending_categories(limit: int = 5) -> list:
+    """Cached db.queries.get_trending_categories(limit)."""
+    return _get(("trending", limit), lambda: get_trending_categories(limit))
+
+
+def recent_alerts(limit: int = 10) -> list:
+    """Cached db.queries.get_recent_alerts(limit)."""
+    return _get(("alerts", limit), lambda: get_recent_alerts(limit))
+
+
+def invalidate_scans() -> None:
+    """New scans were written: let stats and trending refresh once they are MIN_REFRESH_SECONDS old."""
+    global _scan_generation
+    with _lock:
+        _scan_generation += 1
+        for key, entry in _entries.items():
+            if key[0] in _SCAN_KEYS:
+                entry["fresh_until"] = min(entry["fresh_until"], entry["loaded_at"] + MIN_REFRESH_SECONDS)
+
+
+def stats() -> dict:
+    """Hits (fresh), stale hits (served while refreshing), misses (loaded inline), background refreshes, errors."""
+    with _lock:
+        out = dict(_stats)
+        out["entries"] = len(_entries)
+    return out
+
+
+def clear() -> None:
+    """Drop all cached values."""
+    with _lock:
+        _entries.clear()
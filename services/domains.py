@@ -0,0 +1,54 @@
+"""Link hosts: normalization, URL shorteners, official domains that scam messages quote as decoys, and other
+widely used legitimate sites.
+
+Shared by prescreen (a link to an official site is not a scam signal) and indicators (official and common
+domains are never counted as repeat offenders: a scam that mentions Shopee or YouTube says nothing about them;
+on PATH_HOSTS such as wa.me the path is what gets counted).
+"""
+import re
+
+SHORTENERS = {"bit.ly", "tinyurl.com", "cutt.ly", "is.gd", "t.co", "rb.gy", "shorturl.at", "tiny.cc", "ow.ly", "s.id"}
+OFFICIAL_DOMAINS = {
+    "gcash.com", "maya.ph", "paymaya.com", "bdo.com.ph", "bpi.com.ph", "metrobank.com.ph", "landbank.com",
+    "unionbankph.com", "securitybank.com", "rcbc.com", "pnb.com.ph", "chinabank.ph", "eastwestbanker.com",
+    "philhealth.gov.ph", "sss.gov.ph", "pagibigfund.gov.ph", "gsis.gov.ph",
+}
+# Marketplaces, couriers, telcos and big platforms: legitimate, and too common in messages to say anything.
+# Not official: anyone can host a form or page on them, so a link there is still a link
+COMMON_DOMAINS = {
+    "lazada.com.ph", "lazada.com", "shopee.ph", "shopee.com", "zalora.com.ph", "temu.com", "amazon.com",
+    "jtexpress.ph", "lbcexpress.com", "ninjavan.co", "2go.com.ph", "flashexpress.ph", "grab.com", "foodpanda.ph",
+    "angkas.com", "globe.com.ph", "smart.com.ph", "dito.ph", "pldthome.com", "converge.com.ph", "meralco.com.ph",
+    "youtube.com", "instagram.com", "messenger.com", "whatsapp.com", "viber.com", "telegram.org", "tiktok.com",
+    "x.com", "twitter.com", "linkedin.com", "gmail.com", "yahoo.com", "outlook.com", "google.com", "apple.com",
+    "icloud.com", "microsoft.com", "paypal.com", "wikipedia.org",
+}
+# Hosts where the path names the account or page (wa.me/63917..., t.me/<handle>, facebook.com/<page>): like a
+# shortener, the host alone says nothing, but host plus path identifies whoever is behind the link
+PATH_HOSTS = {
+    "wa.me", "m.me", "fb.me", "t.me", "youtu.be", "facebook.com", "fb.com", "sites.google.com",
+    "docs.google.com", "forms.google.com", "forms.gle",
+}
+
+
+def host_of(raw: str) -> str:
+    """Lowercase host of a URL or bare domain (no scheme, www, port, path or trailing punctuation)."""
+    url = re.sub(r"^https?://", "", raw.strip(), flags=re.IGNORECASE).rstrip(".,;:!?)]}")
+    host = url.partition("/")[0]
+    host = host.split("@")[-1].split(":")[0].strip(".").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def is_official(host: str) -> bool:
+    """True for government (.gov.ph) hosts and official domains or their subdomains."""
+    return host.endswith(".gov.ph") or any(host == d or host.endswith("." + d) for d in OFFICIAL_DOMAINS)
+
+
+def path_host(host: str) -> str:
+    """The PATH_HOSTS entry host is (or is a subdomain of, e.g. m.facebook.com), else ""."""
+    return next((d for d in PATH_HOSTS if host == d or host.endswith("." + d)), "")
+
+
+def is_well_known(host: str) -> bool:
+    """True for official hosts (see is_official) and common legitimate domains or their subdomains."""
+    return is_official(host) or any(host == d or host.endswith("." + d) for d in COMMON_DOMAINS)
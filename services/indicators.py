@@ -0,0 +1,190 @@
+"""Indicators (link domains, PH mobile numbers) extracted from checked messages.
+
+Indicators are stored only as HMAC keys (secret from INDICATOR_HMAC_KEY in secrets), never raw, with a
+count of the distinct messages the model judged SCAM that they appeared in: re-checking one message does not
+raise the count, and local verdicts (prescreen, near-duplicates, repeat offenders) are never recorded. Without
+INDICATOR_HMAC_KEY the index is off (a public key would let anyone brute-force the hashed phone numbers).
+A process-wide Bloom filter of every reported key answers "never reported" without touching the DB, so a
+check only queries counts when an indicator may be known. Official and common legitimate domains (see
+services.domains) are never counted: scammers quote them as decoys.
+"""
+import hashlib
+import hmac
+import re
+import threading
+import time
+from datetime import datetime
+
+from db.queries import get_indicator_counts, list_indicator_keys, record_indicators
+from services.domains import SHORTENERS, host_of, is_well_known, path_host
+
+# An indicator seen in this many SCAM verdicts decides the verdict locally
+REPEAT_OFFENDER_MIN = 5
+BLOOM_BITS = 1 << 20  # 128 KiB; ~1% false positives at ~100k indicators
+BLOOM_HASHES = 7
+BLOOM_REFRESH_SECONDS = 300
+
+_URL = re.compile(
+    r"(?:https?://|\bwww\.)[^\s<>\"']+"
+    r"|\b(?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)+(?:ph|com|net|org|xyz|top|info|site|online|link|click|shop|ly|co|gd|at|cc|id|me|gle)\b(?:/[^\s<>\"']*)?",
+    re.IGNORECASE,
+)
+_PH_MOBILE = re.compile(r"(?<!\d)(?:\+?63|0)[\s-]?(9\d{2})[\s-]?(\d{3})[\s-]?(\d{4})(?!\d)")
+
+_lock = threading.Lock()
+_bloom = bytearray(BLOOM_BITS // 8)
+_bloom_loaded_at = 0.0
+_bloom_since = ""
+_hmac_key = None
+_stats = {"lookups": 0, "bloom_negative": 0, "db_lookups": 0, "known": 0, "recorded": 0}
+
+
+def _get_hmac_key() -> bytes:
+    """INDICATOR_HMAC_KEY from secrets; empty when unset (the index is then disabled)."""
+    global _hmac_key
+    if _hmac_key is None:
+        key = ""
+        try:
+            import streamlit as st
+            key = (st.secrets.get("INDICATOR_HMAC_KEY") or "").strip()
+        except Exception:
+            pass
+        _hmac_key = key.encode("utf-8")
+    return _hmac_key
+
+
+def enabled() -> bool:
+    """True when INDICATOR_HMAC_KEY is set; otherwise nothing is looked up or recorded."""
+    return bool(_get_hmac_key())
+
+
+def _normalize_url(raw: str) -> str:
+    """Host (lowercase, no www/port); shortener and PATH_HOSTS links keep their path since the host alone says
+    nothing (subdomains of a PATH_HOSTS entry fold into it, so m.facebook.com/x is facebook.com/x)."""
+    url = re.sub(r"^https?://", "", raw.strip(), flags=re.IGNORECASE).rstrip(".,;:!?)]}")
+    path = url.partition("/")[2]
+    host = host_of(url)
+    if host in SHORTENERS or path_host(host):
+        host = path_host(host) or host
+        path = path.split("?")[0].split("#")[0].strip("/")
+        return f"{host}/{path}" if path else ""
+    return host
+
+
+def extract(text: str) -> list:
+    """[(kind, value)] for the domains and PH mobile numbers in text, deduplicated, well-known domains skipped."""
+    found = []
+    seen = set()
+    for m in _URL.finditer(text or ""):
+        if m.start() and text[m.start() - 1] == "@":
+            continue  # domain part of an email address
+        value = _normalize_url(m.group(0))
+        # Values with a path are shortener / PATH_HOSTS links: kept even on well-known hosts
+        if not value or "." not in value or ("/" not in value and is_well_known(value)):
+            continue
+        if ("domain", value) not in seen:
+            seen.add(("domain", value))
+            found.append(("domain", value))
+    for m in _PH_MOBILE.finditer(text or ""):
+        value = "63" + "".join(m.groups())
+        if ("phone", value) not in seen:
+            seen.add(("phone", value))
+            found.append(("phone", value))
+    return found
+
+
+def key_for(kind: str, value: str) -> str:
+    """HMAC-SHA256 of kind:value; the only form in which an indicator is stored."""
+    return hmac.new(_get_hmac_key(), f"{kind}:{value}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def _bloom_positions(key: str) -> list:
+    # The key is already a uniform hash: slice it instead of hashing again
+    return [int(key[i * 8:(i + 1) * 8], 16) % BLOOM_BITS for i in range(BLOOM_HASHES)]
+
+
+def _bloom_add(key: str) -> None:
+    for p in _bloom_positions(key):
+        _bloom[p >> 3] |= 1 << (p & 7)
+
+
+def _bloom_maybe(key: str) -> bool:
+    return all(_bloom[p >> 3] & (1 << (p & 7)) for p in _bloom_positions(key))
+
+
+def _refresh_bloom() -> None:
+    """Add keys reported since the last refresh (other processes write to the same table)."""
+    global _bloom_loaded_at, _bloom_since
+    with _lock:
+        if time.monotonic() - _bloom_loaded_at < BLOOM_REFRESH_SECONDS and _bloom_loaded_at:
+            return
+        _bloom_loaded_at = time.monotonic()
+        since = _bloom_since
+    started = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        keys = list_indicator_keys(since)
+    except Exception:
+        return
+    with _lock:
+        for k in keys:
+            _bloom_add(k)
+        _bloom_since = started
+
+
+def lookup(found: list) -> list:
+    """[(kind, value, scam_count)] for extracted indicators already seen in SCAM verdicts."""
+    if not found or not enabled():
+        return []
+    _refresh_bloom()
+    keyed = [(kind, value, key_for(kind, value)) for kind, value in found]
+    with _lock:
+        _stats["lookups"] += 1
+        maybe = [t for t in keyed if _bloom_maybe(t[2])]
+        if not maybe:
+            _stats["bloom_negative"] += 1
+            return []
+        _stats["db_lookups"] += 1
+    try:
+        counts = get_indicator_counts([k for _, _, k in maybe])
+    except Exception:
+        return []
+    known = [(kind, value, counts[k]) for kind, value, k in maybe if counts.get(k, 0) > 0]
+    if known:
+        with _lock:
+            _stats["known"] += 1
+    return known
+
+
+def record_scam(found: list, msg_hash: str) -> None:
+    """Count the indicators of a message the model judged SCAM, once per msg_hash. DB errors are swallowed."""
+    if not found or not msg_hash or not enabled():
+        return
+    rows = [(key_for(kind, value), kind) for kind, value in found]
+    try:
+        counted = record_indicators(rows, msg_hash)
+    except Exception:
+        return
+    with _lock:
+        for k, _ in rows:
+            _bloom_add(k)
+        _stats["recorded"] += counted
+
+
+def describe(known: list) -> list:
+    """Red-flag lines for known indicators, e.g. 'Link bit.ly/x was already reported in 3 scam checks'."""
+    out = []
+    for kind, value, count in sorted(known, key=lambda t: -t[2]):
+        label = "Link" if kind == "domain" else "Number"
+        shown = value if kind == "domain" else "0" + value[2:]
+        times = "1 scam check" if count == 1 else f"{count} scam checks"
+        out.append(f"{label} {shown} was already reported in {times}")
+    return out
+
+
+def stats() -> dict:
+    """Lookups, how many the Bloom filter answered alone, DB lookups, messages with known indicators, indicators
+    recorded (new message sightings only), and whether the index is enabled."""
+    with _lock:
+        out = dict(_stats)
+    out["enabled"] = enabled()
+    return out
@@ -0,0 +1,143 @@
+"""Incremental JSON parser for the model's verdict object.
+
+Feed text chunks as they stream in; partial() returns the top-level fields whose values are complete,
+and for list fields (reasons, recommended_actions, ...) the items completed so far. Parsing resumes where
+the last feed stopped, so each chunk costs roughly its own length. The same parser salvages the valid
+prefix of a response that was cut off (e.g. at max_tokens).
+"""
+import json
+import re
+
+_decoder = json.JSONDecoder()
+_WS = re.compile(r"\s*")
+
+# Parser phases
+_START = "start"
+_KEY = "key"            # expecting a key or '}'
+_COLON = "colon"
+_VALUE = "value"
+_ITEM = "item"          # inside a list value: expecting an item or ']'
+_ITEM_SEP = "item_sep"  # inside a list value: expecting ',' or ']'
+_SEP = "sep"            # expecting ',' or '}'
+_DONE = "done"
+
+
+class IncrementalObjectParser:
+    """Parses one top-level JSON object incrementally. Invalid input simply stops progress."""
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._phase = _START
+        self._key = None
+        self._result = {}
+
+    @property
+    def done(self) -> bool:
+        return self._phase == _DONE
+
+    def feed(self, chunk: str) -> dict:
+        """Append chunk, advance as far as the data allows, and return partial()."""
+        if chunk:
+            self._buf += chunk
+        while self._step():
+            pass
+        return self.partial()
+
+    def partial(self) -> dict:
+        """Snapshot of the fields parsed so far (lists are copied)."""
+        return {k: (list(v) if isinstance(v, list) else v) for k, v in self._result.items()}
+
+    def _skip_ws(self):
+        self._pos = _WS.match(self._buf, self._pos).end()
+
+    def _decode_value(self):
+        """Decode one complete JSON value at pos; None if it may still be incomplete."""
+        try:
+            value, end = _decoder.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError:
+            return None
+        # A number at the very end of the buffer may still grow ("8" -> "85")
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and end >= len(self._buf):
+            return None
+        self._pos = end
+        return (value,)
+
+    def _step(self) -> bool:
+        """Advance one token. Returns False when more data is needed (or parsing is finished/stuck)."""
+        self._skip_ws()
+        if self._pos >= len(self._buf) or self._phase == _DONE:
+            return False
+        ch = self._buf[self._pos]
+        if self._phase == _START:
+            # Tolerate markdown fences or chatter before the object
+            brace = self._buf.find("{", self._pos)
+            if brace < 0:
+                return False
+            self._pos = brace + 1
+            self._phase = _KEY
+            return True
+        if self._phase == _KEY:
+            if ch == "}":
+                self._pos += 1
+                self._phase = _DONE
+                return False
+            if ch != '"':
+                return False
+            decoded = self._decode_value()
+            if decoded is None:
+                return False
+            self._key = decoded[0]
+            self._phase = _COLON
+            return True
+        if self._phase == _COLON:
+            if ch != ":":
+                return False
+            self._pos += 1
+            self._phase = _VALUE
+            return True
+        if self._phase == _VALUE:
+            if ch == "[":
+                self._pos += 1
+                self._result[self._key] = []
+                self._phase = _ITEM
+                return True
+            decoded = self._decode_value()
+            if decoded is None:
+                return False
+            self._result[self._key] = decoded[0]
+            self._phase = _SEP
+            return True
+        if self._phase in (_ITEM, _ITEM_SEP):
+            if ch == "]":
+                self._pos += 1
+                self._phase = _SEP
+                return True
+            if self._phase == _ITEM_SEP:
+                if ch != ",":
+                    return False
+                self._pos += 1
+                self._phase = _ITEM
+                return True
+            decoded = self._decode_value()
+            if decoded is None:
+                return False
+            self._result[self._key].append(decoded[0])
+            self._phase = _ITEM_SEP
+            return True
+        if self._phase == _SEP:
+            if ch == ",":
+                self._pos += 1
+                self._phase = _KEY
+                return True
+            if ch == "}":
+                self._pos += 1
+                self._phase = _DONE
+            return False
+        return False
+
+
+def salvage(text: str) -> dict:
+    """Parse as much of a (possibly truncated) JSON object as is valid; {} if nothing usable."""
+    parser = IncrementalObjectParser()
+    return parser.feed(text or "")
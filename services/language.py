@@ -0,0 +1,55 @@
+"""Local language detection for English / Tagalog / Mixed (Taglish) from stopword and spelling profiles.
+
+Function words dominate short messages in both languages, so hits against two small stopword sets carry
+most of the signal. Taglish keeps Tagalog grammar words but borrows English content words, so words with
+spellings native Tagalog does not use (c, f, j, q, v, x, z, th, sh, wh) also count as English.
+Too few hits returns "" (let the model decide).
+"""
+import re
+
+ENGLISH = "English"
+TAGALOG = "Tagalog"
+MIXED = "Mixed"
+
+MIN_HITS = 3
+TAGALOG_RATIO = 0.85  # share of hits that are Tagalog
+ENGLISH_RATIO = 0.15
+
+_TAGALOG_WORDS = frozenset("""
+ang ng nang mga sa na ka mo ko po opo ako ikaw siya kami tayo kayo sila ito iyan iyon yan yun yung
+para kung hindi di wala mayroon meron lang din rin naman ba pa kasi pero talaga natin namin ninyo
+niyo nyo nila niya lahat dito doon diyan ngayon agad sana paki pakibigay pakisend salamat
+ano bakit paano saan kailan sino ilan huwag wag kayong akong kang kayang pwede puwede
+ninyong aming inyong ating kanilang kanyang sayo sakin akin iyo amin atin inyo kanila kaniya
+o pag kapag habang dahil kaya upang tapos muna nga daw raw pala yata siguro baka
+""".split())
+
+_ENGLISH_WORDS = frozenset("""
+the and to of a an in is are was were be been you your yours for on with this that these those it its
+we our us they their them he she his her i my me will would can could should please from by or as
+not no yes have has had do does did if then than so but about into out up down here there now today
+just only also all any some more most what which who when where why how account click link send
+""".split())
+
+_WORD = re.compile(r"[a-zA-Z']+")
+_ENGLISH_SPELLING = re.compile(r"[cfjqvxz]|th|sh|wh")
+
+
+def detect(text: str) -> str:
+    """English, Tagalog or Mixed; "" when the text has too few function words to tell."""
+    tl = en = 0
+    for w in _WORD.findall(text or ""):
+        w = w.lower()
+        if w in _TAGALOG_WORDS:
+            tl += 1
+        elif w in _ENGLISH_WORDS or (len(w) > 2 and _ENGLISH_SPELLING.search(w)):
+            en += 1
+    total = tl + en
+    if total < MIN_HITS:
+        return ""
+    ratio = tl / total
+    if ratio >= TAGALOG_RATIO:
+        return TAGALOG
+    if ratio <= ENGLISH_RATIO:
+        return ENGLISH
+    return MIXED
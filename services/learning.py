@@ -0,0 +1,235 @@
+"""Opt-in feature store and local linear classifier.
+
+When a user ticks "Allow anonymized learning", the check stores a hashed feature vector (token unigram and
+bigram hashes, pre-screen signals, indicator flags, channel) plus the final verdict in learning_features.
+No text is stored: only bucket numbers. The offline trainer fits a logistic regression with NumPy over
+those sparse vectors and saves it to MODEL_PATH; the app loads it at startup. A confident local SCAM
+verdict skips the OpenAI call (SAFE is only decided locally if LOCAL_SAFE_THRESHOLD is raised above 0).
+
+Train:  python -m services.learning train
+"""
+import hashlib
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from db.queries import insert_learning_example, list_learning_examples
+from services.indicators import extract as extract_indicators
+from services.near_dup import normalize_tokens
+from services.prescreen import SIGNALS, match_signals
+
+N_FEATURES = 1 << 18
+MODEL_PATH = Path(__file__).resolve().parent.parent / "local_model.npz"
+LOCAL_SCAM_THRESHOLD = 0.97
+LOCAL_SAFE_THRESHOLD = 0.0  # P(scam) at or below this is a local SAFE; 0 disables local SAFE verdicts
+MIN_TRAIN_EXAMPLES = 200
+RELOAD_CHECK_SECONDS = 60
+
+_lock = threading.Lock()
+_model = None  # {"weights": ndarray, "bias": float, "meta": dict}
+_model_mtime = 0.0
+_checked_at = 0.0
+_stats = {"predictions": 0, "local_scam": 0, "local_safe": 0, "examples_saved": 0}
+
+
+def _bucket(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=4).digest(), "big") % N_FEATURES
+
+
+def featurize(text: str, channel: str = "") -> list:
+    """Sorted unique feature buckets for a message (hashed n-grams, signals, indicator kinds, channel)."""
+    tokens = normalize_tokens(text)
+    features = {f"w:{t}" for t in tokens}
+    features.update(f"b:{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    features.update(f"s:{name}" for name in match_signals(text))
+    features.update(f"i:{kind}" for kind, _ in extract_indicators(text))
+    if channel:
+        features.add(f"c:{channel.strip().lower()}")
+    return sorted({_bucket(f) for f in features})
+
+
+def record_example(text: str, channel: str, result: dict) -> None:
+    """Store one consented check (features + final verdict) when the verdict came fresh from the model.
+    Never fails the caller."""
+    verdict = (result or {}).get("verdict")
+    # Only fresh LLM verdicts are labels: prescreen, repeat-offender, near-duplicate, cached, degraded and the
+    # local model's own verdicts come from rules or earlier answers, and training on them would only echo those
+    source = (result.get("metrics") or {}).get("source") if verdict else None
+    if verdict not in ("SAFE", "SUSPICIOUS", "SCAM") or not result.get("confidence") or source != "model":
+        return
+    try:
+        features = featurize(text, channel)
+        if not features:
+            return
+        insert_learning_example(",".join(str(f) for f in features), (channel or "").strip(), verdict)
+    except Exception:
+        return
+    with _lock:
+        _stats["examples_saved"] += 1
+
+
+def _load_if_changed() -> None:
+    """(Re)load MODEL_PATH when it appears or changes; checks the file at most every RELOAD_CHECK_SECONDS."""
+    global _model, _model_mtime, _checked_at
+    with _lock:
+        if time.monotonic() - _checked_at < RELOAD_CHECK_SECONDS and _checked_at:
+            return
+        _checked_at = time.monotonic()
+    try:
+        mtime = MODEL_PATH.stat().st_mtime
+    except OSError:
+        return
+    if mtime == _model_mtime:
+        return
+    try:
+        with np.load(MODEL_PATH, allow_pickle=False) as data:
+            weights = data["weights"].astype(np.float32)
+            bias = float(data["bias"])
+            meta = {k: data[k].item() for k in ("n_examples", "holdout_precision", "trained_at") if k in data}
+    except Exception:
+        return
+    if weights.shape != (N_FEATURES,):
+        return
+    with _lock:
+        _model = {"weights": weights, "bias": bias, "meta": meta}
+        _model_mtime = mtime
+
+
+def load_model() -> bool:
+    """Load the trained model at startup (no-op if already loaded and unchanged). True if a model is available."""
+    _load_if_changed()
+    return _model is not None
+
+
+def _probability(features: list) -> float:
+    model = _model
+    z = model["bias"] + float(model["weights"][features].sum()) if features else model["bias"]
+    return float(1.0 / (1.0 + np.exp(-z)))
+
+
+def predict(text: str, channel: str = "") -> dict | None:
+    """Local verdict (result shape) when the model is confident, else None (or no model trained yet)."""
+    _load_if_changed()
+    if _model is None:
+        return None
+    p = _probability(featurize(text, channel))
+    with _lock:
+        _stats["predictions"] += 1
+    if p >= LOCAL_SCAM_THRESHOLD:
+        with _lock:
+            _stats["local_scam"] += 1
+        signals = match_signals(text)
+        flags = [SIGNALS[name][1] for name in SIGNALS if name in signals]
+        return {
+            "verdict": "SCAM",
+            "confidence": min(99, int(round(p * 100))),
+            "category": "Unknown",
+            "reasons": ["Closely matches messages that earlier checks confirmed as scams."] + flags[:5],
+            "recommended_actions": [
+                "Do not click links, share OTP/PIN, or send money.",
+                "Verify through the official app, website, or hotline of the company or agency named.",
+                "Block and report the sender.",
+            ],
+            "warning_message": "This message looks like scams our community has already checked. Don't engage.",
+            "red_flags": flags[:10],
+            "safety_notes": "Decided by the local model trained on anonymized checks; no AI call was made.",
+        }
+    if LOCAL_SAFE_THRESHOLD > 0 and p <= LOCAL_SAFE_THRESHOLD:
+        with _lock:
+            _stats["local_safe"] += 1
+        return {
+            "verdict": "SAFE",
+            "confidence": min(99, int(round((1 - p) * 100))),
+            "category": "Unknown",
+            "reasons": ["Closely matches messages that earlier checks found legitimate."],
+            "recommended_actions": ["Still verify unexpected requests through official channels."],
+            "warning_message": "",
+            "red_flags": [],
+            "safety_notes": "Decided by the local model trained on anonymized checks; no AI call was made.",
+        }
+    return None
+
+
+def stats() -> dict:
+    """Prediction counts, local verdicts, examples saved this process, and the loaded model's metadata."""
+    with _lock:
+        out = dict(_stats)
+        out["model"] = dict(_model["meta"]) if _model is not None else None
+    return out
+
+
+# ---------- Offline training ----------
+
+
+def _to_csr(rows: list) -> tuple:
+    """(indptr, indices) for a list of feature-bucket lists."""
+    lengths = np.fromiter((len(r) for r in rows), dtype=np.int64, count=len(rows))
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+    indices = np.fromiter((f for r in rows for f in r), dtype=np.int64, count=int(indptr[-1]))
+    return indptr, indices
+
+
+def _scores(weights: np.ndarray, bias: float, indptr: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    sums = np.add.reduceat(weights[indices], indptr[:-1]) if len(indices) else np.zeros(len(indptr) - 1)
+    sums[np.diff(indptr) == 0] = 0.0  # reduceat repeats the next value for empty rows
+    return sums + bias
+
+
+def fit(rows: list, labels: np.ndarray, epochs: int = 200, lr: float = 0.5, l2: float = 1e-4) -> tuple:
+    """Full-batch gradient descent for L2-regularized logistic regression on sparse binary rows."""
+    indptr, indices = _to_csr(rows)
+    lengths = np.diff(indptr)
+    weights = np.zeros(N_FEATURES, dtype=np.float64)
+    bias = 0.0
+    n = len(rows)
+    for _ in range(epochs):
+        p = 1.0 / (1.0 + np.exp(-_scores(weights, bias, indptr, indices)))
+        err = (p - labels) / n
+        grad = np.zeros(N_FEATURES, dtype=np.float64)
+        np.add.at(grad, indices, np.repeat(err, lengths))
+        weights -= lr * (grad + l2 * weights)
+        bias -= lr * float(err.sum())
+    return weights, bias
+
+
+def train(path: Path = MODEL_PATH, seed: int = 0) -> dict:
+    """Fit SCAM vs SAFE from learning_features (SUSPICIOUS is skipped), report holdout precision, save the model."""
+    examples = [e for e in list_learning_examples() if e["verdict"] in ("SCAM", "SAFE")]
+    if len(examples) < MIN_TRAIN_EXAMPLES:
+        return {"trained": False, "reason": f"need {MIN_TRAIN_EXAMPLES} SCAM/SAFE examples, have {len(examples)}"}
+    rows = [[int(f) for f in e["features"].split(",") if f] for e in examples]
+    labels = np.array([1.0 if e["verdict"] == "SCAM" else 0.0 for e in examples])
+    order = np.random.default_rng(seed).permutation(len(rows))
+    cut = int(len(rows) * 0.8)
+    train_idx, test_idx = order[:cut], order[cut:]
+    weights, bias = fit([rows[i] for i in train_idx], labels[train_idx])
+    # Precision of confident local SCAM verdicts on held-out checks: what skipping the AI would cost
+    indptr, indices = _to_csr([rows[i] for i in test_idx])
+    p = 1.0 / (1.0 + np.exp(-_scores(weights, bias, indptr, indices)))
+    confident = p >= LOCAL_SCAM_THRESHOLD
+    precision = float(labels[test_idx][confident].mean()) if confident.any() else 0.0
+    coverage = float(confident.mean()) if len(test_idx) else 0.0
+    weights, bias = fit(rows, labels)
+    np.savez_compressed(
+        path,
+        weights=weights.astype(np.float32),
+        bias=np.float64(bias),
+        n_examples=np.int64(len(rows)),
+        holdout_precision=np.float64(precision),
+        trained_at=np.str_(datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")),
+    )
+    return {"trained": True, "n_examples": len(rows), "holdout_precision": precision, "holdout_coverage": coverage, "path": str(path)}
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] != ["train"]:
+        print("usage: python -m services.learning train")
+        sys.exit(2)
+    from db.schema import init_db
+    init_db()
+    print(train())
@@ -0,0 +1,143 @@
+"""Per-stage latency and token usage of each check.
+
+analysis opens a Trace per check and wraps each stage (sanitize, pre-screen, cache, client construction,
+the network call, parsing, normalizing, ...) in trace.span(stage). finish() folds the trace into a
+process-wide registry (a rolling window per stage for p50/p95/p99) and returns the per-check summary
+that record_check stores on the scan row, so slow checks can be attributed after the fact.
+
+total_ms stops when the final result is ready (Trace.end()). On the streaming path the page then draws
+the result; add_render() records that time as a separate "render" stage, never as part of the total.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+WINDOW = 2000  # most recent checks kept per stage for percentiles
+
+# Display order on Admin → Stats; unknown stages sort after these
+STAGES = (
+    "sanitize", "indicators", "prescreen", "cache", "near_dup", "local_model", "compaction",
+    "queue", "client", "network", "parse", "normalize", "store", "wait", "total", "render",
+)
+
+_lock = threading.Lock()
+_windows = {}  # stage -> deque of milliseconds
+_counts = {"checks": 0, "prompt_tokens": 0, "completion_tokens": 0, "input_tokens_saved": 0}
+_sources = {}  # where the verdict came from -> checks
+
+
+class Trace:
+    """Stage timings (seconds, summed per stage) and token usage for one check."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.ended = None
+        self.stages = {}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.model = ""
+        self.source = ""
+        self.compaction = None  # compaction.compact()'s info when the message was compacted for the model
+
+    @contextmanager
+    def span(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def end(self) -> None:
+        """Stop the total clock (the final result is ready); later calls keep the first end."""
+        if self.ended is None:
+            self.ended = time.perf_counter()
+
+    def add_usage(self, model: str, usage) -> None:
+        """Count a reply's usage (dict from analysis._usage); the last model called is the one reported."""
+        self.model = model
+        self.prompt_tokens += (usage or {}).get("prompt_tokens", 0)
+        self.completion_tokens += (usage or {}).get("completion_tokens", 0)
+
+    def summary(self) -> dict:
+        out = {
+            "source": self.source,
+            "model": self.model,
+            "total_ms": round(((self.ended or time.perf_counter()) - self.started) * 1000, 1),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "stages": {k: round(v * 1000, 1) for k, v in self.stages.items()},
+        }
+        if self.compaction:
+            out["input_tokens_before"] = self.compaction["tokens_before"]
+            out["input_tokens_after"] = self.compaction["tokens_after"]
+        return out
+
+
+def _window(stage: str) -> deque:
+    window = _windows.get(stage)
+    if window is None:
+        window = _windows[stage] = deque(maxlen=WINDOW)
+    return window
+
+
+def finish(trace: Trace, source: str = "") -> dict:
+    """Close a check's trace: record it in the registry and return its summary (stage times in ms)."""
+    if source and not trace.source:
+        trace.source = source
+    trace.end()
+    out = trace.summary()
+    with _lock:
+        _counts["checks"] += 1
+        _counts["prompt_tokens"] += out["prompt_tokens"]
+        _counts["completion_tokens"] += out["completion_tokens"]
+        _counts["input_tokens_saved"] += out.get("input_tokens_before", 0) - out.get("input_tokens_after", 0)
+        _sources[out["source"]] = _sources.get(out["source"], 0) + 1
+        for stage, ms in list(out["stages"].items()) + [("total", out["total_ms"])]:
+            _window(stage).append(ms)
+    return out
+
+
+def add_render(summary: dict, seconds: float) -> None:
+    """Record the time the page spent drawing a streamed check as its "render" stage (not in total_ms)."""
+    ms = round(seconds * 1000, 1)
+    if summary is not None:
+        summary.setdefault("stages", {})["render"] = ms
+    with _lock:
+        _window("render").append(ms)
+
+
+def _percentile(ordered: list, q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def stats() -> dict:
+    """Checks, token totals (incl. message tokens saved by compaction), verdict sources, and per-stage count / avg / p50 / p95 / p99 in ms (recent window)."""
+    with _lock:
+        out = dict(_counts)
+        out["sources"] = dict(_sources)
+        windows = {stage: sorted(w) for stage, w in _windows.items()}
+    order = {stage: i for i, stage in enumerate(STAGES)}
+    out["stages"] = {}
+    for stage in sorted(windows, key=lambda s: (order.get(s, len(STAGES)), s)):
+        values = windows[stage]
+        out["stages"][stage] = {
+            "count": len(values),
+            "avg_ms": round(sum(values) / len(values), 1),
+            "p50_ms": _percentile(values, 0.50),
+            "p95_ms": _percentile(values, 0.95),
+            "p99_ms": _percentile(values, 0.99),
+        }
+    return out
+
+
+def reset() -> None:
+    """Clear the registry (e.g. between benchmark runs)."""
+    with _lock:
+        _windows.clear()
+        _sources.clear()
+        for k in _counts:
+            _counts[k] = 0
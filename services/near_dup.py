@@ -0,0 +1,227 @@
+"""Near-duplicate scam templates: MinHash signatures with banded (LSH) lookup.
+
+Scam waves reuse one template with different names, amounts, links and numbers, so the exact msg_hash
+rarely repeats. Messages are normalized (URLs, emails and digits become placeholders), split into word
+3-gram shingles and MinHash-signed. The signature is cut into bands; two messages share a band key with
+high probability when their shingle sets are similar, so lookup only compares a few candidates instead
+of every stored template. Only SCAM verdicts the model gave with high confidence are indexed, and a
+match must clear SIMILARITY_THRESHOLD (estimated Jaccard) to reuse that verdict.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from db.queries import find_scam_templates, prune_scam_templates, put_scam_template
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+MIN_SHINGLES = 8  # shorter messages are too generic to match safely
+SIMILARITY_THRESHOLD = 0.75
+CONFIRM_MIN_CONFIDENCE = 85
+TEMPLATE_TTL_SECONDS = 14 * 24 * 3600
+MEM_MAX_TEMPLATES = 5000
+DB_MAX_ROWS = 20000
+PRUNE_EVERY_N_PUTS = 200
+
+_PRIME = (1 << 61) - 1
+_MASK32 = 0xFFFFFFFF
+_rng = random.Random(20240601)  # fixed seed: signatures must be stable across processes and restarts
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+_URL = re.compile(r"https?://\S+|\bwww\.\S+|\b[a-z0-9-]+(?:\.[a-z0-9-]+)*\.(?:ph|com|net|org|xyz|top|info|site|online|link|click|shop|ly|co|gd|at|cc)(?:/\S*)?", re.IGNORECASE)
+_EMAIL = re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b")
+_NUMBER = re.compile(r"[+₱]?\d[\d,.\-\s]*\d|\d")
+_WORD = re.compile(r"\w+")
+
+_lock = threading.Lock()
+_templates = OrderedDict()  # msg_hash -> (stored_at_monotonic, signature, result dict)
+_bands = {}  # band key -> set of msg_hash
+_puts_since_prune = 0
+_stats = {"lookups": 0, "hits": 0, "indexed": 0}
+
+
+def normalize_tokens(text: str) -> list:
+    """Lowercased word tokens with URLs, emails and numbers replaced by placeholders."""
+    t = _URL.sub(" urltoken ", text or "")
+    t = _EMAIL.sub(" emailtoken ", t)
+    t = _NUMBER.sub(" numtoken ", t)
+    return _WORD.findall(t.lower())
+
+
+def _shingle_hashes(tokens: list) -> set:
+    out = set()
+    for i in range(len(tokens) - SHINGLE_SIZE + 1):
+        shingle = " ".join(tokens[i:i + SHINGLE_SIZE])
+        out.add(int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big"))
+    return out
+
+
+def signature(text: str):
+    """MinHash signature (tuple of NUM_PERM 32-bit ints), or None if the message is too short to fingerprint."""
+    hashes = _shingle_hashes(normalize_tokens(text))
+    if len(hashes) < MIN_SHINGLES:
+        return None
+    return tuple(min(((a * h + b) % _PRIME) for h in hashes) & _MASK32 for a, b in _PERMS)
+
+
+def band_keys(sig: tuple) -> list:
+    """One key per band; similar signatures share at least one key with high probability."""
+    keys = []
+    for band in range(BANDS):
+        chunk = ",".join(str(v) for v in sig[band * ROWS:(band + 1) * ROWS])
+        keys.append(f"{band}:{hashlib.blake2b(chunk.encode('ascii'), digest_size=8).hexdigest()}")
+    return keys
+
+
+def similarity(a: tuple, b: tuple) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
+
+
+def _encode(sig: tuple) -> str:
+    return "".join(f"{v:08x}" for v in sig)
+
+
+def _decode(raw: str):
+    try:
+        return tuple(int(raw[i:i + 8], 16) for i in range(0, NUM_PERM * 8, 8))
+    except (TypeError, ValueError):
+        return None
+
+
+def _utc_cutoff() -> str:
+    return (datetime.utcnow() - timedelta(seconds=TEMPLATE_TTL_SECONDS)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _mem_put(msg_hash: str, sig: tuple, result: dict) -> None:
+    with _lock:
+        if msg_hash in _templates:
+            _templates.move_to_end(msg_hash)
+            return
+        _templates[msg_hash] = (time.monotonic(), sig, dict(result))
+        for k in band_keys(sig):
+            _bands.setdefault(k, set()).add(msg_hash)
+        while len(_templates) > MEM_MAX_TEMPLATES:
+            old_hash, (_, old_sig, _) = _templates.popitem(last=False)
+            for k in band_keys(old_sig):
+                members = _bands.get(k)
+                if members is not None:
+                    members.discard(old_hash)
+                    if not members:
+                        del _bands[k]
+
+
+def _best(sig: tuple, candidates) -> tuple:
+    """(similarity, result) of the closest candidate [(signature, result)], or (0.0, None)."""
+    best_sim, best = 0.0, None
+    for cand_sig, result in candidates:
+        sim = similarity(sig, cand_sig)
+        if sim > best_sim:
+            best_sim, best = sim, result
+    return best_sim, best
+
+
+def _mem_candidates(keys: list) -> list:
+    now = time.monotonic()
+    with _lock:
+        hashes = set()
+        for k in keys:
+            hashes |= _bands.get(k, set())
+        out = []
+        for h in hashes:
+            stored_at, sig, result = _templates[h]
+            if now - stored_at <= TEMPLATE_TTL_SECONDS:
+                out.append((sig, dict(result)))
+        return out
+
+
+def _db_candidates(keys: list) -> list:
+    try:
+        rows = find_scam_templates(keys, _utc_cutoff())
+    except Exception:
+        return []
+    out = []
+    for row in rows:
+        sig = _decode(row.get("signature") or "")
+        try:
+            result = json.loads(row.get("result_json") or "")
+        except (json.JSONDecodeError, TypeError):
+            continue
+        if sig is None or not isinstance(result, dict):
+            continue
+        _mem_put(row.get("msg_hash") or "", sig, result)
+        out.append((sig, result))
+    return out
+
+
+def _reuse(result: dict, sim: float) -> dict:
+    out = dict(result)
+    out["reasons"] = ["Nearly identical to a scam message confirmed recently."] + list(result.get("reasons") or [])[:9]
+    out["safety_notes"] = f"Matched a known scam template ({round(sim * 100)}% similar); checked without a new AI call."
+    return out
+
+
+def lookup(sig) -> dict | None:
+    """Return a copy of the verdict of a confirmed scam template similar to sig, or None."""
+    if sig is None:
+        return None
+    with _lock:
+        _stats["lookups"] += 1
+    keys = band_keys(sig)
+    sim, result = _best(sig, _mem_candidates(keys))
+    if result is None or sim < SIMILARITY_THRESHOLD:
+        # Another process may have indexed it
+        sim, result = _best(sig, _db_candidates(keys))
+    if result is None or sim < SIMILARITY_THRESHOLD:
+        return None
+    with _lock:
+        _stats["hits"] += 1
+    return _reuse(result, sim)
+
+
+def remember(sig, msg_hash: str, result: dict) -> None:
+    """Index a model verdict as a template if it is a confident SCAM. DB errors are swallowed."""
+    global _puts_since_prune
+    if sig is None or not msg_hash:
+        return
+    if result.get("verdict") != "SCAM" or result.get("confidence", 0) < CONFIRM_MIN_CONFIDENCE:
+        return
+    stored = {k: v for k, v in result.items() if k != "msg_hash"}
+    _mem_put(msg_hash, sig, stored)
+    try:
+        put_scam_template(msg_hash, _encode(sig), band_keys(sig), json.dumps(stored))
+    except Exception:
+        return
+    with _lock:
+        _stats["indexed"] += 1
+        _puts_since_prune += 1
+        should_prune = _puts_since_prune >= PRUNE_EVERY_N_PUTS
+        if should_prune:
+            _puts_since_prune = 0
+    if should_prune:
+        try:
+            prune_scam_templates(_utc_cutoff(), DB_MAX_ROWS)
+        except Exception:
+            pass
+
+
+def stats() -> dict:
+    """Lookups, hits (verdicts reused without an AI call), templates indexed, and templates held in memory."""
+    with _lock:
+        out = dict(_stats)
+        out["in_memory"] = len(_templates)
+    return out
+
+
+def clear_local() -> None:
+    """Drop the in-process index (DB rows are left to expire by TTL)."""
+    with _lock:
+        _templates.clear()
+        _bands.clear()
@@ -0,0 +1,189 @@
+"""Pooled AsyncOpenAI clients: one keep-alive httpx pool per event loop, shared by all Streamlit sessions.
+
+Settings come from an optional [OPENAI_HTTP] section in .streamlit/secrets.toml:
+max_connections, max_keepalive_connections, keepalive_expiry, timeout, http2, proxy, base_url.
+Proxy env vars (HTTP_PROXY etc.) are ignored; set `proxy` explicitly instead. base_url points every
+client at an OpenAI-compatible server (e.g. the services.openai_stub stand-in for offline benchmarks);
+when empty the SDK default applies (OPENAI_BASE_URL env var, else api.openai.com).
+"""
+import asyncio
+import threading
+import weakref
+import httpx
+from openai import AsyncOpenAI
+
+DEFAULT_SETTINGS = {
+    "max_connections": 50,
+    "max_keepalive_connections": 20,
+    "keepalive_expiry": 60.0,
+    "timeout": 30.0,
+    "http2": True,
+    "proxy": "",
+    "base_url": "",
+}
+
+_lock = threading.Lock()
+_async_pools = weakref.WeakKeyDictionary()  # event loop -> (httpx.AsyncClient, {key: AsyncOpenAI})
+_closing = set()  # aclose() tasks scheduled from inside their own loop (kept so they aren't collected)
+_settings = None
+_stats = {"clients_created": 0, "requests": 0, "responses": 0, "errors": 0}
+
+
+def _settings_from_secrets() -> dict:
+    """Read [OPENAI_HTTP] from secrets; missing keys fall back to DEFAULT_SETTINGS."""
+    out = dict(DEFAULT_SETTINGS)
+    try:
+        import streamlit as st
+        cfg = st.secrets.get("OPENAI_HTTP") or {}
+        for k in DEFAULT_SETTINGS:
+            v = cfg.get(k, cfg.get(k.upper()))
+            if v is not None:
+                out[k] = v
+    except Exception:
+        pass
+    return out
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+async def _on_request(request):
+    with _lock:
+        _stats["requests"] += 1
+
+
+async def _on_response(response):
+    with _lock:
+        _stats["responses"] += 1
+        if response.status_code >= 400:
+            _stats["errors"] += 1
+
+
+def _client_kwargs(settings: dict) -> dict:
+    """httpx.AsyncClient kwargs from pool settings."""
+    kwargs = {
+        "limits": httpx.Limits(
+            max_connections=int(settings["max_connections"]),
+            max_keepalive_connections=int(settings["max_keepalive_connections"]),
+            keepalive_expiry=float(settings["keepalive_expiry"]),
+        ),
+        "timeout": httpx.Timeout(float(settings["timeout"]), connect=10.0),
+        "http2": bool(settings["http2"]) and _http2_available(),
+        # Never pick up proxies from the environment; only the explicit setting below applies
+        "trust_env": False,
+    }
+    proxy = (settings.get("proxy") or "").strip()
+    if proxy:
+        # httpx renamed `proxies` to `proxy` in 0.26
+        if tuple(int(p) for p in httpx.__version__.split(".")[:2]) >= (0, 26):
+            kwargs["proxy"] = proxy
+        else:
+            kwargs["proxies"] = proxy
+    return kwargs
+
+
+def _build_async_http_client(settings: dict) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        event_hooks={"request": [_on_request], "response": [_on_response]},
+        **_client_kwargs(settings),
+    )
+
+
+def configure(**overrides) -> None:
+    """Replace pool settings (e.g. in tests or scripts). Existing clients are closed and rebuilt lazily."""
+    global _settings
+    close()
+    with _lock:
+        _settings = {**_settings_from_secrets(), **overrides}
+
+
+def close() -> None:
+    """Drop every loop's pool and schedule its aclose() on that loop (without waiting for it)."""
+    with _lock:
+        pools = list(_async_pools.items())
+        _async_pools.clear()
+    for loop, (http_client, _) in pools:
+        if loop.is_closed() or not loop.is_running():
+            continue  # its sockets went with the loop
+        try:
+            if _running_loop() is loop:
+                task = loop.create_task(http_client.aclose())
+                _closing.add(task)
+                task.add_done_callback(_closing.discard)
+            else:
+                asyncio.run_coroutine_threadsafe(http_client.aclose(), loop)
+        except RuntimeError:
+            pass  # loop stopped meanwhile
+
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _resolve_base_url(base_url: str = None) -> str:
+    """Explicit base_url, else the configured one ("" means the SDK default)."""
+    global _settings
+    if base_url:
+        return base_url
+    with _lock:
+        if _settings is None:
+            _settings = _settings_from_secrets()
+        return (_settings.get("base_url") or "").strip()
+
+
+def get_async_client(api_key: str, base_url: str = None) -> AsyncOpenAI:
+    """Return the AsyncOpenAI client for this key on the running event loop (httpx async pools are per loop)."""
+    global _settings
+    loop = asyncio.get_running_loop()
+    base_url = _resolve_base_url(base_url)
+    key = (api_key, base_url)
+    with _lock:
+        if _settings is None:
+            _settings = _settings_from_secrets()
+        pool = _async_pools.get(loop)
+        if pool is None:
+            pool = (_build_async_http_client(_settings), {})
+            _async_pools[loop] = pool
+        http_client, clients = pool
+        client = clients.get(key)
+        if client is None:
+            client = AsyncOpenAI(api_key=api_key, base_url=base_url or None, http_client=http_client, max_retries=0)
+            clients[key] = client
+            _stats["clients_created"] += 1
+        return client
+
+
+def _pool_connections(client) -> tuple:
+    """(open, idle, http2) for an httpx client's pool; relies on httpcore internals, so best effort."""
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    conns = list(getattr(pool, "connections", []) or [])
+    idle = sum(1 for c in conns if getattr(c, "is_idle", lambda: False)())
+    return len(conns), idle, bool(getattr(pool, "_http2", False))
+
+
+def pool_stats() -> dict:
+    """Counters plus current connection counts across the pools (best effort; depends on httpcore internals)."""
+    with _lock:
+        out = dict(_stats)
+        out["settings"] = dict(_settings or {})
+        http_clients = [pool[0] for pool in _async_pools.values()]
+    # Proxy URLs can carry credentials
+    if out["settings"].get("proxy"):
+        out["settings"]["proxy"] = "(set)"
+    out["connections"] = 0
+    out["idle_connections"] = 0
+    out["http2"] = False
+    for client in http_clients:
+        total, idle, http2 = _pool_connections(client)
+        out["connections"] += total
+        out["idle_connections"] += idle
+        out["http2"] = out["http2"] or http2
+    return out
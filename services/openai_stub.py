@@ -0,0 +1,414 @@
+"""OpenAI-compatible stand-in for offline benchmarks and load tests of the analysis path.
+
+Serves POST /v1/chat/completions (plain and streamed) from a cassette: a JSON file of reply text, usage
+and upstream latency keyed by a hash of the request (model, messages, response_format).
+
+  replay  serve recorded replies; a miss gets the local heuristic verdict (a 404 error with --strict)
+  record  forward misses to the real API with the caller's key, store the reply, then serve it
+
+--latency draws a delay per request: fixed:S, uniform:A,B, lognormal:MEDIAN,SIGMA, or recorded (the
+upstream time captured while recording). --errors injects failures, e.g. 429=0.02,500=0.01,timeout=0.005
+(timeout stalls past the client timeout). --seed makes runs repeatable. Point the app at the stub with
+base_url in [OPENAI_HTTP].
+
+  python -m services.openai_stub serve --cassette bench.json --mode record --port 8765
+  python -m services.openai_stub serve --cassette bench.json --latency lognormal:0.8,0.4 --errors 429=0.02
+  python -m services.openai_stub bench --cassette bench.json --messages samples.txt --concurrency 16
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+
+UPSTREAM_BASE_URL = "https://api.openai.com/v1"
+STREAM_CHUNK_CHARS = 16
+STREAM_CHUNK_DELAY = 0.01
+STALL_SECONDS = 120.0
+_KEY_FIELDS = ("model", "messages", "response_format")
+_ERROR_TYPES = {
+    400: "invalid_request_error", 401: "authentication_error", 404: "not_found_error",
+    429: "rate_limit_exceeded", 500: "server_error", 502: "server_error", 503: "server_error",
+}
+
+
+def request_key(body: dict) -> str:
+    """Cassette key: hash of the fields that decide the reply (streaming or not, same key)."""
+    canonical = json.dumps({k: body.get(k) for k in _KEY_FIELDS}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+class Cassette:
+    """Recorded replies by request_key; rewritten (atomically) after each new recording."""
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._entries = {}
+        if self.path is not None and self.path.exists():
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self._entries = dict(data.get("interactions") or {})
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str):
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key: str, entry: dict) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            if self.path is None:
+                return
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp.write_text(json.dumps({"version": 1, "interactions": self._entries}, indent=1), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+
+def parse_latency(spec: str):
+    """Return draw(rng, entry) -> seconds for a --latency spec."""
+    kind, _, args = (spec or "fixed:0").partition(":")
+    nums = [float(a) for a in args.split(",") if a.strip()]
+    if kind == "fixed":
+        value = nums[0] if nums else 0.0
+        return lambda rng, entry: value
+    if kind == "uniform" and len(nums) == 2:
+        return lambda rng, entry: rng.uniform(nums[0], nums[1])
+    if kind == "lognormal" and len(nums) == 2:
+        mu = math.log(nums[0])
+        return lambda rng, entry: rng.lognormvariate(mu, nums[1])
+    if kind == "recorded":
+        default = nums[0] if nums else 0.0
+        return lambda rng, entry: float((entry or {}).get("latency", default))
+    raise ValueError(f"bad latency spec {spec!r}: use fixed:S, uniform:A,B, lognormal:MEDIAN,SIGMA or recorded")
+
+
+def parse_errors(spec: str) -> list:
+    """[(kind, rate)] from '429=0.02,500=0.01,timeout=0.005'; kind is an HTTP status or 'timeout'."""
+    out = []
+    for part in (spec or "").split(","):
+        if not part.strip():
+            continue
+        kind, _, rate = part.partition("=")
+        kind = kind.strip().lower()
+        out.append((kind if kind == "timeout" else int(kind), float(rate)))
+    if sum(rate for _, rate in out) > 1:
+        raise ValueError("error rates add up to more than 1")
+    return out
+
+
+def _message_text(body: dict) -> str:
+    """The checked message inside the last user turn (see analysis._build_user_content)."""
+    content = ""
+    for m in body.get("messages") or []:
+        if m.get("role") == "user":
+            content = m.get("content") or ""
+    content = content.split("Message to analyze:\n\n", 1)[-1]
+    for marker in ("\n\nChannel: ", "\n\nLanguage: "):
+        content = content.split(marker, 1)[0]
+    return content
+
+
+def _synthesized_entry(body: dict) -> dict:
+    """Reply for a cassette miss: the local heuristic verdict, with estimated usage."""
+    from services.compaction import count_tokens
+    from services.prescreen import heuristic_verdict
+
+    verdict = heuristic_verdict(_message_text(body))
+    content = json.dumps(verdict, ensure_ascii=False)
+    prompt = sum(count_tokens(m.get("content") or "") for m in body.get("messages") or [])
+    usage = {"prompt_tokens": prompt, "completion_tokens": count_tokens(content)}
+    usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+    return {"content": content, "usage": usage, "latency": 0.0}
+
+
+class StubServer:
+    """Threaded stub server; start() returns its base URL (http://host:port/v1)."""
+
+    def __init__(self, cassette: Cassette, mode: str = "replay", latency: str = "fixed:0", errors: str = "",
+                 seed: int = 0, strict: bool = False, upstream: str = UPSTREAM_BASE_URL,
+                 host: str = "127.0.0.1", port: int = 0):
+        if mode not in ("replay", "record"):
+            raise ValueError("mode must be replay or record")
+        self.cassette = cassette
+        self.mode = mode
+        self.strict = strict
+        self.upstream = upstream.rstrip("/")
+        self._latency = parse_latency(latency)
+        self._errors = parse_errors(errors)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "hits": 0, "misses": 0, "recorded": 0, "injected_errors": 0, "upstream_errors": 0}
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.stub = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="openai-stub", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def stats(self) -> dict:
+        """Requests, cassette hits/misses, new recordings, injected and upstream errors."""
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _draw(self, entry: dict) -> tuple:
+        """(injected error kind or None, delay seconds); one shared seeded RNG keeps runs repeatable."""
+        with self._lock:
+            self._stats["requests"] += 1
+            roll = self._rng.random()
+            delay = max(0.0, self._latency(self._rng, entry))
+        for kind, rate in self._errors:
+            if roll < rate:
+                self._count("injected_errors")
+                return kind, delay
+            roll -= rate
+        return None, delay
+
+    def _record(self, body: dict, authorization: str) -> tuple:
+        """Forward to the real API (non-streaming). Returns (entry, None) or (None, (status, error body))."""
+        upstream_body = {k: v for k, v in body.items() if k not in ("stream", "stream_options")}
+        started = time.monotonic()
+        try:
+            resp = httpx.post(
+                f"{self.upstream}/chat/completions",
+                json=upstream_body,
+                headers={"Authorization": authorization},
+                timeout=STALL_SECONDS,
+            )
+        except httpx.HTTPError as e:
+            self._count("upstream_errors")
+            return None, (502, _error_body(502, f"upstream unreachable: {e}"))
+        if resp.status_code != 200:
+            self._count("upstream_errors")
+            return None, (resp.status_code, resp.content)
+        data = resp.json()
+        entry = {
+            "model": data.get("model") or body.get("model"),
+            "content": data["choices"][0]["message"].get("content") or "",
+            "usage": data.get("usage") or {},
+            "latency": round(time.monotonic() - started, 3),
+            "recorded_at": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        return entry, None
+
+    def handle(self, body: dict, authorization: str) -> tuple:
+        """Resolve one request to ("reply", entry, delay) | ("error", (status, body), delay) | ("stall", None, delay)."""
+        key = request_key(body)
+        entry = self.cassette.get(key)
+        if entry is not None:
+            self._count("hits")
+        else:
+            self._count("misses")
+        injected, delay = self._draw(entry)
+        if injected == "timeout":
+            return "stall", None, STALL_SECONDS
+        if injected is not None:
+            return "error", (injected, _error_body(injected, "injected error")), delay
+        if entry is None and self.mode == "record":
+            entry, error = self._record(body, authorization)
+            if error is not None:
+                return "error", error, 0.0
+            self.cassette.put(key, entry)
+            self._count("recorded")
+            # The upstream call already took real time
+            return "reply", entry, 0.0
+        if entry is None and self.strict:
+            return "error", (404, _error_body(404, f"no recording for request {key}")), delay
+        if entry is None:
+            entry = _synthesized_entry(body)
+        return "reply", entry, delay
+
+
+def _error_body(status: int, message: str) -> bytes:
+    return json.dumps({"error": {"message": message, "type": _ERROR_TYPES.get(status, "server_error"), "code": None}}).encode("utf-8")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status: int, payload: bytes, headers: dict = None) -> None:
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(payload)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        stub = self.server.stub
+        body = json.loads(self.rfile.read(int(self.headers.get("content-length") or 0)) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, _error_body(404, f"unknown path {self.path}"))
+            return
+        outcome, payload, delay = stub.handle(body, self.headers.get("authorization") or "")
+        time.sleep(delay)
+        if outcome == "stall":
+            self.close_connection = True
+            return
+        if outcome == "error":
+            status, error = payload
+            self._send_json(status, error, {"retry-after": "1"} if status == 429 else None)
+            return
+        model = body.get("model") or payload.get("model") or ""
+        usage = payload.get("usage") or {}
+        if body.get("stream"):
+            self._stream(model, payload["content"], usage if (body.get("stream_options") or {}).get("include_usage") else None)
+            return
+        self._send_json(200, json.dumps({
+            "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": payload["content"]}}],
+            "usage": usage,
+        }).encode("utf-8"))
+
+    def _stream(self, model: str, content: str, usage) -> None:
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def chunk(choices, extra=None):
+            data = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()), "model": model, "choices": choices}
+            data.update(extra or {})
+            self.wfile.write(f"data: {json.dumps(data)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        try:
+            for i in range(0, len(content), STREAM_CHUNK_CHARS):
+                chunk([{"index": 0, "delta": {"content": content[i:i + STREAM_CHUNK_CHARS]}, "finish_reason": None}])
+                time.sleep(STREAM_CHUNK_DELAY)
+            chunk([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+            if usage is not None:
+                chunk([], {"usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client cancelled (e.g. deadline)
+
+
+# ---------- Benchmark ----------
+
+
+def _percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))] if ordered else 0.0
+
+
+async def _bench(messages: list, concurrency: int) -> tuple:
+    from services.analysis import analyze_message_async
+
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+    verdicts = {}
+
+    async def one(msg: str):
+        async with sem:
+            started = time.perf_counter()
+            result = await analyze_message_async(msg, api_key="sk-stub")
+            latencies.append(time.perf_counter() - started)
+            verdicts[result.get("verdict")] = verdicts.get(result.get("verdict"), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(m) for m in messages))
+    return latencies, verdicts, time.perf_counter() - started
+
+
+def bench(server: StubServer, messages: list, concurrency: int = 8) -> dict:
+    """Run analyze_message_async over messages against the stub on a throwaway SQLite DB; latency summary and per-stage percentiles."""
+    from db import _sqlite_schema, schema
+    from services import metrics, openai_client
+
+    # Never touch the real database (or a configured Snowflake account) from a benchmark
+    schema._use_snowflake = lambda: False
+    _sqlite_schema.DB_PATH = Path(tempfile.mkdtemp(prefix="checkmoyan-bench-")) / "bench.db"
+    _sqlite_schema.init_db()
+    openai_client.configure(base_url=server.start())
+    try:
+        latencies, verdicts, wall = asyncio.run(_bench(messages, concurrency))
+    finally:
+        server.stop()
+    return {
+        "checks": len(latencies),
+        "wall_seconds": round(wall, 3),
+        "checks_per_second": round(len(latencies) / wall, 2) if wall else 0.0,
+        "p50": round(_percentile(latencies, 0.50), 3),
+        "p90": round(_percentile(latencies, 0.90), 3),
+        "p99": round(_percentile(latencies, 0.99), 3),
+        "max": round(max(latencies, default=0.0), 3),
+        "verdicts": verdicts,
+        "stages": metrics.stats()["stages"],
+        "stub": server.stats(),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m services.openai_stub", description=__doc__.split("\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("serve", "bench"):
+        p = sub.add_parser(name)
+        p.add_argument("--cassette", help="cassette JSON file (created when recording)")
+        p.add_argument("--latency", default="fixed:0", help="fixed:S | uniform:A,B | lognormal:MEDIAN,SIGMA | recorded")
+        p.add_argument("--errors", default="", help="injected failures, e.g. 429=0.02,500=0.01,timeout=0.005")
+        p.add_argument("--seed", type=int, default=0)
+        p.add_argument("--strict", action="store_true", help="answer cassette misses with 404 instead of a heuristic reply")
+        if name == "serve":
+            p.add_argument("--mode", choices=("replay", "record"), default="replay")
+            p.add_argument("--upstream", default=UPSTREAM_BASE_URL)
+            p.add_argument("--host", default="127.0.0.1")
+            p.add_argument("--port", type=int, default=8765)
+        else:
+            p.add_argument("--messages", required=True, help="text file, one message per line")
+            p.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args(argv)
+    cassette = Cassette(args.cassette)
+    if args.command == "serve":
+        server = StubServer(cassette, args.mode, args.latency, args.errors, args.seed, args.strict,
+                            args.upstream, args.host, args.port)
+        print(f"OpenAI stub ({args.mode}, {len(cassette)} recordings) at {server.base_url}", flush=True)
+        try:
+            server._httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        print(json.dumps(server.stats()))
+        return 0
+    lines = Path(args.messages).read_text(encoding="utf-8").splitlines()
+    messages = [line.strip() for line in lines if line.strip()]
+    server = StubServer(cassette, "replay", args.latency, args.errors, args.seed, args.strict)
+    print(json.dumps(bench(server, messages, args.concurrency), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -42,9 +42,9 @@ def get_payment_config() -> dict:
     return out
 
 
-def get_plans_config() -> list:
-    """Return list of plan dicts for Pricing page. Values from DB (Admin → Payment config)."""
-    pay = get_payment_config()
+def get_plans_config(pay: dict = None) -> list:
+    """Return list of plan dicts for Pricing page. Values from DB (Admin → Payment config), or from pay if given."""
+    pay = pay or get_payment_config()
     return [
         {
             "key": "free",
@@ -77,7 +77,7 @@ def get_plans_config() -> list:
             "features": [
                 "Everything in Premium",
                 "Priority verification",
-                "Bulk check (coming soon)",
+                "Bulk check (paste a list or upload CSV)",
                 "Dedicated support",
             ],
         },
@@ -0,0 +1,223 @@
+"""Local rule-based pre-screen: flags textbook PH scams before spending an OpenAI call.
+
+All signal patterns are matched in one scan of the text. Each pattern sits in its own zero-width lookahead,
+so signals that overlap in the text ("Send your GCash OTP" is both an e-wallet mention and an OTP request)
+are all found. Rules then combine the matched signals; only
+clear-cut combinations produce a verdict, everything else returns None and goes to the LLM. Official
+advisories mention the same things in the negative ("we will never ask for your OTP") and link to
+official sites, so negated mentions and links to official domains do not count.
+"""
+import re
+
+from services.domains import host_of, is_official
+
+# signal -> (regex fragment, reason shown to the user)
+SIGNALS = {
+    "ewallet": (r"g-?cash|pay-?maya|\bmaya\b", "Mentions GCash/Maya e-wallet"),
+    "gov": (r"\bsss\b|phil-?health|pag-?ibig|\bgsis\b", "Mentions SSS/PhilHealth/Pag-IBIG"),
+    "bank": (
+        r"\b(?:bdo|bpi|metrobank|landbank|unionbank|security\s*bank|rcbc|pnb|chinabank|eastwest)\b",
+        "Mentions a bank (BDO, BPI, etc.)",
+    ),
+    "otp_request": (
+        r"(?:send|enter|reply|provide|give|share|type|forward|input)\s+(?:\w+\s+){0,3}(?:otp|one[\s-]?time\s+pin|verification\s+code|pin\s+code)"
+        r"|(?:otp|verification\s+code)\s+(?:\w+\s+){0,3}(?:sent\s+to\s+your|and\s+(?:send|reply))"
+        r"|(?:ibigay|i-?send|ipadala)\s+(?:\w+\s+){0,2}(?:otp|code)",
+        "Asks for your OTP / verification code",
+    ),
+    "verify_lure": (
+        r"verify\s+(?:your\s+)?(?:account|membership|identity|now)"
+        r"|(?:account|wallet)\s+(?:will\s+be|has\s+been|is)\s+(?:suspended|locked|blocked|deactivated|closed)"
+        r"|avoid\s+(?:lockout|suspension|deactivation)|i-?verify\s+ang",
+        "Pressures you to verify or unlock an account",
+    ),
+    "link": (
+        r"https?://\S+|\bwww\.\S+"
+        r"|\b(?:bit\.ly|tinyurl\.com|cutt\.ly|is\.gd|t\.co|rb\.gy|shorturl\.at|tiny\.cc)/\S+"
+        r"|\b[a-z0-9]+(?:-[a-z0-9]+)+\.(?:ph|com|net|xyz|top|info|site|online|link|click|shop)\b",
+        "Contains a link (possibly shortened or look-alike)",
+    ),
+    "phone": (
+        r"(?<!\d)(?:\+?63|0)[\s-]?9\d{2}[\s-]?\d{3}[\s-]?\d{4}(?!\d)",
+        "Gives a mobile number to reply or send to",
+    ),
+    "urgency": (
+        r"within\s+\d+\s*(?:hours?|hrs?|mins?|minutes?)|\bin\s+\d+\s*(?:hours?|hrs?)\b|\b24\s*hrs?\b"
+        r"|limited\s+slots?|act\s+now|claim\s+(?:now|before|today)|expires?\s+today|ngayon\s+din|\bagad\b",
+        "Uses urgency or a deadline",
+    ),
+    "prize_claim": (
+        r"unclaimed\s+(?:benefits?|prize|reward|funds?)|you\s+(?:have\s+)?won|congratulations"
+        r"|claim\s+your\s+(?:prize|reward|benefits?)|nanalo\s+ka",
+        "Promises unclaimed benefits or a prize",
+    ),
+    "double_money": (
+        r"doubles?\s+(?:your\s+)?money|double\s+your\s+(?:investment|pera)|doble\s+ang\s+pera"
+        r"|guaranteed\s+(?:returns?|profits?|income)|\b\d{2,3}\s*%\s+(?:returns?|profit|interest)\s+(?:in|every|per)\s+\d*\s*(?:days?|weeks?)",
+        "Promises guaranteed or doubled returns",
+    ),
+    "investment_pitch": (
+        r"crypto|trading\s+platform|invest(?:ment)?|minimum\s+(?:of\s+)?(?:php|p|₱)?\s*\d",
+        "Investment or trading pitch",
+    ),
+    "upfront_fee": (
+        r"(?:processing|registration|release|membership|training|insurance|activation)\s+fee"
+        r"|(?:pay|send|deposit)\s+(?:\w+\s+){0,3}(?:fee|pesos|php|₱)\s*(?:\w+\s+){0,3}(?:to\s+(?:get\s+started|release|receive|claim))",
+        "Asks for an upfront fee",
+    ),
+    "loan": (r"\bloans?\b|pautang|\bapproved\s+for\b|no\s+collateral", "Loan offer"),
+    "job": (
+        r"we(?:'re|\s+are)\s+hiring|work\s+from\s+home|\bwfh\b|data\s+encoder|no\s+experience\s+needed|earn\s+\d",
+        "Job offer with easy high pay",
+    ),
+}
+
+# (required signals, at least one of, category, confidence)
+RULES = [
+    (("ewallet", "otp_request"), ("link", "urgency", "verify_lure"), "E-wallet phishing", 92),
+    (("ewallet", "verify_lure"), ("link",), "E-wallet phishing", 90),
+    (("gov", "otp_request"), ("link", "prize_claim", "urgency"), "SSS/PhilHealth impersonation", 92),
+    (("gov", "prize_claim"), ("link",), "SSS/PhilHealth impersonation", 88),
+    # Banks' own notices talk about OTPs too; only a link, number or deadline makes it a request to a scammer
+    (("bank", "otp_request"), ("link", "phone", "urgency"), "Bank OTP scam", 92),
+    (("bank", "verify_lure"), ("link",), "Bank OTP scam", 88),
+    (("double_money",), ("investment_pitch", "urgency", "upfront_fee"), "Investment scam", 88),
+    (("loan", "upfront_fee"), (), "Loan scam", 88),
+    (("job", "upfront_fee"), (), "Fake job offer", 88),
+]
+
+ACTIONS = {
+    "E-wallet phishing": [
+        "Do not click the link or share your OTP/MPIN.",
+        "Open the GCash or Maya app directly to check your account.",
+        "Report the sender to GCash/Maya support and block the number.",
+    ],
+    "SSS/PhilHealth impersonation": [
+        "Do not enter your SSS/PhilHealth number or OTP on the linked site.",
+        "Check benefits only through the official website, app, or hotline.",
+        "Report the message and block the sender.",
+    ],
+    "Bank OTP scam": [
+        "Never share your OTP or card details — banks will never ask for them.",
+        "Call your bank using the number on the back of your card.",
+        "Block the sender and report the message to your bank.",
+    ],
+    "Investment scam": [
+        "Do not send money; guaranteed or doubled returns are a classic scam sign.",
+        "Check if the company is registered with the SEC before investing.",
+        "Stop contact and report the account.",
+    ],
+    "Loan scam": [
+        "Do not pay any fee before a loan is released.",
+        "Only borrow from SEC-registered lending companies.",
+        "Block the sender and report the number.",
+    ],
+    "Fake job offer": [
+        "Do not pay any registration or training fee — real employers don't charge applicants.",
+        "Verify the company through official channels before sharing personal data.",
+        "Block and report the sender.",
+    ],
+}
+
+# Signals that legit notices mention in the negative ("We will never ask you to send your OTP", "no processing
+# fee", "there are no unclaimed benefits"): a negation up to four words before the match (not across a clause
+# boundary or "and"/"then") cancels it
+_NEGATABLE = {"otp_request", "upfront_fee", "prize_claim"}
+NEGATION_WINDOW = 60
+_NEGATION_BEFORE = re.compile(
+    r"(?:\b(?:never|not|no|huwag|wag|hindi)|n't)\s+(?:(?!(?:and|then|but|at|pero)\b)\w+\s+){0,4}$",
+    re.IGNORECASE,
+)
+
+# One pass: the leading lookahead stops only where some signal starts, then every signal that starts there
+# is captured by its own (optional) lookahead without consuming text, so overlapping signals are all seen
+_SCAN = re.compile(
+    "(?=" + "|".join(f"(?:{pattern})" for pattern, _ in SIGNALS.values()) + ")"
+    + "".join(f"(?:(?=(?P<{name}>{pattern}))|)" for name, (pattern, _) in SIGNALS.items()),
+    re.IGNORECASE,
+)
+
+
+def _counts(name: str, start: int, value: str, text: str) -> bool:
+    if name in _NEGATABLE and _NEGATION_BEFORE.search(text, max(0, start - NEGATION_WINDOW), start):
+        return False
+    if name == "link" and is_official(host_of(value)):
+        return False
+    return True
+
+
+def match_signals(text: str) -> set:
+    """Return the set of signal names found in text (one scan for all patterns)."""
+    found = set()
+    if not text:
+        return found
+    for m in _SCAN.finditer(text):
+        for name, value in m.groupdict().items():
+            if value is not None and name not in found and _counts(name, m.start(), value, text):
+                found.add(name)
+    return found
+
+
+def _ewallet_label(text: str) -> str:
+    """Category label used by the analysis prompt: Maya phishing only when GCash isn't mentioned."""
+    if re.search(r"g-?cash", text, re.IGNORECASE):
+        return "GCash phishing"
+    return "Maya phishing"
+
+
+def prescreen(text: str) -> dict | None:
+    """
+    Return a high-confidence SCAM result (same shape as analysis._parse_response) for textbook scams,
+    or None when the message is ambiguous and should go to the LLM.
+    """
+    signals = match_signals(text)
+    if len(signals) < 2:
+        return None
+    for required, any_of, category, confidence in RULES:
+        if not all(s in signals for s in required):
+            continue
+        if any_of and not any(s in signals for s in any_of):
+            continue
+        actions = ACTIONS[category]
+        if category == "E-wallet phishing":
+            category = _ewallet_label(text)
+        flags = [SIGNALS[s][1] for s in SIGNALS if s in signals]
+        return {
+            "verdict": "SCAM",
+            "confidence": confidence,
+            "category": category,
+            "reasons": [f"Matches a known {category} pattern."] + flags[:6],
+            "recommended_actions": list(actions),
+            "warning_message": f"This looks like a {category} message. Don't click links, share OTPs, or send money.",
+            "red_flags": flags[:10],
+            "safety_notes": "Flagged instantly by local pattern check.",
+        }
+    return None
+
+
+def heuristic_verdict(text: str) -> dict:
+    """
+    Degraded-mode verdict when the AI is unavailable: textbook scams as in prescreen(), otherwise
+    SUSPICIOUS with confidence scaled by the number of red-flag signals. Never SAFE without the AI.
+    """
+    note = "AI analysis is temporarily unavailable; this is a quick local check only. Verify through official channels."
+    result = prescreen(text)
+    if result is not None:
+        result["safety_notes"] = note
+        return result
+    signals = match_signals(text)
+    flags = [SIGNALS[s][1] for s in SIGNALS if s in signals]
+    return {
+        "verdict": "SUSPICIOUS",
+        "confidence": min(65, 30 + 10 * len(flags)),
+        "category": "Unknown",
+        "reasons": [note] + flags[:6],
+        "recommended_actions": [
+            "Do not click links or share OTP/PIN until you can verify the sender.",
+            "Contact the company or agency through its official app, website, or hotline.",
+            "Try CheckMoYan again in a few minutes for a full AI analysis.",
+        ],
+        "warning_message": "Couldn't fully check this message yet. Stay cautious and verify before acting.",
+        "red_flags": flags[:10],
+        "safety_notes": note,
+    }
@@ -0,0 +1,204 @@
+"""Retries with jittered backoff and a circuit breaker around OpenAI calls.
+
+Settings come from an optional [OPENAI_RESILIENCE] section in .streamlit/secrets.toml:
+request_timeout, max_retries, base_delay, max_delay, failure_threshold, reset_timeout.
+While the breaker is open calls fail fast with CircuitOpen and analysis serves a local heuristic verdict.
+Callers with a deadline pass it to call() and size each attempt with attempt_timeout(), so retries fit the
+time the caller will actually wait instead of being cancelled mid-attempt.
+"""
+import asyncio
+import random
+import threading
+import time
+from openai import APIConnectionError, APIStatusError, APITimeoutError, RateLimitError
+
+DEFAULT_SETTINGS = {
+    "request_timeout": 20.0,
+    "max_retries": 2,
+    "base_delay": 0.5,
+    "max_delay": 8.0,
+    "failure_threshold": 5,
+    "reset_timeout": 30.0,
+}
+
+# A retry is not started with less time than this left before the caller's deadline
+MIN_ATTEMPT_SECONDS = 2.0
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_lock = threading.Lock()
+_settings = None
+_counts = {"successes": 0, "retries": 0, "failures": 0, "errors": 0, "rejected": 0, "degraded": 0}
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling upstream while the breaker is open."""
+
+
+def _settings_from_secrets() -> dict:
+    out = dict(DEFAULT_SETTINGS)
+    try:
+        import streamlit as st
+        cfg = st.secrets.get("OPENAI_RESILIENCE") or {}
+        for k in DEFAULT_SETTINGS:
+            v = cfg.get(k, cfg.get(k.upper()))
+            if v is not None:
+                out[k] = type(DEFAULT_SETTINGS[k])(v)
+    except Exception:
+        pass
+    return out
+
+
+def get_settings() -> dict:
+    global _settings
+    with _lock:
+        if _settings is None:
+            _settings = _settings_from_secrets()
+        return dict(_settings)
+
+
+def configure(**overrides) -> None:
+    """Override settings (e.g. in scripts); also resets the breaker."""
+    global _settings
+    with _lock:
+        _settings = {**_settings_from_secrets(), **overrides}
+    breaker.reset()
+
+
+class CircuitBreaker:
+    """Closed -> open after failure_threshold consecutive failures; after reset_timeout one trial call
+    is let through (half-open): success closes the breaker, failure re-opens it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._opened_at = 0.0
+            self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        settings = get_settings()
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at >= settings["reset_timeout"]:
+                self._state = HALF_OPEN
+                self._trial_in_flight = False
+            if self._state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        threshold = get_settings()["failure_threshold"]
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == HALF_OPEN or self._failures >= threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def release_trial(self) -> None:
+        """A half-open trial was cancelled without an outcome: let the next call try."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = {"state": self._state, "consecutive_failures": self._failures}
+            if self._state == OPEN:
+                out["open_for_seconds"] = round(time.monotonic() - self._opened_at, 1)
+            return out
+
+
+breaker = CircuitBreaker()
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Timeouts, connection errors, 429 and 5xx are worth retrying (and count against the breaker)."""
+    if isinstance(error, (APITimeoutError, APIConnectionError, RateLimitError)):
+        return True
+    return isinstance(error, APIStatusError) and getattr(error, "status_code", 0) >= 500
+
+
+def _backoff(attempt: int, settings: dict) -> float:
+    """Full jitter: uniform(0, min(max_delay, base_delay * 2**attempt))."""
+    return random.uniform(0, min(settings["max_delay"], settings["base_delay"] * (2 ** attempt)))
+
+
+def attempt_timeout(deadline: float = None) -> float:
+    """request_timeout, shrunk to the time left before deadline (a time.monotonic() value) when given."""
+    timeout = get_settings()["request_timeout"]
+    if deadline is None:
+        return timeout
+    return max(0.0, min(timeout, deadline - time.monotonic()))
+
+
+def _count(name: str) -> None:
+    with _lock:
+        _counts[name] += 1
+
+
+def note_degraded() -> None:
+    """Count a heuristic verdict served instead of an AI one."""
+    _count("degraded")
+
+
+async def call(factory, deadline: float = None):
+    """
+    `await factory()` with retries for retryable errors, guarded by the circuit breaker.
+    Raises CircuitOpen without calling upstream while the breaker is open. With a deadline (a time.monotonic()
+    value) no retry is started that would begin with less than MIN_ATTEMPT_SECONDS left; the last error is
+    raised instead.
+    """
+    if not breaker.allow():
+        _count("rejected")
+        raise CircuitOpen("AI service temporarily unavailable")
+    settings = get_settings()
+    attempt = 0
+    try:
+        while True:
+            try:
+                result = await factory()
+            except Exception as e:
+                if not is_retryable(e):
+                    # Upstream answered (bad request, auth, ...): not an outage
+                    breaker.record_success()
+                    _count("errors")
+                    raise
+                if attempt < settings["max_retries"]:
+                    delay = _backoff(attempt + 1, settings)
+                    if deadline is None or deadline - time.monotonic() - delay >= MIN_ATTEMPT_SECONDS:
+                        attempt += 1
+                        _count("retries")
+                        await asyncio.sleep(delay)
+                        continue
+                breaker.record_failure()
+                _count("failures")
+                raise
+            breaker.record_success()
+            _count("successes")
+            return result
+    except asyncio.CancelledError:
+        breaker.release_trial()
+        raise
+
+
+def stats() -> dict:
+    """Breaker state plus outcome counts (successes, retries, failures, errors, rejected, degraded)."""
+    with _lock:
+        out = dict(_counts)
+    out["breaker"] = breaker.snapshot()
+    return out
@@ -0,0 +1,137 @@
+"""Tiered model routing: a cheap fast model first, a stronger model only for uncertain verdicts.
+
+Local heuristics (pre-screen, cache, templates, indicators) already run before any tier. The fast tier
+answers everything else; when routing is enabled (off by default) its verdict is escalated to the strong
+tier only when its confidence falls in the uncertain band (default 40-70), whatever the verdict: a
+confident SUSPICIOUS is an answer, not a reason to pay for a second call.
+Config lives in app_settings (Admin → Payment config → Model routing); prices are USD per 1M tokens.
+"""
+import threading
+import time
+
+from db.queries import get_routing_config_from_db
+
+CONFIG_TTL_SECONDS = 30
+
+_lock = threading.Lock()
+_config = None
+_config_loaded_at = 0.0
+_tier_stats = {}  # tier -> counters
+_escalations = 0
+
+
+def _default_config() -> dict:
+    return {
+        "enabled": False,
+        "fast_model": "gpt-4o-mini",
+        "strong_model": "gpt-4o",
+        "escalate_min": 40,
+        "escalate_max": 70,
+        "fast_price_in": 0.15,
+        "fast_price_out": 0.60,
+        "strong_price_in": 2.50,
+        "strong_price_out": 10.00,
+    }
+
+
+def _as_bool(raw) -> bool:
+    """Settings may hold real booleans or strings: "false", "0", "no", "off" and "" are False."""
+    if isinstance(raw, str):
+        return raw.strip().lower() not in ("", "false", "0", "no", "off")
+    return bool(raw)
+
+
+def _from_db() -> dict:
+    default = _default_config()
+    try:
+        db_config = get_routing_config_from_db()
+    except Exception:
+        db_config = None
+    if not db_config or not isinstance(db_config, dict):
+        return default
+    out = {}
+    for k, v in default.items():
+        raw = db_config.get(k)
+        if raw is None:
+            out[k] = v
+            continue
+        try:
+            out[k] = _as_bool(raw) if isinstance(v, bool) else type(v)(raw)
+        except (TypeError, ValueError):
+            out[k] = v
+        if isinstance(v, str):
+            out[k] = out[k].strip() or v
+    return out
+
+
+def get_config() -> dict:
+    """Routing config from DB, re-read at most every CONFIG_TTL_SECONDS (analysis calls this per check)."""
+    global _config, _config_loaded_at
+    with _lock:
+        if _config is not None and time.monotonic() - _config_loaded_at < CONFIG_TTL_SECONDS:
+            return dict(_config)
+    config = _from_db()
+    with _lock:
+        _config = config
+        _config_loaded_at = time.monotonic()
+    return dict(config)
+
+
+def invalidate() -> None:
+    """Drop the cached config (e.g. after Admin saves it)."""
+    global _config
+    with _lock:
+        _config = None
+
+
+def tiers(config: dict) -> list:
+    """[(tier, model)] in call order: the fast tier, plus the strong tier when routing is enabled."""
+    out = [("fast", config["fast_model"])]
+    if config["enabled"] and config["strong_model"] and config["strong_model"] != config["fast_model"]:
+        out.append(("strong", config["strong_model"]))
+    return out
+
+
+def version_tag(config: dict) -> str:
+    """Identifies which models can produce a verdict (part of the verdict cache key)."""
+    return "|".join(model for _, model in tiers(config)) + f"|{config['escalate_min']}-{config['escalate_max']}"
+
+
+def should_escalate(result: dict, config: dict) -> bool:
+    """True when the fast tier is uncertain: its confidence is within the escalation band."""
+    return config["escalate_min"] <= result.get("confidence", 0) <= config["escalate_max"]
+
+
+def note_escalation() -> None:
+    global _escalations
+    with _lock:
+        _escalations += 1
+
+
+def record(tier: str, seconds: float, usage: dict, config: dict) -> None:
+    """Add one upstream call to the tier's counters (latency, tokens, estimated cost)."""
+    usage = usage or {}
+    prompt = int(usage.get("prompt_tokens") or 0)
+    completion = int(usage.get("completion_tokens") or 0)
+    cost = (prompt * config.get(f"{tier}_price_in", 0) + completion * config.get(f"{tier}_price_out", 0)) / 1_000_000
+    with _lock:
+        st = _tier_stats.setdefault(
+            tier, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+        )
+        st["calls"] += 1
+        st["seconds"] += seconds
+        st["max_seconds"] = max(st["max_seconds"], seconds)
+        st["prompt_tokens"] += prompt
+        st["completion_tokens"] += completion
+        st["cost_usd"] += cost
+
+
+def stats() -> dict:
+    """{"escalations": n, "tiers": {tier: {calls, avg_seconds, max_seconds, prompt/completion tokens, cost_usd}}}."""
+    with _lock:
+        tiers_out = {}
+        for tier, st in _tier_stats.items():
+            row = dict(st)
+            row["avg_seconds"] = st["seconds"] / st["calls"] if st["calls"] else 0.0
+            tiers_out[tier] = row
+        return {"escalations": _escalations, "tiers": tiers_out}
@@ -0,0 +1,101 @@
+"""Single-flight: concurrent identical analyses share one upstream OpenAI call.
+
+The first caller for a key becomes the leader and runs the call; callers arriving while it is in flight
+wait for the leader's result instead of starting their own. If the leader is cancelled (its session went
+away), waiters retry and one of them becomes the new leader.
+"""
+import asyncio
+import concurrent.futures
+import copy
+import threading
+
+_lock = threading.Lock()
+_flights = {}  # key -> _Flight
+_stats = {"leaders": 0, "hits": 0, "waiting": 0, "max_waiting": 0, "leader_gone": 0}
+
+
+class LeaderGone(Exception):
+    """The leader was cancelled before producing a result; waiters should retry."""
+
+
+class _Flight:
+    """One in-flight call. Uses a concurrent.futures.Future so waiters on any thread/loop can await it."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self._future = concurrent.futures.Future()
+
+    def _release(self):
+        with _lock:
+            if _flights.get(self.key) is self:
+                del _flights[self.key]
+
+    def resolve(self, result) -> None:
+        self._release()
+        if not self._future.done():
+            self._future.set_result(result)
+
+    def fail(self, error: BaseException) -> None:
+        self._release()
+        if not self._future.done():
+            self._future.set_exception(error)
+
+    def abandon(self) -> None:
+        """Leader cancelled: wake waiters with LeaderGone so one of them takes over."""
+        with _lock:
+            _stats["leader_gone"] += 1
+        self.fail(LeaderGone())
+
+    async def wait(self):
+        with _lock:
+            _stats["waiting"] += 1
+            _stats["max_waiting"] = max(_stats["max_waiting"], _stats["waiting"])
+        try:
+            # shield: a cancelled waiter must not cancel the shared future
+            result = await asyncio.shield(asyncio.wrap_future(self._future))
+        finally:
+            with _lock:
+                _stats["waiting"] -= 1
+        return copy.deepcopy(result)
+
+
+def begin(key: str) -> tuple:
+    """Return (flight, is_leader). The leader must call resolve(), fail() or abandon() exactly once."""
+    with _lock:
+        flight = _flights.get(key)
+        if flight is not None:
+            _stats["hits"] += 1
+            return flight, False
+        flight = _Flight(key)
+        _flights[key] = flight
+        _stats["leaders"] += 1
+        return flight, True
+
+
+async def do(key: str, factory):
+    """Run `await factory()` once per key among concurrent callers; everyone gets (a copy of) its result."""
+    while True:
+        flight, leader = begin(key)
+        if not leader:
+            try:
+                return await flight.wait()
+            except LeaderGone:
+                continue
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            flight.abandon()
+            raise
+        except BaseException as e:
+            flight.fail(e)
+            raise
+        flight.resolve(result)
+        return result
+
+
+def stats() -> dict:
+    """Leaders (upstream calls started), hits (callers that joined one), current/max waiters, leader_gone retries."""
+    with _lock:
+        out = dict(_stats)
+        out["in_flight"] = len(_flights)
+    return out
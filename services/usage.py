@@ -1,11 +1,13 @@
 """Rate limits: free vs premium daily check limits (from Admin → Payment config, stored in DB)."""
+import json
+from datetime import datetime
+from services import dashboard_cache, write_behind
 from services.payments import get_payment_config
 from db.queries import (
-    ensure_user,
     get_user_plan,
-    get_usage_today,
-    record_usage,
-    insert_scan,
+    get_usage_today as _db_usage_today,
+    record_check_atomic,
+    record_checks_atomic,
 )
 
 
@@ -20,41 +22,49 @@ def _get_limits():
         return 2, 9999
 
 
-def get_daily_limit(email: str) -> int:
-    """Return max checks per day for this user. Premium/Pro get unlimited unless expired."""
+def get_active_plan(email: str) -> str:
+    """Return "free", "premium" or "pro". Premium/Pro with a past premium_until count as free (expired)."""
     if not email:
-        free, _ = _get_limits()
-        return free
-    ensure_user(email)
+        return "free"
+    # No ensure_user here: a missing user reads as free, and recording the check creates the row
     plan_info = get_user_plan(email)
     plan = (plan_info.get("plan") or "free").lower().strip()
     premium_until = plan_info.get("premium_until")
-    # Premium/Pro: unlimited. If premium_until is set and in the past, treat as free (expired).
-    if plan in ("premium", "pro"):
-        if not premium_until or not str(premium_until).strip():
-            # No expiry = ongoing premium/pro → unlimited
-            _, premium = _get_limits()
-            return premium
-        from datetime import datetime
-        try:
-            until = datetime.strptime(str(premium_until).strip()[:10], "%Y-%m-%d").date()
-            if until >= datetime.utcnow().date():
-                _, premium = _get_limits()
-                return premium
-        except Exception:
-            pass
-        # Expired: fall through to free limit
-    free, _ = _get_limits()
+    if plan not in ("premium", "pro"):
+        return "free"
+    if not premium_until or not str(premium_until).strip():
+        # No expiry = ongoing premium/pro
+        return plan
+    try:
+        until = datetime.strptime(str(premium_until).strip()[:10], "%Y-%m-%d").date()
+        if until >= datetime.utcnow().date():
+            return plan
+    except Exception:
+        pass
+    return "free"
+
+
+def get_daily_limit(email: str) -> int:
+    """Return max checks per day for this user. Premium/Pro get unlimited unless expired."""
+    free, premium = _get_limits()
+    if get_active_plan(email) in ("premium", "pro"):
+        return premium
     return free
 
 
-def can_user_check(email: str) -> tuple[bool, str]:
+def get_usage_today(email: str) -> int:
+    """Checks used today, including ones still queued in the write-behind buffer."""
+    email = email or "anonymous"
+    return _db_usage_today(email) + write_behind.pending_checks(email)
+
+
+def can_user_check(email: str, count: int = 1) -> tuple[bool, str]:
     """
-    Return (True, "") if user can run a check; else (False, "reason").
+    Return (True, "") if user can run `count` more checks today; else (False, "reason").
     """
     limit = get_daily_limit(email)
     used = get_usage_today(email or "anonymous")
-    if used >= limit:
+    if used + count > limit:
         msg = f"You've used {used} of {limit} checks today."
         if limit < 100:  # free-tier limit
             msg += " Upgrade to Premium for unlimited checks."
@@ -69,14 +79,54 @@ def record_check(
     category: str,
     signals_json: str,
     msg_hash: str,
+    metrics: dict = None,
 ) -> None:
-    """Record usage and insert scan row (no raw message)."""
-    record_usage(email or "anonymous")
-    insert_scan(
+    """Record usage and insert scan row (no raw message); metrics is the result's per-check timing/token summary.
+
+    Queued in the write-behind buffer (written within flush_interval_ms) unless [WRITE_BEHIND] enabled = false.
+    """
+    if write_behind.enabled():
+        write_behind.add(email, [{
+            "email": email or "anonymous",
+            "verdict": verdict,
+            "confidence": confidence,
+            "category": category or "",
+            "signals_json": signals_json or "[]",
+            "msg_hash": msg_hash or "",
+            "metrics": metrics,
+        }])
+        return
+    record_check_atomic(
         email=(email or "anonymous"),
         verdict=verdict,
         confidence=confidence,
         category=category or "",
         signals_json=signals_json or "[]",
         msg_hash=msg_hash or "",
+        metrics=metrics,
     )
+    dashboard_cache.invalidate_scans()
+
+
+def record_checks(email: str, results: list) -> None:
+    """Bulk variant of record_check: one usage increment and one batched scan insert for all results, in one transaction."""
+    if not results:
+        return
+    email = email or "anonymous"
+    rows = [
+        {
+            "email": email,
+            "verdict": r.get("verdict", "SUSPICIOUS"),
+            "confidence": r.get("confidence", 0),
+            "category": r.get("category") or "",
+            "signals_json": json.dumps(r.get("reasons", [])[:3]),
+            "msg_hash": r.get("msg_hash") or "",
+            "metrics": r.get("metrics"),
+        }
+        for r in results
+    ]
+    if write_behind.enabled():
+        write_behind.add(email, rows)
+        return
+    record_checks_atomic([{"email": email, "date": datetime.utcnow().strftime("%Y-%m-%d"), "count": len(rows)}], rows)
+    dashboard_cache.invalidate_scans()
@@ -0,0 +1,98 @@
+"""Verdict cache: in-process LRU in front of the verdict_cache table, keyed by msg_hash + prompt/model version."""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from db.queries import get_cached_verdict, put_cached_verdict, prune_verdict_cache
+
+CACHE_TTL_SECONDS = 6 * 3600
+LRU_MAX_ENTRIES = 2048
+DB_MAX_ROWS = 50000
+PRUNE_EVERY_N_PUTS = 200
+
+_lock = threading.Lock()
+_lru = OrderedDict()  # cache_key -> (expires_at_monotonic, result dict)
+_puts_since_prune = 0
+
+
+def cache_key(msg_hash: str, version: str, channel: str = "", language: str = "") -> str:
+    """Stable key for one analysis input. Channel/language are part of the prompt, so they are part of the key."""
+    raw = "|".join([msg_hash or "", version or "", (channel or "").strip(), (language or "").strip()])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _utc_cutoff() -> str:
+    """Oldest created_at (UTC, SQLite datetime format) that is still fresh."""
+    return (datetime.utcnow() - timedelta(seconds=CACHE_TTL_SECONDS)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _lru_get(key: str):
+    with _lock:
+        entry = _lru.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if time.monotonic() >= expires_at:
+            del _lru[key]
+            return None
+        _lru.move_to_end(key)
+        return dict(result)
+
+
+def _lru_put(key: str, result: dict, age: float = 0.0) -> None:
+    """age: seconds since the result was stored in the DB, so a warmed entry keeps only its remaining TTL."""
+    with _lock:
+        _lru[key] = (time.monotonic() + CACHE_TTL_SECONDS - age, dict(result))
+        _lru.move_to_end(key)
+        while len(_lru) > LRU_MAX_ENTRIES:
+            _lru.popitem(last=False)
+
+
+def get(key: str):
+    """Return cached result dict or None. Checks the LRU first, then the DB (and warms the LRU)."""
+    result = _lru_get(key)
+    if result is not None:
+        return result
+    try:
+        raw, age = get_cached_verdict(key, _utc_cutoff())
+    except Exception:
+        return None
+    if not raw:
+        return None
+    try:
+        result = json.loads(raw)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    if not isinstance(result, dict):
+        return None
+    _lru_put(key, result, age)
+    return dict(result)
+
+
+def put(key: str, msg_hash: str, version: str, result: dict) -> None:
+    """Store result in LRU and DB. DB errors are swallowed: the cache must never fail an analysis."""
+    global _puts_since_prune
+    _lru_put(key, result)
+    try:
+        put_cached_verdict(key, msg_hash, version, json.dumps(result))
+    except Exception:
+        return
+    with _lock:
+        _puts_since_prune += 1
+        should_prune = _puts_since_prune >= PRUNE_EVERY_N_PUTS
+        if should_prune:
+            _puts_since_prune = 0
+    if should_prune:
+        try:
+            prune_verdict_cache(_utc_cutoff(), DB_MAX_ROWS)
+        except Exception:
+            pass
+
+
+def clear_local() -> None:
+    """Drop the in-process LRU (DB rows are left to expire by TTL)."""
+    with _lock:
+        _lru.clear()
@@ -0,0 +1,191 @@
+"""Write-behind buffer for check bookkeeping (usage increments and scan rows).
+
+record_check used to make its usage upsert and scan insert before the verdict was shown. It now queues
+both here and returns. A flusher thread writes whatever is queued every flush_interval_ms, or as soon as
+max_batch scan rows are waiting, as one transaction holding the batched usage upsert and the multi-row
+scan insert (increments for the same user and day are summed first), so usage and scans never disagree.
+A failed flush puts its whole batch back and is retried on the next tick. At most max_pending scan rows are
+held; beyond that the oldest are dropped together with their usage increments. Anything still queued is
+flushed when the process exits.
+
+Each row carries the time and UTC date the check ran (taken when it is queued), so a check queued just
+before midnight counts toward that day's usage, scan_date and rollup even if it is written after. Until a
+batch lands the usage table lags by up to one interval, so pending_checks() lets the daily limit count
+checks that are queued or being written.
+
+Settings come from an optional [WRITE_BEHIND] section in .streamlit/secrets.toml:
+enabled, max_batch, flush_interval_ms, max_pending. With enabled = false every check is written inline.
+"""
+import atexit
+import threading
+import time
+from datetime import datetime
+
+from db.queries import record_checks_atomic
+from services import dashboard_cache
+
+DEFAULT_SETTINGS = {
+    "enabled": True,
+    "max_batch": 50,
+    "flush_interval_ms": 500,
+    "max_pending": 10000,
+}
+
+_lock = threading.Lock()
+_settings = None
+_wake = threading.Event()
+_flush_lock = threading.Lock()  # one flush at a time (flusher thread vs. exit / explicit flush)
+_thread = None
+_scans = []  # scan row dicts, oldest first
+_usage = {}  # (email, date) -> checks queued
+_in_flight = {}  # (email, date) -> checks in the batch being written
+_stats = {"queued": 0, "flushes": 0, "scans_written": 0, "usage_rows_written": 0, "failures": 0, "dropped": 0}
+
+
+def _settings_from_secrets() -> dict:
+    out = dict(DEFAULT_SETTINGS)
+    try:
+        import streamlit as st
+        cfg = st.secrets.get("WRITE_BEHIND") or {}
+        for k in DEFAULT_SETTINGS:
+            v = cfg.get(k, cfg.get(k.upper()))
+            if v is not None:
+                out[k] = type(DEFAULT_SETTINGS[k])(v)
+    except Exception:
+        pass
+    return out
+
+
+def get_settings() -> dict:
+    global _settings
+    with _lock:
+        if _settings is None:
+            _settings = _settings_from_secrets()
+        return dict(_settings)
+
+
+def configure(**overrides) -> None:
+    """Override settings (e.g. in scripts). Queued work is flushed first."""
+    global _settings
+    flush()
+    with _lock:
+        _settings = {**_settings_from_secrets(), **overrides}
+
+
+def enabled() -> bool:
+    return bool(get_settings()["enabled"])
+
+
+def _today() -> str:
+    return datetime.utcnow().strftime("%Y-%m-%d")
+
+
+def _ensure_thread() -> None:
+    global _thread
+    with _lock:
+        if _thread is not None and _thread.is_alive():
+            return
+        _thread = threading.Thread(target=_run, name="write-behind", daemon=True)
+        _thread.start()
+
+
+def add(email: str, scans: list) -> None:
+    """Queue one usage increment per scan row and the rows themselves (dicts with insert_scans' fields),
+    stamped with the current time and UTC date."""
+    if not scans:
+        return
+    email = (email or "anonymous").strip().lower()
+    now = time.time()
+    day = datetime.utcfromtimestamp(now).strftime("%Y-%m-%d")
+    # Counted against the day the check ran, even if written after midnight
+    scans = [{**row, "email": email, "ts": now, "scan_date": day} for row in scans]
+    settings = get_settings()
+    with _lock:
+        _usage[(email, day)] = _usage.get((email, day), 0) + len(scans)
+        _scans.extend(scans)
+        _stats["queued"] += len(scans)
+        over = len(_scans) - settings["max_pending"]
+        if over > 0:
+            _drop_oldest(over)
+        full = len(_scans) >= settings["max_batch"]
+    _ensure_thread()
+    if full:
+        _wake.set()
+
+
+def _usage_key(row: dict) -> tuple:
+    return ((row["email"] or "anonymous").strip().lower(), row["scan_date"])
+
+
+def _drop_oldest(over: int) -> None:
+    """Drop the over oldest scan rows and their usage increments (caller holds _lock)."""
+    for row in _scans[:over]:
+        key = _usage_key(row)
+        n = _usage.get(key, 0) - 1
+        if n > 0:
+            _usage[key] = n
+        else:
+            _usage.pop(key, None)
+    del _scans[:over]
+    _stats["dropped"] += over
+
+
+def pending_checks(email: str) -> int:
+    """Checks by this user today that are queued or being written (not yet visible in the usage table)."""
+    key = ((email or "anonymous").strip().lower(), _today())
+    with _lock:
+        return _usage.get(key, 0) + _in_flight.get(key, 0)
+
+
+def flush() -> None:
+    """Write everything queued now in one transaction; a failed batch is put back for the next flush."""
+    global _usage, _scans
+    max_pending = get_settings()["max_pending"]
+    with _flush_lock:
+        with _lock:
+            usage, scans = _usage, _scans
+            _usage, _scans = {}, []
+            _in_flight.update(usage)
+        if not usage and not scans:
+            return
+        try:
+            record_checks_atomic([{"email": e, "date": d, "count": n} for (e, d), n in usage.items()], scans)
+        except Exception:
+            with _lock:
+                _in_flight.clear()
+                for key, n in usage.items():
+                    _usage[key] = _usage.get(key, 0) + n
+                _scans[:0] = scans
+                over = len(_scans) - max_pending
+                if over > 0:
+                    _drop_oldest(over)
+                _stats["flushes"] += 1
+                _stats["failures"] += 1
+            return
+        with _lock:
+            _in_flight.clear()
+            _stats["usage_rows_written"] += len(usage)
+            _stats["scans_written"] += len(scans)
+            _stats["flushes"] += 1
+        if scans:
+            dashboard_cache.invalidate_scans()
+
+
+def _run() -> None:
+    while True:
+        _wake.wait(get_settings()["flush_interval_ms"] / 1000.0)
+        _wake.clear()
+        flush()
+
+
+def stats() -> dict:
+    """Counts since start plus what is waiting now (scan rows, users with queued usage)."""
+    with _lock:
+        out = dict(_stats)
+        out["pending_scans"] = len(_scans)
+        out["pending_usage"] = len(_usage)
+    out["enabled"] = enabled()
+    return out
+
+
+atexit.register(flush)
@@ -0,0 +1,52 @@
+from services import compaction
+
+FORWARDED_SCAM = (
+    "Is this legit?\n\n"
+    "From: BDO Unibank <alerts@bdo-secure-ph.com>\n"
+    "Sent: Monday, June 3, 2024 9:14 AM\n"
+    "To: me@example.com\n"
+    "Subject: Account verification required\n\n"
+    "Dear client, your account will be suspended within 24 hours. Verify your account now at "
+    "http://bdo-secure-ph.com/verify and enter the OTP sent to your mobile. Call 09171234567 for help."
+)
+
+
+def test_forwarded_scam_is_kept():
+    out, info = compaction.compact(FORWARDED_SCAM)
+    assert "bdo-secure-ph.com" in out
+    assert "09171234567" in out
+    assert "suspended" in out
+    assert info["tokens_after"] > compaction.count_tokens("Is this legit?")
+
+
+def test_quoted_scam_is_kept_without_markers():
+    text = (
+        "Got this text today, scam ba ito?\n"
+        "> GCash: Your wallet will be locked. Send your OTP to 09171234567 to avoid lockout.\n"
+        "> http://gcash-ph-verify.com"
+    )
+    out, _ = compaction.compact(text)
+    assert "Send your OTP to 09171234567" in out
+    assert "gcash-ph-verify.com" in out
+    assert ">" not in out
+
+
+def test_quoted_history_is_dropped_when_reply_has_the_signals():
+    reply = "Send your GCash OTP to 09171234567 now to verify your account: http://gcash-verify.com"
+    history = "\n\nOn Mon, Jun 3, 2024 at 9:14 AM Ana <ana@example.com> wrote:\n> Hi, see you at lunch tomorrow?\n> Thanks"
+    out, info = compaction.compact(reply + history)
+    assert "lunch" not in out
+    assert "09171234567" in out
+    assert info["tokens_after"] < info["tokens_before"]
+
+
+def test_budget_is_configurable():
+    compaction.configure(token_budget=200)
+    try:
+        assert compaction.token_budget() == 200
+        long_text = " ".join(f"Sentence number {i} about nothing in particular." for i in range(400))
+        out, info = compaction.compact(long_text)
+        assert info["trimmed"]
+        assert info["tokens_after"] <= 200 + 10
+    finally:
+        compaction.configure(None)
@@ -0,0 +1,60 @@
+import pytest
+
+from db import _sqlite_schema
+from services import indicators
+
+SCAM = "Your parcel is on hold. Pay the fee at http://jnt-redelivery.xyz/pay or call 09171234567."
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(_sqlite_schema, "DB_PATH", tmp_path / "test.db")
+    _sqlite_schema.init_db()
+    monkeypatch.setattr(indicators, "_hmac_key", b"test-key")
+    monkeypatch.setattr(indicators, "_bloom", bytearray(indicators.BLOOM_BITS // 8))
+    monkeypatch.setattr(indicators, "_bloom_loaded_at", 0.0)
+    monkeypatch.setattr(indicators, "_bloom_since", "")
+
+
+def _counts(found):
+    return sorted(count for _, _, count in indicators.lookup(found))
+
+
+def test_same_message_counted_once(db):
+    found = indicators.extract(SCAM)
+    for _ in range(indicators.REPEAT_OFFENDER_MIN + 1):
+        indicators.record_scam(found, "hash-1")
+    assert _counts(found) == [1, 1]
+    indicators.record_scam(found, "hash-2")
+    assert _counts(found) == [2, 2]
+
+
+def test_common_domains_not_extracted():
+    found = indicators.extract("Track it on https://shopee.ph/orders or https://www.lazada.com.ph/x, see youtube.com")
+    assert found == []
+
+
+def test_disabled_without_hmac_key(db, monkeypatch):
+    monkeypatch.setattr(indicators, "_hmac_key", b"")
+    found = indicators.extract(SCAM)
+    indicators.record_scam(found, "hash-1")
+    assert not indicators.enabled()
+    assert indicators.lookup(found) == []
+    monkeypatch.setattr(indicators, "_hmac_key", b"test-key")
+    assert indicators.lookup(found) == []
+
+
+def test_path_hosts_keep_the_path():
+    found = indicators.extract("Chat us at https://wa.me/639171234567 or t.me/gcash_refunds, page m.facebook.com/promo.ph")
+    domains = [value for kind, value in found if kind == "domain"]
+    assert domains == ["wa.me/639171234567", "t.me/gcash_refunds", "facebook.com/promo.ph"]
+    assert indicators.extract("Follow us on https://www.facebook.com/ and https://wa.me/") == []
+
+
+def test_repeat_wa_me_link_becomes_repeat_offender(db):
+    for i in range(indicators.REPEAT_OFFENDER_MIN):
+        text = f"Claim your refund #{i}: message https://wa.me/639171234567 now"
+        indicators.record_scam(indicators.extract(text), f"hash-{i}")
+    known = indicators.lookup(indicators.extract("Refund agent: https://wa.me/639171234567"))
+    assert ("domain", "wa.me/639171234567", indicators.REPEAT_OFFENDER_MIN) in known
+    assert any(count >= indicators.REPEAT_OFFENDER_MIN for _, _, count in known)
@@ -0,0 +1,64 @@
+import json
+
+from services.json_stream import IncrementalObjectParser, salvage
+
+REPLY = json.dumps({
+    "verdict": "SCAM",
+    "confidence": 92,
+    "category": "Phishing",
+    "reasons": ["Link to a look-alike \"GCash\" domain", "Asks for your OTP"],
+    "recommended_actions": ["Do not click the link"],
+    "is_official": False,
+    "safety_notes": None,
+}, indent=1)
+
+
+def test_any_split_gives_the_whole_object():
+    expected = json.loads(REPLY)
+    for cut in range(len(REPLY) + 1):
+        parser = IncrementalObjectParser()
+        parser.feed(REPLY[:cut])
+        assert parser.feed(REPLY[cut:]) == expected, cut
+        assert parser.done
+
+
+def test_char_by_char_fields_appear_in_order():
+    parser = IncrementalObjectParser()
+    seen = []
+    for ch in REPLY:
+        snapshot = parser.feed(ch)
+        if list(snapshot) != (seen[-1] if seen else []):
+            seen.append(list(snapshot))
+    assert seen[0] == ["verdict"]
+    assert seen[1] == ["verdict", "confidence"]
+    assert seen[-1] == list(json.loads(REPLY))
+
+
+def test_number_waits_for_its_end():
+    parser = IncrementalObjectParser()
+    assert parser.feed('{"verdict": "SCAM", "confidence": 8') == {"verdict": "SCAM"}
+    assert parser.feed("5") == {"verdict": "SCAM"}
+    assert parser.feed(",") == {"verdict": "SCAM", "confidence": 85}
+
+
+def test_list_items_reported_as_they_complete():
+    parser = IncrementalObjectParser()
+    assert parser.feed('{"reasons": ["one", "tw') == {"reasons": ["one"]}
+    assert parser.feed('o"') == {"reasons": ["one", "two"]}
+
+
+def test_salvage_truncated_reply():
+    cut = REPLY.index("Asks for")
+    assert salvage(REPLY[:cut]) == {
+        "verdict": "SCAM",
+        "confidence": 92,
+        "category": "Phishing",
+        "reasons": ['Link to a look-alike "GCash" domain'],
+    }
+
+
+def test_salvage_tolerates_fences_and_garbage():
+    assert salvage("```json\n" + REPLY + "\n```") == json.loads(REPLY)
+    assert salvage('{"verdict": "SAFE", oops') == {"verdict": "SAFE"}
+    assert salvage("") == {}
+    assert salvage("I cannot help with that.") == {}
@@ -0,0 +1,29 @@
+import pytest
+
+from services import language
+
+TAGLISH = [
+    "Hi po, may parcel kayo na naka-hold sa warehouse. Paki-click lang ng link para ma-release.",
+    "Good day! Congratulations, ikaw ay nanalo ng 50,000 pesos sa aming raffle promo. Send your GCash number para ma-claim.",
+    "Sir, yung account niyo po ay na-suspend. Please verify your details dito sa link within 24 hours.",
+    "Pa-confirm naman if available pa yung item, I will pick it up later at the mall.",
+]
+
+
+@pytest.mark.parametrize("text", TAGLISH)
+def test_taglish_is_mixed(text):
+    assert language.detect(text) == language.MIXED
+
+
+def test_english_with_may_and_at_is_english():
+    assert language.detect("May I know if you received the payment at the office?") == language.ENGLISH
+    assert language.detect("Your package is waiting at the hub. Please pay the fee today.") == language.ENGLISH
+
+
+def test_tagalog():
+    assert language.detect("Kumusta ka na? Uuwi ako sa probinsya bukas, sabay tayo kumain mamaya.") == language.TAGALOG
+
+
+def test_too_short_left_to_model():
+    assert language.detect("OK") == ""
+
@@ -0,0 +1,25 @@
+from services import learning
+
+MESSAGE = "Congrats! You won P50,000. Claim now at http://promo-claim.xyz and send your GCash OTP."
+
+
+def _saved(monkeypatch, result):
+    saved = []
+    monkeypatch.setattr(learning, "insert_learning_example", lambda *args: saved.append(args))
+    learning.record_example(MESSAGE, "sms", result)
+    return saved
+
+
+def test_model_verdict_is_stored(monkeypatch):
+    result = {"verdict": "SCAM", "confidence": 90, "metrics": {"source": "model"}}
+    assert len(_saved(monkeypatch, result)) == 1
+
+
+def test_rule_and_reused_verdicts_are_rejected(monkeypatch):
+    for source in ("prescreen", "indicators", "near_dup", "cache", "degraded", "local_model", "coalesced"):
+        result = {"verdict": "SCAM", "confidence": 95, "metrics": {"source": source}}
+        assert _saved(monkeypatch, result) == [], source
+
+
+def test_result_without_metrics_is_rejected(monkeypatch):
+    assert _saved(monkeypatch, {"verdict": "SCAM", "confidence": 95}) == []
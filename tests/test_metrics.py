@@ -0,0 +1,20 @@
+import time
+
+from services import metrics
+
+
+def test_render_is_not_part_of_total():
+    metrics.reset()
+    trace = metrics.Trace()
+    with trace.span("network"):
+        time.sleep(0.01)
+    trace.end()
+    time.sleep(0.05)  # the page drawing the result
+    summary = metrics.finish(trace, "model")
+    metrics.add_render(summary, 0.05)
+    assert summary["total_ms"] < 50
+    assert summary["stages"]["render"] == 50.0
+    stats = metrics.stats()["stages"]
+    assert stats["render"]["count"] == 1
+    assert stats["total"]["p50_ms"] == summary["total_ms"]
+    metrics.reset()
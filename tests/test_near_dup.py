@@ -0,0 +1,56 @@
+import pytest
+
+from db import _sqlite_schema
+from services import near_dup
+
+TEMPLATE = (
+    "Good day {name}! Your BDO account will be suspended today. Verify your details at {link} "
+    "within 24 hours to avoid losing your P{amount} balance. Thank you."
+)
+SCAM = {"verdict": "SCAM", "confidence": 95, "category": "Phishing", "reasons": ["Fake bank link"]}
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(_sqlite_schema, "DB_PATH", tmp_path / "test.db")
+    _sqlite_schema.init_db()
+    near_dup.clear_local()
+    yield
+    near_dup.clear_local()
+
+
+def _altered(sig, n):
+    """sig with its first n values changed: estimated similarity (NUM_PERM - n) / NUM_PERM, later bands intact."""
+    return tuple((v + 1) & 0xFFFFFFFF if i < n else v for i, v in enumerate(sig))
+
+
+def test_template_variant_reuses_verdict(db):
+    sig = near_dup.signature(TEMPLATE.format(name="Maria", link="http://bdo-verify.xyz", amount="25,000"))
+    near_dup.remember(sig, "hash-1", SCAM)
+    found = near_dup.lookup(near_dup.signature(TEMPLATE.format(name="Juan", link="https://bdo-secure.top/x", amount="7,500")))
+    assert found["verdict"] == "SCAM"
+
+
+def test_threshold_is_inclusive(db):
+    sig = near_dup.signature(TEMPLATE.format(name="Maria", link="http://bdo-verify.xyz", amount="25,000"))
+    near_dup.remember(sig, "hash-1", SCAM)
+    at = round(near_dup.NUM_PERM * (1 - near_dup.SIMILARITY_THRESHOLD))
+    assert near_dup.similarity(sig, _altered(sig, at)) == near_dup.SIMILARITY_THRESHOLD
+    assert near_dup.lookup(_altered(sig, at))["verdict"] == "SCAM"
+    assert near_dup.lookup(_altered(sig, at + 1)) is None
+
+
+def test_lookup_falls_back_to_db(db):
+    sig = near_dup.signature(TEMPLATE.format(name="Maria", link="http://bdo-verify.xyz", amount="25,000"))
+    near_dup.remember(sig, "hash-1", SCAM)
+    near_dup.clear_local()
+    assert near_dup.lookup(sig)["verdict"] == "SCAM"
+    assert near_dup.stats()["in_memory"] == 1
+
+
+def test_unrelated_and_short_messages_do_not_match(db):
+    sig = near_dup.signature(TEMPLATE.format(name="Maria", link="http://bdo-verify.xyz", amount="25,000"))
+    near_dup.remember(sig, "hash-1", SCAM)
+    other = "Hi team, the quarterly review moved to Thursday at 3pm in the big conference room, bring your slides."
+    assert near_dup.lookup(near_dup.signature(other)) is None
+    assert near_dup.signature("Your OTP is 123456") is None
@@ -0,0 +1,65 @@
+from services.prescreen import match_signals, prescreen
+
+
+def test_overlapping_signals_are_all_found():
+    text = "Send your GCash OTP to 09171234567 to verify your account now http://gcash-verify.com"
+    assert {"ewallet", "otp_request", "verify_lure", "link", "phone"} <= match_signals(text)
+    result = prescreen(text)
+    assert result is not None
+    assert result["category"] == "GCash phishing"
+
+
+def test_bank_otp_request_to_a_number_is_flagged():
+    text = "BPI: Your account will be suspended. Send the OTP to 09171234567 within 24 hours."
+    assert prescreen(text)["category"] == "Bank OTP scam"
+
+
+def test_negation_a_few_words_before_still_counts():
+    assert "otp_request" not in match_signals("We will never ask you to send your OTP.")
+    # "and" ends the negated phrase: this is still a request
+    assert "otp_request" in match_signals("Do not delay and send your OTP to 09171234567")
+
+
+def test_bank_advisory_is_not_a_local_scam():
+    text = "BDO will never ask you to enter your OTP via link. Visit https://www.bdo.com.ph for advisories."
+    assert "otp_request" not in match_signals(text)
+    assert prescreen(text) is None
+
+
+def test_bank_app_instruction_is_not_a_local_scam():
+    text = "To complete your transfer, enter the OTP sent to your registered mobile in the BDO app."
+    assert prescreen(text) is None
+
+
+def test_philhealth_notice_is_not_a_local_scam():
+    text = (
+        "PhilHealth advisory: Beware of messages claiming you have unclaimed benefits. PhilHealth does not "
+        "send links via SMS. Check your contributions at https://www.philhealth.gov.ph"
+    )
+    assert "link" not in match_signals(text)
+    assert prescreen(text) is None
+
+
+def test_no_unclaimed_benefits_is_negated():
+    assert "prize_claim" not in match_signals("SSS reminds members there are no unclaimed benefits sent by text.")
+
+
+def test_one_scan_finds_what_each_pattern_finds():
+    import re
+
+    from services.prescreen import SIGNALS
+
+    text = (
+        "Congratulations! You won 50,000 pesos. Claim now at gcash-promo.com within 24 hours. Send your GCash OTP "
+        "to 09171234567, pay the release fee to claim. Guaranteed returns, invest in crypto. We're hiring data encoder."
+    )
+    separately = {name for name, (pattern, _) in SIGNALS.items() if re.search(pattern, text, re.IGNORECASE)}
+    assert match_signals(text) == separately
+
+
+def test_links_on_shared_platforms_still_count():
+    for url in ("https://forms.google.com/d/e/1FAIpQ/viewform", "https://sites.google.com/view/gcash-rewards",
+                "https://www.facebook.com/groups/gcash.promo.ph"):
+        assert "link" in match_signals(f"Claim here: {url}"), url
+    text = "GCash: your wallet will be suspended. Verify your account now at https://docs.google.com/forms/d/xyz"
+    assert prescreen(text)["category"] == "GCash phishing"
@@ -0,0 +1,75 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from openai import APITimeoutError
+
+from services import resilience
+
+
+@pytest.fixture(autouse=True)
+def settings(monkeypatch):
+    monkeypatch.setattr(resilience, "_settings_from_secrets", lambda: dict(resilience.DEFAULT_SETTINGS))
+    resilience.configure(base_delay=0.0, max_delay=0.0)
+    yield
+    resilience.configure()
+
+
+def _timeout():
+    return APITimeoutError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+
+
+def test_attempt_timeout_shrinks_to_deadline():
+    assert resilience.attempt_timeout() == 20.0
+    assert resilience.attempt_timeout(time.monotonic() + 60) == 20.0
+    assert 4.0 < resilience.attempt_timeout(time.monotonic() + 5) <= 5.0
+    assert resilience.attempt_timeout(time.monotonic() - 1) == 0.0
+
+
+def test_no_retry_started_past_deadline():
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        raise _timeout()
+
+    with pytest.raises(APITimeoutError):
+        asyncio.run(resilience.call(failing))
+    assert len(calls) == 3
+    calls.clear()
+    with pytest.raises(APITimeoutError):
+        asyncio.run(resilience.call(failing, time.monotonic() + resilience.MIN_ATTEMPT_SECONDS / 2))
+    assert len(calls) == 1
+
+
+def test_breaker_opens_half_opens_and_closes(monkeypatch):
+    resilience.configure(base_delay=0.0, max_delay=0.0, max_retries=0, failure_threshold=2, reset_timeout=30.0)
+    now = [1000.0]
+    monkeypatch.setattr(resilience, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    breaker = resilience.breaker
+
+    async def failing():
+        raise _timeout()
+
+    async def ok():
+        return "ok"
+
+    for _ in range(2):
+        with pytest.raises(APITimeoutError):
+            asyncio.run(resilience.call(failing))
+    assert breaker.snapshot()["state"] == resilience.OPEN
+    with pytest.raises(resilience.CircuitOpen):
+        asyncio.run(resilience.call(ok))
+
+    now[0] += 30.0
+    assert breaker.allow()
+    assert breaker.snapshot()["state"] == resilience.HALF_OPEN
+    assert not breaker.allow()  # one trial at a time
+    breaker.record_failure()
+    assert breaker.snapshot()["state"] == resilience.OPEN
+
+    now[0] += 30.0
+    assert asyncio.run(resilience.call(ok)) == "ok"
+    assert breaker.snapshot() == {"state": resilience.CLOSED, "consecutive_failures": 0}
@@ -0,0 +1,22 @@
+from services import routing
+
+
+def _config(**overrides):
+    return {**routing._default_config(), "enabled": True, **overrides}
+
+
+def test_defaults_to_fast_tier_only():
+    assert routing.tiers(routing._default_config()) == [("fast", "gpt-4o-mini")]
+
+
+def test_escalates_only_uncertain_band():
+    config = _config()
+    assert routing.should_escalate({"verdict": "SUSPICIOUS", "confidence": 55}, config)
+    assert not routing.should_escalate({"verdict": "SUSPICIOUS", "confidence": 85}, config)
+    assert not routing.should_escalate({"verdict": "SCAM", "confidence": 95}, config)
+
+
+def test_string_booleans(monkeypatch):
+    for raw, expected in (("false", False), ("0", False), ("off", False), ("true", True), (True, True), (False, False)):
+        monkeypatch.setattr(routing, "get_routing_config_from_db", lambda raw=raw: {"enabled": raw})
+        assert routing._from_db()["enabled"] is expected
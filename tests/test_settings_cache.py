@@ -0,0 +1,34 @@
+import pytest
+
+from db import _sqlite_schema, queries, queries_sqlite
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(_sqlite_schema, "DB_PATH", tmp_path / "test.db")
+    _sqlite_schema.init_db()
+    monkeypatch.setattr(queries, "_settings_version", None)
+    queries._settings.clear()
+    queries._settings_json.clear()
+    yield
+    queries._settings.clear()
+    queries._settings_json.clear()
+
+
+def test_read_overlapping_a_save_is_not_cached(db, monkeypatch):
+    queries.set_app_setting("color", "red")
+    read = queries_sqlite.get_app_setting
+
+    def slow_read(key):
+        value = read(key)
+        if key == "color":
+            # Another process saves while this read is in flight, and another thread notices the new version
+            queries_sqlite.set_app_setting("color", "blue")
+            monkeypatch.setattr(queries, "_settings_checked_at", 0.0)
+            queries._sync_settings_version()
+        return value
+
+    monkeypatch.setattr(queries_sqlite, "get_app_setting", slow_read)
+    assert queries.get_app_setting("color") == "red"
+    monkeypatch.setattr(queries_sqlite, "get_app_setting", read)
+    assert queries.get_app_setting("color") == "blue"
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from services import singleflight
+
+
+def test_followers_share_the_leaders_result():
+    calls = []
+
+    async def factory():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"verdict": "SCAM", "reasons": ["x"]}
+
+    async def main():
+        return await asyncio.gather(*(singleflight.do("k-share", factory) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(r == {"verdict": "SCAM", "reasons": ["x"]} for r in results)
+    results[1]["reasons"].append("mutated")
+    assert results[2]["reasons"] == ["x"]
+    assert singleflight.stats()["in_flight"] == 0
+
+
+def test_leader_error_reaches_followers():
+    async def factory():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("upstream failed")
+
+    async def main():
+        return await asyncio.gather(*(singleflight.do("k-error", factory) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_follower_takes_over_when_leader_is_cancelled():
+    calls = []
+
+    async def factory():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"verdict": "SAFE"}
+
+    async def main():
+        before = singleflight.stats()["leader_gone"]
+        leader = asyncio.create_task(singleflight.do("k-gone", factory))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(singleflight.do("k-gone", factory))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert await follower == {"verdict": "SAFE"}
+        return singleflight.stats()["leader_gone"] - before
+
+    assert asyncio.run(main()) == 1
+    assert len(calls) == 2
@@ -0,0 +1,73 @@
+import pytest
+
+from db import snowflake_schema
+
+
+class FakeCursor:
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+
+    def execute(self, sql, *args, **kwargs):
+        if self.fail_on and self.fail_on in sql:
+            raise RuntimeError("statement failed")
+
+    def close(self):
+        pass
+
+
+class FakeConn:
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.rollbacks = 0
+
+    def cursor(self, *args):
+        return FakeCursor(self.fail_on)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def is_closed(self):
+        return False
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def pool(monkeypatch):
+    monkeypatch.setattr(snowflake_schema, "_idle", [])
+
+
+def _use(raw, *statements, commit=False):
+    conn = snowflake_schema._SnowflakeConnWrapper(raw, "key")
+    cur = conn.cursor()
+    try:
+        for sql in statements:
+            cur.execute(sql)
+        if commit:
+            conn.commit()
+    except RuntimeError:
+        pass
+    cur.close()
+    conn.close()
+
+
+def test_autocommit_and_committed_work_skip_rollback():
+    raw = FakeConn()
+    _use(raw, "SELECT 1")
+    _use(raw, "MERGE INTO users ...", commit=True)
+    _use(raw, "BEGIN", "INSERT INTO scans ...", "COMMIT")
+    _use(raw, "BEGIN; DELETE FROM x; INSERT INTO x ...; COMMIT;")
+    assert raw.rollbacks == 0
+    assert snowflake_schema._idle
+
+
+def test_open_transaction_rolled_back():
+    raw = FakeConn(fail_on="INSERT")
+    _use(raw, "BEGIN", "INSERT INTO scans ...", "COMMIT")
+    assert raw.rollbacks == 1
+    _use(raw, "BEGIN; DELETE FROM x; INSERT INTO x ...; COMMIT;")
+    assert raw.rollbacks == 2
@@ -0,0 +1,43 @@
+import sqlite3
+import time
+
+import pytest
+
+from db import _sqlite_schema
+from services import verdict_cache
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(_sqlite_schema, "DB_PATH", tmp_path / "test.db")
+    _sqlite_schema.init_db()
+    verdict_cache.clear_local()
+    yield tmp_path / "test.db"
+    verdict_cache.clear_local()
+
+
+def _age_row(path, key, seconds):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "UPDATE verdict_cache SET created_at = datetime('now', ?) WHERE cache_key = ?", (f"-{seconds} seconds", key)
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_warmed_entry_keeps_remaining_ttl(db):
+    key = verdict_cache.cache_key("hash-1", "v1")
+    verdict_cache.put(key, "hash-1", "v1", {"verdict": "SCAM"})
+    verdict_cache.clear_local()
+    _age_row(db, key, verdict_cache.CACHE_TTL_SECONDS - 60)
+    assert verdict_cache.get(key) == {"verdict": "SCAM"}
+    expires_at, _ = verdict_cache._lru[key]
+    assert 0 < expires_at - time.monotonic() <= 61
+
+
+def test_expired_row_not_served(db):
+    key = verdict_cache.cache_key("hash-2", "v1")
+    verdict_cache.put(key, "hash-2", "v1", {"verdict": "SAFE"})
+    verdict_cache.clear_local()
+    _age_row(db, key, verdict_cache.CACHE_TTL_SECONDS + 60)
+    assert verdict_cache.get(key) is None
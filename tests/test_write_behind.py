@@ -0,0 +1,68 @@
+import pytest
+
+from db import _sqlite_schema, queries_sqlite
+from services import write_behind
+
+SCAN = {"email": "a@example.com", "verdict": "SCAM", "confidence": 90, "category": "Test", "signals_json": "[]"}
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(_sqlite_schema, "DB_PATH", tmp_path / "test.db")
+    _sqlite_schema.init_db()
+    monkeypatch.setattr(write_behind, "_ensure_thread", lambda: None)
+    write_behind.flush()
+    yield
+    # Nothing queued may reach the real database at exit
+    with write_behind._lock:
+        write_behind._scans.clear()
+        write_behind._usage.clear()
+
+
+def _rows(sql):
+    conn = _sqlite_schema.get_conn()
+    cur = conn.cursor()
+    cur.execute(sql)
+    rows = [dict(r) for r in cur.fetchall()]
+    conn.close()
+    return rows
+
+
+def test_rows_keep_the_day_they_were_queued(db):
+    write_behind.add("a@example.com", [SCAN])
+    write_behind._scans[0].update(ts=1700000000, scan_date="2023-11-14")
+    write_behind._usage = {("a@example.com", "2023-11-14"): 1}
+    write_behind.flush()
+    assert _rows("SELECT ts, scan_date FROM scans WHERE category = 'Test'") == [
+        {"ts": "2023-11-14 22:13:20", "scan_date": "2023-11-14"}
+    ]
+    assert _rows("SELECT date, count FROM scan_daily_rollup WHERE category = 'Test'") == [{"date": "2023-11-14", "count": 1}]
+    assert _rows("SELECT date, checks_count FROM usage WHERE email = 'a@example.com'") == [
+        {"date": "2023-11-14", "checks_count": 1}
+    ]
+
+
+def test_failed_flush_writes_nothing_and_requeues(db, monkeypatch):
+    write_behind.add("a@example.com", [SCAN])
+    # Usage is written first: make the scan insert fail inside the same transaction
+
+    def broken(cur, rows):
+        raise RuntimeError("insert failed")
+
+    monkeypatch.setattr(queries_sqlite, "_insert_scan_rows", broken)
+    write_behind.flush()
+    assert _rows("SELECT * FROM usage WHERE email = 'a@example.com'") == []
+    assert write_behind.pending_checks("a@example.com") == 1
+
+
+def test_overflow_drops_usage_with_the_scans(db, monkeypatch):
+    monkeypatch.setattr(write_behind, "_settings", {**write_behind.DEFAULT_SETTINGS, "max_pending": 3})
+    write_behind.add("a@example.com", [SCAN, SCAN])
+    write_behind.add("b@example.com", [dict(SCAN, email="b@example.com")] * 3)
+    assert write_behind.stats()["dropped"] >= 2
+    assert sum(write_behind._usage.values()) == len(write_behind._scans) == 3
+    assert write_behind.pending_checks("a@example.com") == 0
+    write_behind.flush()
+    usage = _rows("SELECT COALESCE(SUM(checks_count), 0) AS n FROM usage WHERE email LIKE '%@example.com'")[0]["n"]
+    scans = _rows("SELECT COUNT(*) AS n FROM scans WHERE email LIKE '%@example.com'")[0]["n"]
+    assert usage == scans == 3